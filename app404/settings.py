@@ -1,5 +1,6 @@
 from pathlib import Path
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -33,22 +34,32 @@ INSTALLED_APPS = [
     *TEAM_APPS,
 ]
 
+# Session, auth and message middleware are core's path-aware versions: they
+# are skipped for /api/ and /team<N>/api/ requests, which use JWT only.
 MIDDLEWARE = [
+    "core.metrics.PrometheusMetricsMiddleware",
+    "core.query_budget.QueryBudgetMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "core.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
 
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.AuthenticationMiddleware",
 
     "core.middleware.JWTAuthenticationMiddleware",
+    "core.db_router.ReplicaPinningMiddleware",
+    "core.profiling.ProfilingMiddleware",
 
-    "django.contrib.messages.middleware.MessageMiddleware",
+    "core.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+if "team7" in TEAM_APPS:
+    # Team7 API request logging, rollups and root trace span (X-Trace-Id)
+    MIDDLEWARE.insert(1, "team7.middleware.APILoggingMiddleware")
+
 ROOT_URLCONF = "app404.urls"
 
 TEMPLATES = [
@@ -79,8 +90,67 @@ for t in TEAM_APPS:
     default_url = f"sqlite:///{BASE_DIR / t / (t + '.sqlite3')}"
     DATABASES[t] = env.db(key, default=default_url)
 
+# Optional read replicas per team, e.g. TEAM7_REPLICA_DATABASE_URL=mysql://...
+# (comma-separated for several). They become aliases team7_replica1, ... and
+# core.db_router spreads team reads across them; a user's reads stay on the
+# primary for DB_REPLICA_PIN_SECONDS after they write.
+DATABASE_REPLICAS = {}
+for t in TEAM_APPS:
+    urls = env.list(f"{t.upper()}_REPLICA_DATABASE_URL", default=[])
+    for i, url in enumerate(urls, start=1):
+        alias = f"{t}_replica{i}"
+        DATABASES[alias] = environ.Env.db_url_config(url)
+        # Tests read the primary's test database through the replica alias
+        DATABASES[alias]["TEST"] = {"MIRROR": t}
+        DATABASE_REPLICAS.setdefault(t, []).append(alias)
+DB_REPLICA_PIN_SECONDS = env.int("DB_REPLICA_PIN_SECONDS", default=10)
+
+# PRAGMAs for every SQLite connection (core.sqlite_tuning); ignored for MySQL
+SQLITE_TUNING_ENABLED = env.bool("SQLITE_TUNING_ENABLED", default=True)
+SQLITE_PRAGMAS = {
+    "journal_mode": env("SQLITE_JOURNAL_MODE", default="WAL"),
+    "synchronous": env("SQLITE_SYNCHRONOUS", default="NORMAL"),
+    "busy_timeout": env.int("SQLITE_BUSY_TIMEOUT_MS", default=5000),
+    "mmap_size": env.int("SQLITE_MMAP_SIZE", default=256 * 1024 * 1024),
+    "cache_size": -env.int("SQLITE_CACHE_SIZE_KB", default=20000),
+    "temp_store": "MEMORY",
+}
+SQLITE_BUSY_RETRIES = env.int("SQLITE_BUSY_RETRIES", default=5)
+
+# Persistent connections: each worker thread keeps one connection per alias it
+# has used for DB_CONN_MAX_AGE seconds (0 = close after every request) and
+# pings it before reuse in a new request. Connections still open lazily, so a
+# worker never connects to a team DB it doesn't query. Override per alias with
+# <ALIAS>_CONN_MAX_AGE, e.g. TEAM7_CONN_MAX_AGE=0.
+DB_CONN_MAX_AGE = env.int("DB_CONN_MAX_AGE", default=600)
+DB_CONN_HEALTH_CHECKS = env.bool("DB_CONN_HEALTH_CHECKS", default=True)
+for alias, config in DATABASES.items():
+    config["CONN_MAX_AGE"] = env.int(f"{alias.upper()}_CONN_MAX_AGE", default=DB_CONN_MAX_AGE)
+    config["CONN_HEALTH_CHECKS"] = DB_CONN_HEALTH_CHECKS
+
 DATABASE_ROUTERS = ["core.db_router.TeamPerAppRouter"]
 
+TEST_RUNNER = "core.test_runner.TestRunner"
+
+# Prometheus /metrics: optional bearer token for scrapers. Under gunicorn also
+# set PROMETHEUS_MULTIPROC_DIR so all workers are aggregated (see gunicorn.conf.py).
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+
+# Shared cache backend (e.g. CACHE_URL=redis://redis:6379/1 in production so
+# cached responses and invalidations are visible to every gunicorn worker)
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+
+# The principal cache (logout/deactivation), team7 response-cache
+# invalidation, admission limits and replica pins all rely on every worker
+# seeing the same cache. A per-process locmem cache silently breaks them
+# with several workers; set SHARED_CACHE_REQUIRED=True to refuse to start
+# without a shared one.
+SHARED_CACHE_REQUIRED = env.bool("SHARED_CACHE_REQUIRED", default=False)
+if SHARED_CACHE_REQUIRED and CACHES["default"]["BACKEND"] == "django.core.cache.backends.locmem.LocMemCache":
+    raise ImproperlyConfigured("SHARED_CACHE_REQUIRED is set but CACHE_URL is not a shared cache (e.g. redis://redis:6379/1)")
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -103,10 +173,23 @@ SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "http")
 AUTH_USER_MODEL = "core.User"
 
 JWT_SECRET = env("JWT_SECRET", default=SECRET_KEY)
-JWT_ALGORITHM = "HS256"
+# HS256 signs with JWT_SECRET. RS256/EdDSA sign with the first PEM key in
+# JWT_SIGNING_KEY_FILES; the rest stay published in the JWKS for rotation.
+JWT_ALGORITHM = env("JWT_ALGORITHM", default="HS256")
+JWT_SIGNING_KEY_FILES = env.list("JWT_SIGNING_KEY_FILES", default=[])
+# Where separately deployed services fetch the JWKS (core.jwt_verifier)
+JWT_JWKS_URL = env("JWT_JWKS_URL", default="http://core:8000/api/auth/jwks/")
+JWT_JWKS_CACHE_SECONDS = env.int("JWT_JWKS_CACHE_SECONDS", default=300)
+# Verified tokens memoized per process until exp (0 disables), and the longest
+# a gateway may cache an /api/auth/verify/ answer
+JWT_VERIFY_CACHE_SIZE = env.int("JWT_VERIFY_CACHE_SIZE", default=10000)
+JWT_VERIFY_MAX_AGE = env.int("JWT_VERIFY_MAX_AGE", default=30)
 JWT_ACCESS_TTL_SECONDS = env("JWT_ACCESS_TTL_SECONDS")
 JWT_REFRESH_TTL_SECONDS = env("JWT_REFRESH_TTL_SECONDS")
 
+# Seconds a user's auth state is cached after token verification (0 disables)
+JWT_PRINCIPAL_CACHE_TTL = env.int("JWT_PRINCIPAL_CACHE_TTL", default=60)
+
 JWT_COOKIE_SECURE = env.bool("JWT_COOKIE_SECURE", default=False)
 JWT_COOKIE_SAMESITE = env("JWT_COOKIE_SAMESITE", default="Lax")
 
@@ -126,4 +209,48 @@ CSRF_TRUSTED_ORIGINS = env.list("CSRF_TRUSTED_ORIGINS", default=[])
 # AI Services Configuration (Team 7)
 AI_GENERATOR_API_KEY = env("AI_GENERATOR_API_KEY", default="")
 AI_GENERATOR_BASE_URL = env("AI_GENERATOR_BASE_URL", default="https://api.gpt4-all.xyz/v1")
-AI_GENERATOR_MODEL = env("AI_GENERATOR_MODEL", default="gemini-3-flash-preview")
\ No newline at end of file
+AI_GENERATOR_MODEL = env("AI_GENERATOR_MODEL", default="gemini-3-flash-preview")
+
+# Chunked ASR for long speaking responses (Team 7)
+AI_ASR_CHUNKED = env.bool("AI_ASR_CHUNKED", default=True)
+AI_ASR_CHUNK_SECONDS = env.float("AI_ASR_CHUNK_SECONDS", default=20.0)
+AI_ASR_MAX_WORKERS = env.int("AI_ASR_MAX_WORKERS", default=4)
+
+# Background API request logging (Team 7)
+TEAM7_APILOG_BACKGROUND = env.bool("TEAM7_APILOG_BACKGROUND", default=True)
+TEAM7_APILOG_BATCH_SIZE = env.int("TEAM7_APILOG_BATCH_SIZE", default=200)
+TEAM7_APILOG_FLUSH_MS = env.int("TEAM7_APILOG_FLUSH_MS", default=1000)
+TEAM7_APILOG_MAX_QUEUE = env.int("TEAM7_APILOG_MAX_QUEUE", default=10000)
+TEAM7_APILOG_ROLLUPS = env.bool("TEAM7_APILOG_ROLLUPS", default=True)
+TEAM7_APILOG_RETENTION_DAYS = env.int("TEAM7_APILOG_RETENTION_DAYS", default=7)
+TEAM7_APILOG_ROLLUP_RETENTION_DAYS = env.int("TEAM7_APILOG_ROLLUP_RETENTION_DAYS", default=90)
+TEAM7_GATEWAY_TIMEOUT_MS = env.int("TEAM7_GATEWAY_TIMEOUT_MS", default=60000)
+TEAM7_HEALTH_BACKGROUND = env.bool("TEAM7_HEALTH_BACKGROUND", default=True)
+TEAM7_HEALTH_PROBE_INTERVAL = env.int("TEAM7_HEALTH_PROBE_INTERVAL", default=30)
+TEAM7_HEALTH_PROBE_TIMEOUT = env.int("TEAM7_HEALTH_PROBE_TIMEOUT", default=5)
+# Per-stage request tracing: 'jsonl' (to TEAM7_TRACE_FILE), 'memory' or 'none'
+TEAM7_TRACE_EXPORTER = env("TEAM7_TRACE_EXPORTER", default="")
+TEAM7_TRACE_FILE = env("TEAM7_TRACE_FILE", default="")
+# Admission control on the LLM/ASR-backed submit endpoints (team7.admission)
+TEAM7_ADMISSION_ENABLED = env.bool("TEAM7_ADMISSION_ENABLED", default=True)
+TEAM7_ADMISSION_RATE_PER_MINUTE = env.float("TEAM7_ADMISSION_RATE_PER_MINUTE", default=6)
+TEAM7_ADMISSION_BURST = env.int("TEAM7_ADMISSION_BURST", default=3)
+TEAM7_ADMISSION_CONCURRENCY = {
+    "llm": env.int("TEAM7_ADMISSION_LLM_CONCURRENCY", default=16),
+    "asr": env.int("TEAM7_ADMISSION_ASR_CONCURRENCY", default=8),
+}
+# Renewed while the request runs; bounds how long a dead worker's slot stays taken
+TEAM7_ADMISSION_LEASE_SECONDS = env.int("TEAM7_ADMISSION_LEASE_SECONDS", default=60)
+TEAM7_ADMISSION_BUSY_RETRY_AFTER = env.int("TEAM7_ADMISSION_BUSY_RETRY_AFTER", default=5)
+
+# On-demand request profiling (staff: X-Profile: 1 header or ?__profile=1)
+PROFILING_ENABLED = env.bool("PROFILING_ENABLED", default=False)
+PROFILING_SAMPLE_RATE = env.float("PROFILING_SAMPLE_RATE", default=0.0)
+PROFILING_INTERVAL_MS = env.int("PROFILING_INTERVAL_MS", default=5)
+PROFILING_DIR = env("PROFILING_DIR", default=str(BASE_DIR / "profiles"))
+PROFILING_MAX_BYTES = env.int("PROFILING_MAX_BYTES", default=100 * 1024 * 1024)
+
+# Per-view query budgets and N+1 detection (core.query_budget)
+QUERY_BUDGET_ENABLED = env.bool("QUERY_BUDGET_ENABLED", default=True)
+QUERY_BUDGET_RAISE = env.bool("QUERY_BUDGET_RAISE", default=False)
+QUERY_N_PLUS_ONE_THRESHOLD = env.int("QUERY_N_PLUS_ONE_THRESHOLD", default=5)
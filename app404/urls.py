@@ -19,6 +19,8 @@ from django.urls import path, include
 from django.conf import settings
 from core.web_views import home, microservices_page
 from core.web_auth_views import login_page, signup_page, logout_page
+from core.metrics import metrics_view
+from core.views import jwks
 
 urlpatterns = [
     path("", home, name="home"),
@@ -30,6 +32,8 @@ urlpatterns = [
 
     path("admin/", admin.site.urls),
     path("api/", include("core.urls")),
+    path("metrics", metrics_view, name="metrics"),
+    path(".well-known/jwks.json", jwks, name="jwks"),
 ]
 
 
@@ -1,6 +1,14 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from core.models import ProfileRecord
+from core.profiling import profiles_dir
 
 User = get_user_model()
 
@@ -26,4 +34,47 @@ class UserAdmin(DjangoUserAdmin):
         }),
     )
 
-    username_field = "email"
\ No newline at end of file
+    username_field = "email"
+
+
+@admin.register(ProfileRecord)
+class ProfileRecordAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "method", "path", "user_email", "status_code", "duration_ms", "sample_count", "downloads")
+    list_filter = ("method", "status_code")
+    search_fields = ("path", "user_email")
+    readonly_fields = [f.name for f in ProfileRecord._meta.fields] + ["downloads"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Download")
+    def downloads(self, obj):
+        return format_html(
+            '<a href="{}">flamegraph</a> | <a href="{}">pstats</a>',
+            reverse("admin:core_profilerecord_download", args=[obj.pk, "collapsed"]),
+            reverse("admin:core_profilerecord_download", args=[obj.pk, "pstats"]),
+        )
+
+    def get_urls(self):
+        return [
+            path(
+                "<uuid:pk>/download/<str:kind>/",
+                self.admin_site.admin_view(self.download_view),
+                name="core_profilerecord_download",
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk, kind):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        record = get_object_or_404(ProfileRecord, pk=pk)
+        names = {"collapsed": record.collapsed_name, "pstats": record.pstats_name}
+        if kind not in names:
+            raise Http404
+        file_path = profiles_dir() / names[kind]
+        if not file_path.exists():
+            raise Http404("Profile file was pruned")
+        return FileResponse(open(file_path, "rb"), as_attachment=True, filename=names[kind])
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Register the DB query instrumentation and SQLite tuning before any connection opens
+        from core import metrics, query_budget, sqlite_tuning  # noqa: F401
+        # Principal cache invalidation on user saves
+        from core import middleware  # noqa: F401
@@ -1,10 +1,10 @@
 from functools import wraps
-from django.http import JsonResponse
+from core.json_utils import FastJsonResponse
 
 def api_login_required(view_func):
     @wraps(view_func)
     def _wrapped(request, *args, **kwargs):
         if not request.user.is_authenticated:
-            return JsonResponse({"detail": "Authentication required"}, status=401)
+            return FastJsonResponse({"detail": "Authentication required"}, status=401)
         return view_func(request, *args, **kwargs)
     return _wrapped
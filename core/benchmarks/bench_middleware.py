@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""Benchmark per-request middleware overhead on JWT API traffic.
+
+Compares Django's stock session, auth and message middleware with core's
+path-aware versions, which skip them on /api/ and /team<N>/api/ paths. Each
+request carries both a JWT cookie and a session cookie (a logged-in admin
+browsing the API), the case where the stock stack loads the session and its
+user before the JWT check runs. Reports mean time and queries per request:
+
+    python core/benchmarks/bench_middleware.py [--requests 2000]
+
+Runs against throwaway test databases, so it never touches real data.
+"""
+import argparse
+import os
+import sys
+import time
+
+import django
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app404.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import setup_databases, teardown_databases  # noqa: E402
+
+from core.jwt_utils import create_access_token  # noqa: E402
+from core.query_budget import QueryRecorder  # noqa: E402
+
+STOCK = {
+    'core.middleware.SessionMiddleware': 'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.AuthenticationMiddleware': 'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.MessageMiddleware': 'django.contrib.messages.middleware.MessageMiddleware',
+}
+PATHS = ('/api/auth/me/', '/api/auth/verify/', '/team7/team7/api/ping/')
+
+
+def run(middleware, user, requests):
+    with override_settings(MIDDLEWARE=middleware, ALLOWED_HOSTS=['testserver'], QUERY_BUDGET_ENABLED=False):
+        # A fresh client, since the handler builds its middleware chain once
+        client = Client()
+        client.force_login(user)
+        client.cookies['access_token'] = create_access_token(user)
+        for path in PATHS:  # warm up caches and the handler
+            client.get(path)
+        with QueryRecorder() as recorder:
+            start = time.perf_counter()
+            for i in range(requests):
+                response = client.get(PATHS[i % len(PATHS)])
+                assert response.status_code == 200, response.status_code
+            elapsed = time.perf_counter() - start
+    return elapsed / requests * 1e6, recorder.count / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        cache.clear()
+        user = get_user_model().objects.create_superuser(email='bench@test.com', password='bench-pass-1')
+
+        stock = [STOCK.get(path, path) for path in settings.MIDDLEWARE]
+        print(f'{"stack":<12} {"us/request":>12} {"queries/request":>16}')
+        for label, middleware in (('stock', stock), ('path-aware', list(settings.MIDDLEWARE))):
+            per_request_us, queries = run(middleware, user, args.requests)
+            print(f'{label:<12} {per_request_us:>12.1f} {queries:>16.2f}')
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
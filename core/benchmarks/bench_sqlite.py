@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""Benchmark concurrent SQLite writes with and without core.sqlite_tuning.
+
+Each worker process stands in for a gunicorn worker: it reads the latest
+rows (a history/analytics page) and then inserts one APILog-like row in its
+own transaction, like Django with autocommit. Runs with 4, 8 and 16 workers
+against a throwaway database file for the stock SQLite settings and for
+SQLITE_PRAGMAS. Reports committed writes per second and "database is locked"
+failures:
+
+    python core/benchmarks/bench_sqlite.py [--seconds 3] [--workers 4 8 16]
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import django
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app404.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from core.sqlite_tuning import DEFAULT_PRAGMAS, apply_pragmas  # noqa: E402
+
+SCHEMA = """
+CREATE TABLE api_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp REAL NOT NULL,
+    endpoint TEXT NOT NULL,
+    status_code INTEGER NOT NULL,
+    latency_ms INTEGER NOT NULL
+)
+"""
+
+
+def worker(path, pragmas, seconds, results):
+    # Django's SQLite backend: Python's default 5 s timeout, autocommit
+    db = sqlite3.connect(path, timeout=5, isolation_level=None)
+    apply_pragmas(db, pragmas)
+    writes = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            db.execute("SELECT * FROM api_log ORDER BY id DESC LIMIT 20").fetchall()
+            db.execute("BEGIN")
+            db.execute(
+                "INSERT INTO api_log (timestamp, endpoint, status_code, latency_ms) VALUES (?, ?, ?, ?)",
+                (time.time(), '/team7/api/submit/writing/', 200, 42),
+            )
+            db.execute("COMMIT")
+            writes += 1
+        except sqlite3.OperationalError:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            errors += 1
+    db.close()
+    results.put((writes, errors))
+
+
+def run(pragmas, workers, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.sqlite3')
+        db = sqlite3.connect(path)
+        db.execute(SCHEMA)
+        db.commit()
+        db.close()
+
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=worker, args=(path, pragmas, seconds, results)) for _ in range(workers)]
+        for proc in procs:
+            proc.start()
+        totals = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+    return sum(w for w, _ in totals) / seconds, sum(e for _, e in totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--workers', type=int, nargs='+', default=[4, 8, 16])
+    args = parser.parse_args()
+
+    tuned = getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+    print(f'{"profile":<8} {"workers":>8} {"writes/s":>10} {"locked":>8}')
+    for workers in args.workers:
+        for label, pragmas in (('stock', {}), ('tuned', tuned)):
+            per_second, errors = run(pragmas, workers, args.seconds)
+            print(f'{label:<8} {workers:>8} {per_second:>10.0f} {errors:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,127 @@
+"""
+Per-team database routing with optional read replicas.
+
+Each team app's models live on the alias named after the app (team7, ...).
+If ``TEAM7_REPLICA_DATABASE_URL`` is set (comma-separated for several), its
+replicas are added as ``team7_replica1``, ``team7_replica2``, ... and listed
+in ``DATABASE_REPLICAS``; reads are then spread across them at random, while
+writes always go to the primary.
+
+Replicas lag, so reads stick to the primary (read-your-writes):
+
+* inside a transaction on the primary
+* for the rest of a request once it has written to the team's database
+* for that user's requests during DB_REPLICA_PIN_SECONDS after the write,
+  tracked in the shared cache by ReplicaPinningMiddleware
+
+Writes made outside a request (management commands, background threads)
+don't pin anything.
+"""
+
+import random
+from contextvars import ContextVar
+
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+DEFAULT_PIN_SECONDS = 10
+
+# Per-request pinning state, set by ReplicaPinningMiddleware
+_request_state = ContextVar("core_db_pin_state", default=None)
+
+
+def _pin_key(user_id):
+    return f"core:dbpin:{user_id}"
+
+
+class _PinState:
+    """Primaries that the current request must read from."""
+
+    def __init__(self, request):
+        self.request = request
+        self.written = set()
+        self._pinned = None  # loaded from the cache on first replica read
+
+    def pinned(self):
+        if self._pinned is None:
+            user = getattr(self.request, "user", None)
+            if user is not None and user.is_authenticated:
+                self._pinned = set(cache.get(_pin_key(user.pk)) or ())
+            else:
+                self._pinned = set()
+        return self._pinned | self.written
+
+    def save(self):
+        user = getattr(self.request, "user", None)
+        if not self.written or user is None or not user.is_authenticated:
+            return
+        key = _pin_key(user.pk)
+        seconds = getattr(settings, "DB_REPLICA_PIN_SECONDS", DEFAULT_PIN_SECONDS)
+        cache.set(key, frozenset(self.written | set(cache.get(key) or ())), seconds)
+
+
+def _replicas(alias):
+    return getattr(settings, "DATABASE_REPLICAS", {}).get(alias, ())
+
+
+def _primary_of(alias):
+    for primary, replicas in getattr(settings, "DATABASE_REPLICAS", {}).items():
+        if alias in replicas:
+            return primary
+    return alias
+
 
 class TeamPerAppRouter:
     def db_for_read(self, model, **hints):
-        if model._meta.app_label in settings.TEAM_APPS:
-            return model._meta.app_label
-        return None
+        if model._meta.app_label not in settings.TEAM_APPS:
+            return None
+        alias = model._meta.app_label
+        replicas = _replicas(alias)
+        if not replicas or connections[alias].in_atomic_block:
+            return alias
+        state = _request_state.get()
+        if state is not None and alias in state.pinned():
+            return alias
+        return random.choice(replicas)
 
     def db_for_write(self, model, **hints):
-        if model._meta.app_label in settings.TEAM_APPS:
-            return model._meta.app_label
+        if model._meta.app_label not in settings.TEAM_APPS:
+            return None
+        alias = model._meta.app_label
+        state = _request_state.get()
+        if state is not None and _replicas(alias):
+            state.written.add(alias)
+        return alias
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # A primary and its replicas hold the same data
+        if _primary_of(obj1._state.db) == _primary_of(obj2._state.db):
+            return True
         return None
 
     def allow_migrate(self, db, app_label, model_name=None, **hints):
         if app_label in settings.TEAM_APPS:
             return db == app_label
         return db == "default"
+
+
+class ReplicaPinningMiddleware:
+    """Track team DB writes per request and pin the user to the primary afterwards.
+
+    Place after JWTAuthenticationMiddleware so request.user is set.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "DATABASE_REPLICAS", None):
+            return self.get_response(request)
+        state = _PinState(request)
+        token = _request_state.set(state)
+        try:
+            return self.get_response(request)
+        finally:
+            _request_state.reset(token)
+            state.save()
@@ -0,0 +1,130 @@
+"""
+Fast JSON encoding, request parsing and response compression.
+
+Uses orjson when it is installed and falls back to the stdlib encoder with
+DjangoJSONEncoder otherwise; both handle UUID, datetime/date/time and
+Decimal values natively. Large responses can be gzip- or (when the brotli
+package is available) brotli-compressed according to the client's
+Accept-Encoding header.
+"""
+
+import gzip
+import json
+import re
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# orjson.JSONDecodeError subclasses this, so callers can catch one type
+JSONDecodeError = json.JSONDecodeError
+
+COMPRESS_MIN_BYTES = 1024
+_ACCEPT_ENCODING_RE = re.compile(r'(?:^|,)\s*(br|gzip)\s*(?:;\s*q=([0-9.]+))?', re.IGNORECASE)
+
+
+def _default(obj):
+    # Only reached for types orjson does not serialize itself
+    if isinstance(obj, Decimal):
+        return str(obj)
+    return DjangoJSONEncoder().default(obj)
+
+
+def dumps(data):
+    """Serialize ``data`` to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads(body):
+    """Parse JSON from bytes or str; raises JSONDecodeError on bad input."""
+    if orjson is not None:
+        return orjson.loads(body)
+    try:
+        return json.loads(body)
+    except UnicodeDecodeError as e:
+        # json.loads decodes bytes first; orjson reports bad UTF-8 as JSONDecodeError
+        raise JSONDecodeError(f"Invalid UTF-8: {e.reason}", '', 0) from e
+
+
+def parse_json_body(request):
+    """Parse a request's JSON body; raises JSONDecodeError on bad input."""
+    return loads(request.body)
+
+
+def negotiate_encoding(request):
+    """Pick 'br' or 'gzip' from the request's Accept-Encoding, or None."""
+    offered = {}
+    for name, q in _ACCEPT_ENCODING_RE.findall(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        try:
+            offered[name.lower()] = float(q) if q else 1.0
+        except ValueError:
+            continue
+    if brotli is not None and offered.get('br', 0) > 0:
+        return 'br'
+    if offered.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+def compress_response(request, response, min_bytes=None):
+    """Compress a JSON response body in place when the client accepts it.
+
+    Small, streaming or already-encoded responses are left untouched. A
+    strong ETag on an encoded response is made weak (RFC 9110 8.8.1).
+    """
+    min_bytes = getattr(settings, 'JSON_COMPRESS_MIN_BYTES', COMPRESS_MIN_BYTES) if min_bytes is None else min_bytes
+    if response.streaming or response.has_header('Content-Encoding'):
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if len(response.content) < min_bytes:
+        return response
+
+    encoding = negotiate_encoding(request)
+    if encoding == 'br':
+        body = brotli.compress(response.content, quality=4)
+    elif encoding == 'gzip':
+        body = gzip.compress(response.content, compresslevel=5, mtime=0)
+    else:
+        return response
+
+    if len(body) < len(response.content):
+        response.content = body
+        response['Content-Encoding'] = encoding
+        response['Content-Length'] = str(len(body))
+        etag = response.get('ETag')
+        if etag and not etag.startswith('W/'):
+            # The encoded bytes differ, so a strong validator can't be shared
+            response['ETag'] = f'W/{etag}'
+    return response
+
+
+class FastJsonResponse(HttpResponse):
+    """Drop-in replacement for django.http.JsonResponse using :func:`dumps`.
+
+    The original payload is kept on ``response.data`` so middleware can read
+    it without parsing the body again.
+    """
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the "
+                "safe parameter to False."
+            )
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
+        self.data = data
@@ -1,12 +1,74 @@
+import base64
+import hashlib
+import json
+import threading
 import time
+from collections import OrderedDict
+from functools import lru_cache
+
 import jwt
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# Algorithms signed with a private key from JWT_SIGNING_KEY_FILES and
+# verifiable by anyone holding the published JWKS
+ASYMMETRIC_ALGORITHMS = ("RS256", "EdDSA")
 
 
 def _now() -> int:
     return int(time.time())
 
 
+def _jwk_thumbprint(jwk: dict) -> str:
+    """RFC 7638 thumbprint, used as the key id."""
+    required = {"RSA": ("e", "kty", "n"), "OKP": ("crv", "kty", "x")}[jwk["kty"]]
+    canonical = json.dumps({k: jwk[k] for k in required}, separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(hashlib.sha256(canonical.encode()).digest()).rstrip(b"=").decode()
+
+
+@lru_cache(maxsize=None)
+def _load_signing_keys(algorithm: str, key_files: tuple) -> tuple:
+    """Load PEM private keys once per configuration.
+
+    Returns:
+        tuple: ((kid, private_key, public_jwk), ...) in JWT_SIGNING_KEY_FILES order
+    """
+    from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
+    keys = []
+    for path in key_files:
+        with open(path, "rb") as fh:
+            private_key = load_pem_private_key(fh.read(), password=None)
+        jwk = jwt.get_algorithm_by_name(algorithm).to_jwk(private_key.public_key(), as_dict=True)
+        kid = _jwk_thumbprint(jwk)
+        keys.append((kid, private_key, dict(jwk, kid=kid, use="sig", alg=algorithm)))
+    return tuple(keys)
+
+
+def signing_keys() -> tuple:
+    """Configured asymmetric keys; the first signs, the rest only verify (rotation)."""
+    if settings.JWT_ALGORITHM not in ASYMMETRIC_ALGORITHMS:
+        return ()
+    files = tuple(str(f) for f in getattr(settings, "JWT_SIGNING_KEY_FILES", ()))
+    if not files:
+        raise jwt.InvalidKeyError(f"{settings.JWT_ALGORITHM} requires JWT_SIGNING_KEY_FILES")
+    return _load_signing_keys(settings.JWT_ALGORITHM, files)
+
+
+def public_jwks() -> dict:
+    """Public keys as a JWK Set (empty for HS256)."""
+    return {"keys": [jwk for _, _, jwk in signing_keys()]}
+
+
+def _encode(payload: dict) -> str:
+    keys = signing_keys()
+    if not keys:
+        return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    kid, private_key, _ = keys[0]
+    return jwt.encode(payload, private_key, algorithm=settings.JWT_ALGORITHM, headers={"kid": kid})
+
+
 def create_access_token(user) -> str:
     payload = {
         "type": "access",
@@ -16,7 +78,7 @@ def create_access_token(user) -> str:
         "iat": _now(),
         "exp": _now() + settings.JWT_ACCESS_TTL_SECONDS,
     }
-    return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    return _encode(payload)
 
 
 def create_refresh_token(user) -> str:
@@ -27,8 +89,82 @@ def create_refresh_token(user) -> str:
         "iat": _now(),
         "exp": _now() + settings.JWT_REFRESH_TTL_SECONDS,
     }
-    return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    return _encode(payload)
 
 
 def decode_token(token: str) -> dict:
-    return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    keys = signing_keys()
+    if not keys:
+        return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    kid = jwt.get_unverified_header(token).get("kid")
+    for key_id, private_key, _ in keys:
+        if key_id == kid:
+            return jwt.decode(token, private_key.public_key(), algorithms=[settings.JWT_ALGORITHM])
+    raise jwt.InvalidTokenError("Unknown signing key")
+
+
+class VerifiedTokenCache:
+    """Process-local LRU of verified token payloads, keyed by SHA-256 of the token.
+
+    Entries are served until the token's ``exp``, so a repeat token skips
+    signature verification. Revocation is still enforced by the principal
+    check (token_version) in JWTAuthenticationMiddleware.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                return None
+            if payload.get("exp", 0) <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def set(self, key, payload, maxsize):
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache()
+
+
+def decode_token_cached(token: str) -> dict:
+    """:func:`decode_token` with verified payloads memoized until they expire."""
+    maxsize = getattr(settings, "JWT_VERIFY_CACHE_SIZE", 10000)
+    if not maxsize:
+        return decode_token(token)
+    key = hashlib.sha256(token.encode()).digest()
+    payload = verified_tokens.get(key)
+    if payload is None:
+        payload = decode_token(token)
+        verified_tokens.set(key, payload, maxsize)
+    return payload
+
+
+@receiver(setting_changed)
+def _reset_verified_tokens(setting, **kwargs):
+    if setting.startswith("JWT_"):
+        verified_tokens.clear()
+
+
+def token_from_request(request):
+    """The access token from the access_token cookie or an Authorization: Bearer header."""
+    token = request.COOKIES.get("access_token")
+    if not token:
+        auth = request.headers.get("Authorization", "")
+        if auth.startswith("Bearer "):
+            token = auth.split(" ", 1)[1].strip()
+    return token or None
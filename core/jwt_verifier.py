@@ -0,0 +1,150 @@
+"""
+Local verification of core-issued access tokens from the published JWKS.
+
+With JWT_ALGORITHM set to RS256 or EdDSA, core signs tokens with a private
+key and publishes the public keys at ``/api/auth/jwks/`` (and
+``/.well-known/jwks.json``). A team service deployed on its own can then
+authenticate requests without the shared secret and without calling
+``/api/auth/verify/`` per request:
+
+    from core.jwt_verifier import authenticate_request
+
+    payload = authenticate_request(request)   # None if missing or invalid
+    if payload is None:
+        return FastJsonResponse({"detail": "Authentication required"}, status=401)
+    user_id = payload["sub"]
+
+The key set is fetched from JWT_JWKS_URL and cached in process for
+JWT_JWKS_CACHE_SECONDS. A token signed with an unknown ``kid`` (right after
+a key rotation) triggers an early refetch. Fetches happen at most every
+MIN_REFRESH_INTERVAL seconds, so forged kids or an unreachable core can't
+turn into a fetch per request. If a refetch fails, the keys already cached
+stay in use.
+
+Verification is stateless: a revoked token (logout bumps token_version)
+stays valid here until it expires, so keep JWT_ACCESS_TTL_SECONDS short.
+"""
+
+import json
+import logging
+import threading
+import time
+import urllib.request
+
+import jwt
+from django.conf import settings
+
+from core.jwt_utils import ASYMMETRIC_ALGORITHMS, token_from_request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SECONDS = 300
+MIN_REFRESH_INTERVAL = 30
+
+
+def _fetch_url(url, timeout):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+class JWKSVerifier:
+    """Verify JWTs against a remote JWK Set with an in-process key cache.
+
+    Args:
+        jwks_url: URL of the JWK Set
+        cache_seconds: How long fetched keys are trusted before a refetch
+        timeout: JWKS fetch timeout in seconds
+        fetch: Callable(url, timeout) -> JWKS dict (defaults to an HTTP GET)
+    """
+
+    def __init__(self, jwks_url, cache_seconds=DEFAULT_CACHE_SECONDS, timeout=5, fetch=None):
+        self.jwks_url = jwks_url
+        self.cache_seconds = cache_seconds
+        self.timeout = timeout
+        self._fetch = fetch or _fetch_url
+        self._keys = {}
+        self._fetched_at = None
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()
+
+    def verify(self, token, token_type="access"):
+        """Return the verified payload.
+
+        Raises:
+            jwt.InvalidTokenError: Bad signature, unknown key, expired, or wrong type
+        """
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise jwt.InvalidAlgorithmError(f"Algorithm {algorithm} not accepted")
+
+        key = self._key_for(header.get("kid"))
+        if key is None or key.algorithm_name != algorithm:
+            raise jwt.InvalidTokenError("Unknown signing key")
+
+        payload = jwt.decode(token, key.key, algorithms=[algorithm])
+        if token_type and payload.get("type") != token_type:
+            raise jwt.InvalidTokenError(f"Expected a {token_type} token")
+        return payload
+
+    def _key_for(self, kid):
+        # Refetch when the cache expired or for an unknown kid (possibly a
+        # freshly rotated key), never more often than MIN_REFRESH_INTERVAL
+        expired = self._fetched_at is None or time.monotonic() - self._fetched_at > self.cache_seconds
+        if expired or kid not in self._keys:
+            self._refresh()
+        return self._keys.get(kid)
+
+    def _refresh(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._last_attempt and now - self._last_attempt < MIN_REFRESH_INTERVAL:
+                return
+            self._last_attempt = now
+            try:
+                data = self._fetch(self.jwks_url, self.timeout)
+            except Exception as e:
+                # Keep serving with the keys we already have
+                logger.warning(f"Failed to refresh JWKS from {self.jwks_url}: {str(e)}")
+                return
+
+            keys = {}
+            for jwk in data.get("keys", []):
+                if jwk.get("use", "sig") != "sig" or not jwk.get("kid"):
+                    continue
+                try:
+                    keys[jwk["kid"]] = jwt.PyJWK(jwk, algorithm=jwk.get("alg"))
+                except jwt.PyJWTError as e:
+                    logger.warning(f"Skipping unusable JWK {jwk['kid']}: {str(e)}")
+            self._keys = keys
+            self._fetched_at = now
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_verifier():
+    """Process-wide verifier for JWT_JWKS_URL."""
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                _verifier = JWKSVerifier(
+                    settings.JWT_JWKS_URL,
+                    cache_seconds=getattr(settings, "JWT_JWKS_CACHE_SECONDS", DEFAULT_CACHE_SECONDS),
+                )
+    return _verifier
+
+
+def authenticate_request(request, verifier=None):
+    """Verified access-token payload for the request, or None (sets request.jwt_payload)."""
+    token = token_from_request(request)
+    if not token:
+        return None
+    try:
+        payload = (verifier or get_verifier()).verify(token)
+    except jwt.PyJWTError:
+        return None
+    request.jwt_payload = payload
+    return payload
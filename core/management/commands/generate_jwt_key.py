@@ -0,0 +1,45 @@
+"""
+Management command to create a JWT signing key for RS256/EdDSA tokens.
+
+Rotation: generate a new key, put it first in JWT_SIGNING_KEY_FILES and keep
+the old one after it (new tokens are signed with the first key; all keys
+stay in the JWKS). Drop the old file once JWT_REFRESH_TTL_SECONDS has passed.
+
+Usage:
+    python manage.py generate_jwt_key /run/secrets/jwt-2026-10.pem --algorithm EdDSA
+"""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.jwt_utils import ASYMMETRIC_ALGORITHMS, _load_signing_keys
+
+
+class Command(BaseCommand):
+    help = 'Writes a new private key (PEM) for JWT signing and prints its key id'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Where to write the PEM private key')
+        parser.add_argument('--algorithm', choices=ASYMMETRIC_ALGORITHMS, default='RS256')
+
+    def handle(self, *args, **options):
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+        path = options['path']
+        if os.path.exists(path):
+            raise CommandError(f'{path} already exists')
+
+        if options['algorithm'] == 'EdDSA':
+            key = ed25519.Ed25519PrivateKey.generate()
+        else:
+            key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(pem)
+
+        kid = _load_signing_keys(options['algorithm'], (path,))[0][0]
+        self.stdout.write(f'Wrote {options["algorithm"]} key {kid} to {path}')
@@ -0,0 +1,185 @@
+"""
+Prometheus metrics for the whole project.
+
+Exposes request counts, latency histograms and in-flight requests (from
+PrometheusMetricsMiddleware), external AI call counts/durations, response
+cache hits, admission-control rejections, database connections opened and
+database query counts/durations (all per DB alias) at ``/metrics`` in the text
+exposition format.
+
+Under gunicorn, set ``PROMETHEUS_MULTIPROC_DIR`` to an empty, writable
+directory (cleared before start) so every worker writes its values to
+memory-mapped files there; the view then aggregates all workers' files, so
+a scrape never touches the database. Without it, each process reports only
+its own metrics.
+
+prometheus_client is optional: without it the helpers below are no-ops and
+``/metrics`` answers 501.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:
+    prometheus_client = None
+
+# Request latencies span cached reads (ms) to LLM evaluations (tens of s)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 45, 60, 90)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def observe(self, amount):
+        pass
+
+
+if prometheus_client is not None:
+    REQUESTS = Counter(
+        'http_requests_total', 'HTTP requests by route, method and status', ['route', 'method', 'status']
+    )
+    REQUEST_LATENCY = Histogram(
+        'http_request_duration_seconds', 'HTTP request latency', ['route', 'method'], buckets=LATENCY_BUCKETS
+    )
+    IN_FLIGHT = Gauge(
+        'http_requests_in_progress', 'HTTP requests currently being served', multiprocess_mode='livesum'
+    )
+    EXTERNAL_CALLS = Counter(
+        'external_calls_total', 'Calls to external AI services', ['service', 'operation', 'outcome']
+    )
+    EXTERNAL_LATENCY = Histogram(
+        'external_call_duration_seconds', 'External AI call latency', ['service', 'operation'],
+        buckets=LATENCY_BUCKETS
+    )
+    CACHE_REQUESTS = Counter('cache_requests_total', 'Response cache lookups', ['cache', 'result'])
+    ADMISSION_REJECTIONS = Counter(
+        'admission_rejections_total', 'Requests rejected by admission control', ['endpoint', 'reason']
+    )
+    DB_CONNECTIONS = Counter(
+        'db_connections_opened_total', 'New database connections (persistent ones are reused)', ['alias']
+    )
+    DB_QUERIES = Counter('db_queries_total', 'Database queries executed', ['alias'])
+    DB_LATENCY = Histogram('db_query_duration_seconds', 'Database query latency', ['alias'], buckets=DB_BUCKETS)
+else:
+    REQUESTS = REQUEST_LATENCY = IN_FLIGHT = EXTERNAL_CALLS = EXTERNAL_LATENCY = _NoopMetric()
+    CACHE_REQUESTS = ADMISSION_REJECTIONS = DB_CONNECTIONS = DB_QUERIES = DB_LATENCY = _NoopMetric()
+
+
+@contextmanager
+def observe_external(service, operation):
+    """Time an external call, e.g. ``with observe_external('llm', 'writing'):``.
+
+    The call is counted as an error if the block raises.
+    """
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'success'
+    finally:
+        EXTERNAL_CALLS.labels(service, operation, outcome).inc()
+        EXTERNAL_LATENCY.labels(service, operation).observe(time.perf_counter() - start)
+
+
+def record_cache(cache_name, hit):
+    CACHE_REQUESTS.labels(cache_name, 'hit' if hit else 'miss').inc()
+
+
+def record_admission_rejection(endpoint, reason):
+    ADMISSION_REJECTIONS.labels(endpoint, reason).inc()
+
+
+class _QueryTimer:
+    """Execute wrapper counting and timing every query on one connection."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            DB_QUERIES.labels(self.alias).inc()
+            DB_LATENCY.labels(self.alias).observe(time.perf_counter() - start)
+
+
+def _instrument_connection(sender, connection, **kwargs):
+    DB_CONNECTIONS.labels(connection.alias).inc()
+    if not any(isinstance(w, _QueryTimer) for w in connection.execute_wrappers):
+        connection.execute_wrappers.append(_QueryTimer(connection.alias))
+
+
+if prometheus_client is not None:
+    connection_created.connect(_instrument_connection, dispatch_uid='core.metrics.instrument_connection')
+
+
+def _route(request):
+    # Route patterns (not raw paths) keep label cardinality bounded
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.route or match.view_name or 'unmatched'
+
+
+class PrometheusMetricsMiddleware:
+    """Count, time and track in-flight requests. Place first in MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            IN_FLIGHT.dec()
+            route = _route(request)
+            REQUESTS.labels(route, request.method, str(status)).inc()
+            REQUEST_LATENCY.labels(route, request.method).observe(time.perf_counter() - start)
+
+
+def metrics_view(request):
+    """Serve all metrics in the Prometheus text format.
+
+    If METRICS_TOKEN is set, scrapers must send ``Authorization: Bearer <token>``.
+    """
+    if prometheus_client is None:
+        return HttpResponse('prometheus_client is not installed\n', status=501, content_type='text/plain')
+
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization', '') != f'Bearer {token}':
+        return HttpResponse(status=401)
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return HttpResponse(prometheus_client.generate_latest(registry), content_type=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def child_exit(server, worker):
+    """gunicorn hook: drop a dead worker's live gauges from the shared directory."""
+    if prometheus_client is not None and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
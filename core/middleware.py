@@ -1,11 +1,104 @@
+import re
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages import middleware as messages_middleware
+from django.contrib.sessions import middleware as sessions_middleware
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.deprecation import MiddlewareMixin
 from jwt import ExpiredSignatureError, InvalidTokenError
 
-from core.jwt_utils import decode_token
+from core.jwt_utils import decode_token_cached, token_from_request
 
 User = get_user_model()
 
+# Fields cached per user, in model order as from_db() expects; everything
+# else (password, ...) stays deferred
+PRINCIPAL_FIELDS = tuple(
+    f.attname for f in User._meta.concrete_fields
+    if f.attname in {
+        "id", "email", "first_name", "last_name", "age",
+        "is_active", "is_staff", "is_superuser", "token_version",
+    }
+)
+PRINCIPAL_CACHE_TTL = 60
+
+
+def _principal_key(user_id):
+    return f"core:principal:v1:{user_id}"
+
+
+def get_principal(user_id):
+    """Return the active user with this id, from the shared cache when possible.
+
+    Cached users are built with only PRINCIPAL_FIELDS loaded, so other
+    fields are fetched on access and ``save()`` only writes loaded fields.
+    Inactive or missing users are cached as None.
+    """
+    ttl = getattr(settings, "JWT_PRINCIPAL_CACHE_TTL", PRINCIPAL_CACHE_TTL)
+    key = _principal_key(user_id)
+    values = cache.get(key) if ttl else None
+    if values is None:
+        row = User.objects.filter(id=user_id, is_active=True).values_list(*PRINCIPAL_FIELDS).first()
+        values = tuple(row) if row else ()
+        if ttl:
+            cache.set(key, values, ttl)
+    if not values:
+        return None
+    return User.from_db(router.db_for_read(User), PRINCIPAL_FIELDS, values)
+
+
+def invalidate_principal(user_id):
+    cache.delete(_principal_key(user_id))
+
+
+@receiver(post_save, sender=User, dispatch_uid="core.middleware.user_saved")
+@receiver(post_delete, sender=User, dispatch_uid="core.middleware.user_deleted")
+def _invalidate_on_change(sender, instance, using, **kwargs):
+    # Logout bumps token_version and deactivation flips is_active through
+    # save(); queryset .update() calls must invalidate explicitly
+    invalidate_principal(instance.pk)
+    transaction.on_commit(lambda: invalidate_principal(instance.pk), using=using)
+
+
+# Stateless JSON APIs authenticated only by JWT: /api/... and /team<N>/api/...
+# (team apps may nest their namespace, e.g. /team7/team7/api/...)
+STATELESS_API_PATH = re.compile(r"^/(?:team\d+/)*api/")
+
+
+def is_stateless_api_path(path):
+    return STATELESS_API_PATH.match(path) is not None
+
+
+class _SkipForStatelessAPI:
+    """Bypass the Django middleware this is mixed into on stateless API paths."""
+
+    def __call__(self, request):
+        # In async mode get_response returns an awaitable, which the caller awaits
+        if is_stateless_api_path(request.path_info):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+# Drop-in replacements for the Django classes (subclasses, so admin's
+# system checks still find them). API requests then never load a session
+# or message storage; JWTAuthenticationMiddleware alone sets request.user.
+class SessionMiddleware(_SkipForStatelessAPI, sessions_middleware.SessionMiddleware):
+    pass
+
+
+class AuthenticationMiddleware(_SkipForStatelessAPI, auth_middleware.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(_SkipForStatelessAPI, messages_middleware.MessageMiddleware):
+    pass
+
 
 class JWTAuthenticationMiddleware(MiddlewareMixin):
     """
@@ -13,26 +106,24 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
     """
 
     def process_request(self, request):
-        if hasattr(request, "user") and getattr(request.user, "is_authenticated", False):
+        if not hasattr(request, "user"):
+            # Stateless API path: no session-based user to fall back on
+            request.user = AnonymousUser()
+        elif getattr(request.user, "is_authenticated", False):
             return
 
-        token = request.COOKIES.get("access_token")
-        if not token:
-            auth = request.headers.get("Authorization", "")
-            if auth.startswith("Bearer "):
-                token = auth.split(" ", 1)[1].strip()
-
+        token = token_from_request(request)
         if not token:
             return
 
         try:
-            payload = decode_token(token)
+            payload = decode_token_cached(token)
             if payload.get("type") != "access":
                 return
 
             user_id = payload.get("sub")
             tv = payload.get("tv")
-            user = User.objects.filter(id=user_id, is_active=True).first()
+            user = get_principal(user_id)
             if not user:
                 return
 
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:48
+
+from django.db import migrations, models
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileRecord',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('user_email', models.CharField(blank=True, max_length=254)),
+                ('status_code', models.PositiveIntegerField()),
+                ('duration_ms', models.PositiveIntegerField()),
+                ('sample_count', models.PositiveIntegerField()),
+                ('interval_ms', models.PositiveIntegerField()),
+                ('size_bytes', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -1,5 +1,7 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.utils import timezone
 
@@ -50,3 +52,47 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return self.email
+
+
+class ProfileRecord(models.Model):
+    """A stored request profile (files live in PROFILING_DIR, see core.profiling)."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    user_email = models.CharField(max_length=254, blank=True)
+    status_code = models.PositiveIntegerField()
+    duration_ms = models.PositiveIntegerField()
+    sample_count = models.PositiveIntegerField()
+    interval_ms = models.PositiveIntegerField()
+    size_bytes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms} ms)"
+
+    @property
+    def collapsed_name(self):
+        return f"{self.id}.collapsed"
+
+    @property
+    def pstats_name(self):
+        return f"{self.id}.pstats"
+
+
+@receiver(post_delete, sender=ProfileRecord, dispatch_uid="core.models.profile_deleted")
+def _delete_profile_files(sender, instance, using, **kwargs):
+    # A signal rather than delete(), so admin bulk deletes and QuerySet.delete()
+    # also free the disk; files go once the row deletion commits
+    from core.profiling import profiles_dir
+
+    paths = [profiles_dir() / name for name in (instance.collapsed_name, instance.pstats_name)]
+
+    def _unlink():
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+    transaction.on_commit(_unlink, using=using)
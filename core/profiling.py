@@ -0,0 +1,200 @@
+"""
+On-demand sampling profiler for live requests.
+
+``ProfilingMiddleware`` profiles a request when a staff user asks for it
+(``X-Profile: 1`` header or ``?__profile=1``) or, optionally, for a random
+PROFILING_SAMPLE_RATE fraction of all requests. While the request runs, a
+sampler thread records the request thread's Python stack every
+PROFILING_INTERVAL_MS; the request itself is not instrumented, so the
+overhead stays at a few percent even for long LLM calls.
+
+Each profile is stored under PROFILING_DIR as:
+
+* ``<id>.collapsed``: collapsed stacks, one ``frame;frame;... count`` per
+  line, ready for flamegraph.pl / speedscope
+* ``<id>.pstats``: the same samples as a pstats dump, readable with
+  ``pstats.Stats`` or snakeviz (times are sample estimates, call counts
+  are sample counts)
+
+and listed as a ProfileRecord in the Django admin. Once the directory
+holds more than PROFILING_MAX_BYTES, the oldest profiles are deleted.
+"""
+
+import logging
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Sum
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAM = "__profile"
+DEFAULT_INTERVAL_MS = 5
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+
+def profiles_dir() -> Path:
+    return Path(getattr(settings, "PROFILING_DIR", settings.BASE_DIR / "profiles"))
+
+
+class StackSampler:
+    """Sample one thread's Python stack at a fixed interval from a helper thread."""
+
+    def __init__(self, thread_id=None, interval_ms=DEFAULT_INTERVAL_MS):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval_ms / 1000
+        self.samples = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+        self.duration_ms = 0
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration_ms = int((time.perf_counter() - self._started) * 1000)
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples[tuple(stack)] += 1
+            self.sample_count += 1
+
+    def collapsed(self) -> str:
+        """Samples in the collapsed-stack format used by flamegraph tools."""
+        lines = []
+        for stack, count in self.samples.most_common():
+            frames = ";".join(f"{name} ({os.path.basename(filename)}:{line})" for filename, line, name in stack)
+            lines.append(f"{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def pstats_data(self) -> dict:
+        """Samples as a ``pstats.Stats``-loadable dict.
+
+        Self time comes from leaf samples, cumulative time from every sample
+        a function appears in (once per sample, so recursion isn't double
+        counted), and callers from adjacent frames.
+        """
+        stats = {}
+        for stack, count in self.samples.items():
+            seconds = count * self.interval
+            for func in set(stack):
+                entry = stats.setdefault(func, [0, 0, 0.0, 0.0, {}])
+                entry[0] += count
+                entry[1] += count
+                entry[3] += seconds
+            stats[stack[-1]][2] += seconds
+            for caller, callee in zip(stack, stack[1:]):
+                callers = stats[callee][4]
+                callers[caller] = callers.get(caller, 0) + count
+        return {func: tuple(entry) for func, entry in stats.items()}
+
+
+def should_profile(request) -> bool:
+    if not getattr(settings, "PROFILING_ENABLED", False):
+        return False
+    user = getattr(request, "user", None)
+    if getattr(user, "is_staff", False) and (
+        request.headers.get(PROFILE_HEADER) == "1" or request.GET.get(PROFILE_QUERY_PARAM) == "1"
+    ):
+        return True
+    rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+    return rate > 0 and random.random() < rate
+
+
+def save_profile(request, sampler, status_code):
+    """Write the profile files and their ProfileRecord, then enforce the size limit."""
+    from core.models import ProfileRecord
+
+    record = ProfileRecord(
+        method=request.method,
+        path=request.path[:500],
+        user_email=getattr(getattr(request, "user", None), "email", "") or "",
+        status_code=status_code,
+        duration_ms=sampler.duration_ms,
+        sample_count=sampler.sample_count,
+        interval_ms=int(sampler.interval * 1000),
+    )
+    directory = profiles_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    collapsed = sampler.collapsed().encode()
+    (directory / record.collapsed_name).write_bytes(collapsed)
+    pstats_bytes = marshal.dumps(sampler.pstats_data())
+    (directory / record.pstats_name).write_bytes(pstats_bytes)
+    record.size_bytes = len(collapsed) + len(pstats_bytes)
+    record.save()
+    prune_profiles()
+    return record
+
+
+def prune_profiles(max_bytes=None):
+    """Delete the oldest profiles until the stored total fits in PROFILING_MAX_BYTES."""
+    from core.models import ProfileRecord
+
+    if max_bytes is None:
+        max_bytes = getattr(settings, "PROFILING_MAX_BYTES", DEFAULT_MAX_BYTES)
+    total = ProfileRecord.objects.aggregate(total=Sum("size_bytes"))["total"] or 0
+    if total <= max_bytes:
+        return 0
+    removed = 0
+    for record in ProfileRecord.objects.order_by("created_at").iterator():
+        if total <= max_bytes:
+            break
+        total -= record.size_bytes
+        record.delete()
+        removed += 1
+    return removed
+
+
+class ProfilingMiddleware:
+    """Profile opted-in requests. Place after JWTAuthenticationMiddleware so staff users are known."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_profile(request):
+            return self.get_response(request)
+
+        sampler = StackSampler(
+            interval_ms=getattr(settings, "PROFILING_INTERVAL_MS", DEFAULT_INTERVAL_MS)
+        ).start()
+        status_code = 500
+        try:
+            response = self.get_response(request)
+            status_code = response.status_code
+        finally:
+            sampler.stop()
+            try:
+                record = save_profile(request, sampler, status_code)
+            except Exception as e:
+                record = None
+                logger.error(f"Failed to store profile for {request.path}: {str(e)}")
+        if record is not None:
+            response["X-Profile-Id"] = str(record.id)
+        return response
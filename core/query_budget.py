@@ -0,0 +1,207 @@
+"""
+Per-request query budgets and N+1 detection.
+
+Every database connection gets an execute wrapper that reports its queries
+to the active :class:`QueryRecorder` (tracked in a context variable, so it
+costs one lookup when nothing is recording). ``QueryBudgetMiddleware``
+records each request and checks it against the view's budget:
+
+    @query_budget(4)
+    @require_http_methods(["GET"])
+    def get_history(request): ...
+
+A request is over budget when it runs more queries than declared, or when
+the same query shape (see :func:`fingerprint`) repeats QUERY_N_PLUS_ONE_THRESHOLD
+times or more, the usual sign of an N+1 loop. Violations are logged as
+warnings, or raised as :class:`QueryBudgetExceeded` when QUERY_BUDGET_RAISE
+is set (tests). :class:`QueryBudgetTestMixin` asserts the same limits
+around single test requests.
+"""
+
+import contextvars
+import logging
+import re
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.urls import resolve
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+
+QueryBudget = namedtuple("QueryBudget", ["max_queries", "n_plus_one"])
+RecordedQuery = namedtuple("RecordedQuery", ["alias", "sql", "duration_ms"])
+
+_active_recorder = contextvars.ContextVar("query_recorder", default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """Normalize a query so repeats that differ only in literals compare equal."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _threshold():
+    return getattr(settings, "QUERY_N_PLUS_ONE_THRESHOLD", DEFAULT_N_PLUS_ONE_THRESHOLD)
+
+
+class QueryRecorder:
+    """Collect the queries run in the current context (all aliases).
+
+    Recorders nest: queries recorded by an inner recorder also count
+    towards the outer one.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self._parent = None
+        self._token = None
+
+    def __enter__(self):
+        self._parent = _active_recorder.get()
+        self._token = _active_recorder.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _active_recorder.reset(self._token)
+
+    def record(self, query):
+        self.queries.append(query)
+        if self._parent is not None:
+            self._parent.record(query)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    def duplicates(self, threshold=None):
+        """Query shapes run at least ``threshold`` times, most repeated first.
+
+        Returns:
+            list: [(fingerprint, count), ...]
+        """
+        threshold = threshold or _threshold()
+        counts = Counter(fingerprint(q.sql) for q in self.queries)
+        return [(shape, n) for shape, n in counts.most_common() if n >= threshold]
+
+    def violations(self, budget):
+        """Human-readable reasons this recording breaks ``budget`` (empty if within it)."""
+        problems = []
+        if budget.max_queries is not None and self.count > budget.max_queries:
+            problems.append(f"{self.count} queries (budget {budget.max_queries})")
+        for shape, n in self.duplicates(budget.n_plus_one):
+            problems.append(f"possible N+1: {n}x {shape[:200]}")
+        return problems
+
+    def report(self):
+        return "\n".join(f"  [{q.alias}] {q.duration_ms:.1f} ms  {q.sql}" for q in self.queries)
+
+
+class _RecordingWrapper:
+    """Execute wrapper forwarding each query to the active recorder."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        recorder = _active_recorder.get()
+        if recorder is None:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            recorder.record(RecordedQuery(self.alias, sql, (time.perf_counter() - start) * 1000))
+
+
+def _instrument_connection(sender, connection, **kwargs):
+    if not any(isinstance(w, _RecordingWrapper) for w in connection.execute_wrappers):
+        connection.execute_wrappers.append(_RecordingWrapper(connection.alias))
+
+
+connection_created.connect(_instrument_connection, dispatch_uid="core.query_budget.instrument_connection")
+
+
+def query_budget(max_queries, n_plus_one=None):
+    """Declare a view's query budget. Apply as the outermost decorator.
+
+    Args:
+        max_queries: Most queries one request may run (all aliases, including auth)
+        n_plus_one: Repeats of one query shape that count as N+1
+            (default QUERY_N_PLUS_ONE_THRESHOLD)
+    """
+    def decorator(view_func):
+        view_func.query_budget = QueryBudget(max_queries, n_plus_one)
+        return view_func
+    return decorator
+
+
+def get_budget(view_func):
+    """The view's declared QueryBudget, or one with no query limit (N+1 check only)."""
+    return getattr(view_func, "query_budget", None) or QueryBudget(None, None)
+
+
+class QueryBudgetMiddleware:
+    """Record each request's queries and enforce its view's budget."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "QUERY_BUDGET_ENABLED", True):
+            return self.get_response(request)
+
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        match = getattr(request, "resolver_match", None)
+        if match is not None:
+            problems = recorder.violations(get_budget(match.func))
+            if problems:
+                message = f"Query budget exceeded for {request.method} {request.path}: " + "; ".join(problems)
+                if getattr(settings, "QUERY_BUDGET_RAISE", False):
+                    raise QueryBudgetExceeded(f"{message}\n{recorder.report()}")
+                logger.warning(message)
+        if settings.DEBUG:
+            response["X-Query-Count"] = str(recorder.count)
+        return response
+
+
+class QueryBudgetTestMixin:
+    """TestCase helpers asserting query counts across every database alias."""
+
+    @contextmanager
+    def assertMaxQueries(self, max_queries, n_plus_one=None):
+        with QueryRecorder() as recorder:
+            yield recorder
+        problems = recorder.violations(QueryBudget(max_queries, n_plus_one))
+        if problems:
+            self.fail("; ".join(problems) + "\n" + recorder.report())
+
+    def assertWithinQueryBudget(self, method, path, **kwargs):
+        """Request ``path`` with the test client and check it against its view's declared budget.
+
+        Returns:
+            HttpResponse: The test client response
+        """
+        budget = getattr(resolve(urlsplit(path).path).func, "query_budget", None)
+        self.assertIsNotNone(budget, f"{path} has no @query_budget")
+        with self.assertMaxQueries(budget.max_queries, budget.n_plus_one):
+            response = getattr(self.client, method.lower())(path, **kwargs)
+        return response
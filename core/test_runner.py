@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner that keeps background DB writers out of tests.
+
+    Every team7 API request goes through APILoggingMiddleware. The process-wide
+    API log writer would insert those rows from its own thread and connection,
+    outside each test's transaction, so they would leak into later tests.
+    Queued records are only written when a test flushes its own writer, and
+    whatever the process-wide writer still holds is written before the test
+    databases are destroyed.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.TEAM7_APILOG_BACKGROUND = False
+
+    def teardown_databases(self, old_config, **kwargs):
+        if "team7" in settings.TEAM_APPS:
+            from team7.log_writer import close_writer
+
+            close_writer()
+        super().teardown_databases(old_config, **kwargs)
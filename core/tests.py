@@ -1,6 +1,38 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import marshal
+import os
+import pstats
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest import mock
+
+import jwt
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
 from django.contrib.auth import get_user_model
 
+from core.db_router import ReplicaPinningMiddleware, TeamPerAppRouter
+from core.json_utils import FastJsonResponse, JSONDecodeError, compress_response
+from core.middleware import is_stateless_api_path
+from core.jwt_utils import VerifiedTokenCache, create_access_token, decode_token
+from core.jwt_verifier import JWKSVerifier, authenticate_request
+from core.models import ProfileRecord
+from core.profiling import StackSampler, prune_profiles
+from core.query_budget import QueryBudget, QueryBudgetTestMixin, QueryRecorder, fingerprint
+from core.sqlite_tuning import DEFAULT_PRAGMAS, apply_pragmas, retry_on_busy
+
 User = get_user_model()
 
 class AuthFlowTests(TestCase):
@@ -22,3 +54,391 @@ class AuthFlowTests(TestCase):
         # logout
         res3 = self.client.post("/api/auth/logout/", data="{}", content_type="application/json")
         self.assertEqual(res3.status_code, 200)
+
+
+class JsonUtilsTests(SimpleTestCase):
+    def test_native_types_round_trip(self):
+        value = uuid.uuid4()
+        res = FastJsonResponse({"id": value, "score": Decimal("3.5"), "at": datetime(2024, 1, 2, tzinfo=timezone.utc)})
+        data = json.loads(res.content)
+        self.assertEqual(data["id"], str(value))
+        self.assertEqual(data["score"], "3.5")
+        self.assertTrue(data["at"].startswith("2024-01-02T00:00:00"))
+        self.assertEqual(res.data["score"], Decimal("3.5"))
+
+    def test_invalid_utf8_is_a_decode_error(self):
+        from core import json_utils
+
+        for backend in (json_utils.orjson, None):
+            with mock.patch.object(json_utils, "orjson", backend), self.assertRaises(JSONDecodeError):
+                json_utils.loads(b'{"text": "\xff"}')
+
+    def test_non_dict_requires_safe_false(self):
+        with self.assertRaises(TypeError):
+            FastJsonResponse([1, 2])
+        self.assertEqual(json.loads(FastJsonResponse([1, 2], safe=False).content), [1, 2])
+
+    def test_large_body_gzipped_when_accepted(self):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        payload = {"attempts": [{"score": i} for i in range(500)]}
+        response = FastJsonResponse(payload)
+        response["ETag"] = '"v1"'
+        res = compress_response(request, response)
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(res["ETag"], 'W/"v1"')
+        self.assertEqual(json.loads(gzip.decompress(res.content)), payload)
+
+        plain = compress_response(RequestFactory().get("/"), FastJsonResponse(payload))
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", plain["Vary"])
+
+
+class MetricsEndpointTests(TestCase):
+    def test_requests_and_queries_exported(self):
+        self.client.get("/api/auth/me/")
+        res = self.client.get("/metrics")
+        self.assertEqual(res.status_code, 200)
+        body = res.content.decode()
+        self.assertIn('http_requests_total{method="GET",route="api/auth/me/",status="401"}', body)
+        self.assertIn("http_request_duration_seconds_bucket", body)
+        self.assertIn("http_requests_in_progress", body)
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_token_required_when_configured(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        res = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-secret")
+        self.assertEqual(res.status_code, 200)
+
+    def test_persistent_connections_per_alias(self):
+        for alias, config in settings.DATABASES.items():
+            self.assertEqual(config["CONN_MAX_AGE"], settings.DB_CONN_MAX_AGE, alias)
+            self.assertTrue(config["CONN_HEALTH_CHECKS"], alias)
+
+        # Connections are per thread: a new thread opens (and counts) its own
+        def query():
+            with connections["default"].cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connections.close_all()
+
+        thread = threading.Thread(target=query)
+        thread.start()
+        thread.join()
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn('db_connections_opened_total{alias="default"}', body)
+
+
+def _spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.staff = User.objects.create_superuser(email="staff@test.com", password="pass1234")
+
+    def test_sampler_outputs_collapsed_stacks_and_pstats(self):
+        sampler = StackSampler(interval_ms=1).start()
+        _spin(0.1)
+        sampler.stop()
+
+        self.assertGreater(sampler.sample_count, 0)
+        self.assertIn("_spin (tests.py:", sampler.collapsed())
+        path = f"{self.tmp.name}/out.pstats"
+        with open(path, "wb") as fh:
+            marshal.dump(sampler.pstats_data(), fh)
+        functions = {func[2] for func in pstats.Stats(path).stats}
+        self.assertIn("_spin", functions)
+
+    def test_staff_flag_profiles_request(self):
+        with override_settings(PROFILING_ENABLED=True, PROFILING_DIR=self.tmp.name):
+            self.client.cookies["access_token"] = create_access_token(self.staff)
+            res = self.client.get("/api/auth/me/", HTTP_X_PROFILE="1")
+            record = ProfileRecord.objects.get(pk=res["X-Profile-Id"])
+            self.assertEqual(record.path, "/api/auth/me/")
+            self.assertEqual(record.user_email, "staff@test.com")
+
+            self.client.force_login(self.staff)
+            download = self.client.get(f"/admin/core/profilerecord/{record.pk}/download/pstats/")
+            self.assertEqual(download.status_code, 200)
+
+    def test_flag_ignored_for_non_staff(self):
+        user = User.objects.create_user(email="user@test.com", password="pass1234")
+        with override_settings(PROFILING_ENABLED=True, PROFILING_DIR=self.tmp.name):
+            self.client.cookies["access_token"] = create_access_token(user)
+            res = self.client.get("/api/auth/me/?__profile=1")
+        self.assertFalse(res.has_header("X-Profile-Id"))
+        self.assertFalse(ProfileRecord.objects.exists())
+
+    def test_prune_removes_oldest_profiles(self):
+        with override_settings(PROFILING_DIR=self.tmp.name):
+            for _ in range(3):
+                record = ProfileRecord.objects.create(
+                    method="GET", path="/", status_code=200, duration_ms=1,
+                    sample_count=1, interval_ms=5, size_bytes=100,
+                )
+                open(f"{self.tmp.name}/{record.pstats_name}", "wb").close()
+            oldest = ProfileRecord.objects.order_by("created_at").first()
+
+            self.assertEqual(prune_profiles(max_bytes=250), 1)
+        self.assertFalse(ProfileRecord.objects.filter(pk=oldest.pk).exists())
+        self.assertEqual(ProfileRecord.objects.count(), 2)
+
+    def test_bulk_delete_removes_files(self):
+        with override_settings(PROFILING_DIR=self.tmp.name):
+            for _ in range(2):
+                record = ProfileRecord.objects.create(
+                    method="GET", path="/", status_code=200, duration_ms=1, sample_count=1, interval_ms=5,
+                )
+                for name in (record.collapsed_name, record.pstats_name):
+                    open(f"{self.tmp.name}/{name}", "wb").close()
+            with self.captureOnCommitCallbacks(execute=True):
+                ProfileRecord.objects.all().delete()
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+
+class QueryBudgetTests(TestCase):
+    def test_fingerprint_ignores_literals_and_in_list_length(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 5 AND name = 'x' AND k IN (%s, %s)"),
+            fingerprint("SELECT *  FROM t WHERE id = 12 AND name = 'y' AND k IN (%s)"),
+        )
+
+    def test_repeated_query_flagged_as_n_plus_one(self):
+        users = [User.objects.create_user(email=f"u{i}@test.com", password="pass1234") for i in range(5)]
+        with QueryRecorder() as recorder:
+            for user in users:
+                User.objects.get(pk=user.pk)
+        self.assertEqual(recorder.count, 5)
+        self.assertIn("possible N+1", recorder.violations(QueryBudget(10, 5))[0])
+        self.assertEqual(recorder.violations(QueryBudget(10, 6)), [])
+
+
+class EndpointQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="a@test.com", password="pass1234")
+
+    def test_public_endpoints(self):
+        self.assertWithinQueryBudget("get", "/api/health/")
+        self.assertWithinQueryBudget(
+            "post", "/api/auth/signup/", data='{"email":"b@test.com","password":"pass1234"}',
+            content_type="application/json",
+        )
+        res = self.assertWithinQueryBudget(
+            "post", "/api/auth/login/", data='{"email":"a@test.com","password":"pass1234"}',
+            content_type="application/json",
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.assertWithinQueryBudget("post", "/api/auth/refresh/").status_code, 200)
+
+    def test_authenticated_endpoints(self):
+        self.client.cookies["access_token"] = create_access_token(self.user)
+        self.assertEqual(self.assertWithinQueryBudget("get", "/api/auth/me/").status_code, 200)
+        self.assertEqual(self.assertWithinQueryBudget("get", "/api/auth/verify/").status_code, 200)
+        self.assertEqual(self.assertWithinQueryBudget("post", "/api/auth/logout/").status_code, 200)
+
+
+class PrincipalCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="a@test.com", password="pass1234", first_name="A")
+        self.client.cookies["access_token"] = create_access_token(self.user)
+
+    def test_repeat_requests_authenticate_without_queries(self):
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 200)
+        with self.assertNumQueries(0):
+            res = self.client.get("/api/auth/me/")
+        self.assertEqual(res.json()["user"]["first_name"], "A")
+
+    def test_logout_revokes_cached_principal(self):
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 200)
+        token = self.client.cookies["access_token"].value
+        self.client.post("/api/auth/logout/")
+        self.client.cookies["access_token"] = token
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 401)
+        self.assertTrue(User.objects.get(pk=self.user.pk).check_password("pass1234"))
+
+    def test_deactivation_revokes_cached_principal(self):
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 401)
+
+
+class AsymmetricJWTTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.old_key, self.new_key = f"{self.tmp.name}/old.pem", f"{self.tmp.name}/new.pem"
+        for path in (self.old_key, self.new_key):
+            call_command("generate_jwt_key", path, algorithm="EdDSA", stdout=io.StringIO())
+        self.user = User.objects.create_user(email="a@test.com", password="pass1234")
+
+    def _fetch_jwks(self, url, timeout):
+        self.fetches += 1
+        return self.client.get(url).json()
+
+    def test_rotation_keeps_old_tokens_valid_and_verifier_works_locally(self):
+        with override_settings(JWT_ALGORITHM="EdDSA", JWT_SIGNING_KEY_FILES=[self.old_key]):
+            old_token = create_access_token(self.user)
+        with override_settings(JWT_ALGORITHM="EdDSA", JWT_SIGNING_KEY_FILES=[self.new_key, self.old_key]):
+            new_token = create_access_token(self.user)
+            self.assertEqual(decode_token(old_token)["sub"], str(self.user.id))
+
+            res = self.client.get("/.well-known/jwks.json")
+            self.assertEqual(len(res.json()["keys"]), 2)
+            self.assertIn("max-age", res["Cache-Control"])
+
+            self.fetches = 0
+            verifier = JWKSVerifier("/api/auth/jwks/", fetch=self._fetch_jwks)
+            for token in (old_token, new_token):
+                request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+                self.assertEqual(authenticate_request(request, verifier)["sub"], str(self.user.id))
+            self.assertEqual(self.fetches, 1)
+
+            self.client.cookies["access_token"] = new_token
+            self.assertEqual(self.client.get("/api/auth/me/").status_code, 200)
+
+    def test_verifier_rejects_unknown_keys_without_refetching_each_time(self):
+        with override_settings(JWT_ALGORITHM="EdDSA", JWT_SIGNING_KEY_FILES=[self.old_key]):
+            self.fetches = 0
+            verifier = JWKSVerifier("/api/auth/jwks/", fetch=self._fetch_jwks)
+            with override_settings(JWT_SIGNING_KEY_FILES=[self.new_key]):
+                forged = create_access_token(self.user)
+            for _ in range(3):
+                request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {forged}")
+                self.assertIsNone(authenticate_request(request, verifier))
+            self.assertEqual(self.fetches, 1)
+
+    def test_hs256_publishes_no_keys(self):
+        self.assertEqual(self.client.get("/api/auth/jwks/").json(), {"keys": []})
+
+
+class VerifyFastPathTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="a@test.com", password="pass1234", first_name="A")
+        self.client.cookies["access_token"] = create_access_token(self.user)
+
+    def test_repeat_token_skips_signature_check(self):
+        with mock.patch("core.jwt_utils.jwt.decode", wraps=jwt.decode) as decode:
+            for _ in range(3):
+                res = self.client.get("/api/auth/verify/")
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(res["X-User-Id"], str(self.user.id))
+        self.assertEqual(res["X-User-First-Name"], "A")
+
+    def test_gateway_cache_headers_capped(self):
+        with override_settings(JWT_VERIFY_MAX_AGE=30):
+            res = self.client.get("/api/auth/verify/")
+        self.assertEqual(res["X-Accel-Expires"], "30")
+        self.assertEqual(res["Cache-Control"], "private, max-age=30")
+        self.client.cookies["access_token"] = ""
+        self.assertEqual(self.client.get("/api/auth/verify/").status_code, 401)
+
+    def test_expired_entries_not_served(self):
+        tokens = VerifiedTokenCache()
+        tokens.set(b"k", {"exp": time.time() - 1}, maxsize=10)
+        self.assertIsNone(tokens.get(b"k"))
+        for i in range(3):
+            tokens.set(i, {"exp": time.time() + 60}, maxsize=2)
+        self.assertIsNone(tokens.get(0))
+        self.assertIsNotNone(tokens.get(2))
+
+
+class StatelessAPIMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(email="admin@test.com", password="pass1234")
+        self.client.force_login(self.admin)
+
+    def test_api_ignores_session_and_uses_jwt_only(self):
+        self.assertEqual(self.client.get("/api/auth/me/").status_code, 401)
+        self.assertEqual(self.client.get("/admin/").status_code, 200)
+
+        self.client.cookies["access_token"] = create_access_token(self.admin)
+        self.client.get("/api/auth/me/")
+        with self.assertNumQueries(0):
+            res = self.client.get("/api/auth/me/")
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn("sessionid", res.cookies)
+        self.assertEqual(self.client.get("/team7/team7/api/ping/").status_code, 200)
+        self.assertFalse(is_stateless_api_path("/team7/dashboard/"))
+
+
+@override_settings(DATABASE_REPLICAS={"team7": ["team7_replica1", "team7_replica2"]}, DB_REPLICA_PIN_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        from team7.models import Evaluation
+        self.model = Evaluation
+        self.user = mock.Mock(pk=7, is_authenticated=True)
+
+    def _request(self, view):
+        request = RequestFactory().get("/team7/team7/api/history/")
+        request.user = self.user
+        return ReplicaPinningMiddleware(view)(request)
+
+    def test_reads_use_replicas_and_writes_the_primary(self):
+        reads = {router.db_for_read(self.model) for _ in range(50)}
+        self.assertEqual(reads, {"team7_replica1", "team7_replica2"})
+        self.assertEqual(router.db_for_write(self.model), "team7")
+        self.assertEqual(router.db_for_read(User), "default")
+
+    def test_write_pins_request_then_user(self):
+        seen = []
+
+        def write_then_read(request):
+            seen.append(router.db_for_read(self.model))
+            router.db_for_write(self.model)
+            seen.append(router.db_for_read(self.model))
+            return HttpResponse()
+
+        self._request(write_then_read)
+        self.assertTrue(seen[0].startswith("team7_replica"))
+        self.assertEqual(seen[1], "team7")
+
+        # The user's next request reads the primary until the pin expires
+        self._request(lambda request: seen.append(router.db_for_read(self.model)) or HttpResponse())
+        self.assertEqual(seen[2], "team7")
+        self.user.pk = 8
+        self._request(lambda request: seen.append(router.db_for_read(self.model)) or HttpResponse())
+        self.assertTrue(seen[3].startswith("team7_replica"))
+
+    def test_relations_across_primary_and_replica(self):
+        primary, replica, other = (mock.Mock(_state=mock.Mock(db=db)) for db in ("team7", "team7_replica2", "default"))
+        self.assertTrue(TeamPerAppRouter().allow_relation(primary, replica))
+        self.assertIsNone(TeamPerAppRouter().allow_relation(primary, other))
+
+
+class SQLiteTuningTests(SimpleTestCase):
+    def test_pragmas_applied_to_file_database(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = sqlite3.connect(f"{tmp}/t.sqlite3")
+            apply_pragmas(db, DEFAULT_PRAGMAS)
+            self.assertEqual(db.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(db.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+            self.assertEqual(db.execute("PRAGMA busy_timeout").fetchone()[0], 5000)
+            db.close()
+
+    @mock.patch("core.sqlite_tuning.time.sleep")
+    def test_retry_on_busy(self, sleep):
+        calls = []
+
+        @retry_on_busy
+        def write(fail_with):
+            calls.append(1)
+            if len(calls) < 3:
+                raise fail_with
+            return "ok"
+
+        self.assertEqual(write(OperationalError("database is locked")), "ok")
+        self.assertEqual((len(calls), sleep.call_count), (3, 2))
+
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            write(OperationalError("no such table: x"))
+        self.assertEqual(len(calls), 1)
@@ -8,5 +8,6 @@ urlpatterns = [
     path("auth/logout/", views.logout_api),
     path("auth/me/", views.me),
     path("auth/verify/", views.verify),
+    path("auth/jwks/", views.jwks),
     path("health/", views.health),
 ]
\ No newline at end of file
@@ -1,19 +1,22 @@
-import json
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+import time
+from functools import lru_cache
+
+from django.views.decorators.http import require_GET, require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import authenticate, get_user_model
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from django.contrib.auth.password_validation import validate_password
 
-from core.jwt_utils import create_access_token, create_refresh_token, decode_token
+from core.json_utils import FastJsonResponse, parse_json_body
+from core.jwt_utils import create_access_token, create_refresh_token, decode_token, public_jwks
 from core.auth import api_login_required
+from core.query_budget import query_budget
 
 User = get_user_model()
 
 
-def _set_auth_cookies(resp: JsonResponse, access: str, refresh: str, settings):
+def _set_auth_cookies(resp: FastJsonResponse, access: str, refresh: str, settings):
     resp.set_cookie(
         "access_token",
         access,
@@ -34,24 +37,26 @@ def _set_auth_cookies(resp: JsonResponse, access: str, refresh: str, settings):
     )
 
 
-def _clear_auth_cookies(resp: JsonResponse, settings):
+def _clear_auth_cookies(resp: FastJsonResponse, settings):
     resp.delete_cookie("access_token", path="/")
     resp.delete_cookie("refresh_token", path="/api/auth/")
 
 
+@query_budget(0)
 def health(request):
-    return JsonResponse({"status": "ok"})
+    return FastJsonResponse({"status": "ok"})
 
 
+@query_budget(2)
 @csrf_exempt
 @require_POST
 def signup_api(request):
     from django.conf import settings
 
     try:
-        data = json.loads(request.body.decode("utf-8"))
+        data = parse_json_body(request)
     except Exception:
-        return JsonResponse({"error": "Invalid JSON"}, status=400)
+        return FastJsonResponse({"error": "Invalid JSON"}, status=400)
 
     email = (data.get("email") or "").strip().lower()
     password = data.get("password") or ""
@@ -60,32 +65,32 @@ def signup_api(request):
     age_raw = data.get("age")
 
     if not email:
-        return JsonResponse({"error": "email is required"}, status=400)
+        return FastJsonResponse({"error": "email is required"}, status=400)
     if not password:
-        return JsonResponse({"error": "password is required"}, status=400)
+        return FastJsonResponse({"error": "password is required"}, status=400)
 
     try:
         validate_email(email)
     except ValidationError:
-        return JsonResponse({"error": "invalid email format"}, status=400)
+        return FastJsonResponse({"error": "invalid email format"}, status=400)
 
     try:
         validate_password(password)
     except ValidationError as e:
-        return JsonResponse({"error": "invalid password", "details": e.messages}, status=400)
+        return FastJsonResponse({"error": "invalid password", "details": e.messages}, status=400)
 
     age = None
     if age_raw not in (None, ""):
         try:
             age = int(age_raw)
         except (TypeError, ValueError):
-            return JsonResponse({"error": "age must be an integer"}, status=400)
+            return FastJsonResponse({"error": "age must be an integer"}, status=400)
         if age < 1 or age > 120:
-            return JsonResponse({"error": "age must be between 1 and 120"}, status=400)
+            return FastJsonResponse({"error": "age must be between 1 and 120"}, status=400)
 
     # ---- Uniqueness
     if User.objects.filter(email=email).exists():
-        return JsonResponse({"error": "email already registered"}, status=409)
+        return FastJsonResponse({"error": "email already registered"}, status=409)
 
     user = User.objects.create_user(
         email=email,
@@ -98,7 +103,7 @@ def signup_api(request):
     access = create_access_token(user)
     refresh = create_refresh_token(user)
 
-    resp = JsonResponse({
+    resp = FastJsonResponse({
         "ok": True,
         "user": {
             "email": user.email,
@@ -111,33 +116,35 @@ def signup_api(request):
     return resp
 
 
+@query_budget(2)
 @csrf_exempt
 @require_POST
 def login_api(request):
     from django.conf import settings
 
     try:
-        data = json.loads(request.body.decode("utf-8"))
+        data = parse_json_body(request)
     except Exception:
-        return JsonResponse({"error": "Invalid JSON"}, status=400)
+        return FastJsonResponse({"error": "Invalid JSON"}, status=400)
 
     email = (data.get("email") or "").strip().lower()
     password = data.get("password") or ""
 
     user = authenticate(request, username=email, password=password)
     if user is None:
-        return JsonResponse({"error": "Invalid credentials"}, status=401)
+        return FastJsonResponse({"error": "Invalid credentials"}, status=401)
     if not user.is_active:
-        return JsonResponse({"error": "User disabled"}, status=403)
+        return FastJsonResponse({"error": "User disabled"}, status=403)
 
     access = create_access_token(user)
     refresh = create_refresh_token(user)
 
-    resp = JsonResponse({"ok": True, "user": {"email": user.email, "first_name": user.first_name, "last_name": user.last_name, "age": user.age}})
+    resp = FastJsonResponse({"ok": True, "user": {"email": user.email, "first_name": user.first_name, "last_name": user.last_name, "age": user.age}})
     _set_auth_cookies(resp, access, refresh, settings)
     return resp
 
 
+@query_budget(2)
 @csrf_exempt
 @require_POST
 def refresh_api(request):
@@ -145,29 +152,30 @@ def refresh_api(request):
 
     rt = request.COOKIES.get("refresh_token")
     if not rt:
-        return JsonResponse({"error": "Missing refresh token"}, status=401)
+        return FastJsonResponse({"error": "Missing refresh token"}, status=401)
 
     try:
         payload = decode_token(rt)
         if payload.get("type") != "refresh":
-            return JsonResponse({"error": "Invalid token"}, status=401)
+            return FastJsonResponse({"error": "Invalid token"}, status=401)
 
         user_id = payload.get("sub")
         tv = payload.get("tv")
         user = User.objects.filter(id=user_id, is_active=True).first()
         if not user or user.token_version != tv:
-            return JsonResponse({"error": "Invalid token"}, status=401)
+            return FastJsonResponse({"error": "Invalid token"}, status=401)
 
         access = create_access_token(user)
         new_refresh = create_refresh_token(user)
 
-        resp = JsonResponse({"ok": True})
+        resp = FastJsonResponse({"ok": True})
         _set_auth_cookies(resp, access, new_refresh, settings)
         return resp
     except Exception:
-        return JsonResponse({"error": "Invalid token"}, status=401)
+        return FastJsonResponse({"error": "Invalid token"}, status=401)
 
 
+@query_budget(2)
 @csrf_exempt
 @require_POST
 def logout_api(request):
@@ -178,15 +186,16 @@ def logout_api(request):
         user.token_version += 1
         user.save(update_fields=["token_version"])
 
-    resp = JsonResponse({"ok": True})
+    resp = FastJsonResponse({"ok": True})
     _clear_auth_cookies(resp, settings)
     return resp
 
 
+@query_budget(1)
 @api_login_required
 def me(request):
     u = request.user
-    return JsonResponse({
+    return FastJsonResponse({
         "ok": True, 
         "user": {
             "id": str(u.id),
@@ -198,13 +207,52 @@ def me(request):
     })
 
 
+@lru_cache(maxsize=4096)
+def _verify_headers(user_id, email, first_name, last_name, age):
+    # Keyed by the profile itself, so an edited profile gets fresh headers
+    return (
+        ("X-User-Id", str(user_id)),
+        ("X-User-Email", email),
+        ("X-User-First-Name", first_name or ""),
+        ("X-User-Last-Name", last_name or ""),
+        ("X-User-Age", str(age or "")),
+    )
+
+
+@query_budget(1)
 @api_login_required
 def verify(request):
+    """Gateway auth subrequest target (nginx auth_request).
+
+    Successful answers may be cached by the gateway until the token expires,
+    capped at JWT_VERIFY_MAX_AGE seconds so logouts reach the gateway quickly
+    (X-Accel-Expires is read by nginx's proxy_cache and not forwarded).
+    """
+    from django.conf import settings
+
     u = request.user
-    resp = JsonResponse({"ok": True})
-    resp["X-User-Id"] = str(u.id)
-    resp["X-User-Email"] = u.email
-    resp["X-User-First-Name"] = u.first_name or ""
-    resp["X-User-Last-Name"] = u.last_name or ""
-    resp["X-User-Age"] = str(u.age or "")
+    resp = FastJsonResponse({"ok": True})
+    for name, value in _verify_headers(u.id, u.email, u.first_name, u.last_name, u.age):
+        resp[name] = value
+
+    payload = getattr(request, "jwt_payload", None)
+    max_age = 0
+    if payload:
+        max_age = max(0, min(int(payload["exp"] - time.time()), settings.JWT_VERIFY_MAX_AGE))
+    if max_age:
+        resp["Cache-Control"] = f"private, max-age={max_age}"
+        resp["X-Accel-Expires"] = str(max_age)
+    else:
+        resp["Cache-Control"] = "no-store"
+    resp["Vary"] = "Cookie, Authorization"
+    return resp
+
+
+@query_budget(0)
+@require_GET
+def jwks(request):
+    """Public signing keys (JWK Set) for verifying access tokens locally."""
+    resp = FastJsonResponse(public_jwks())
+    # Short enough that a rotated-in key is picked up well before it signs
+    resp["Cache-Control"] = "public, max-age=300"
     return resp
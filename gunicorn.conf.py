@@ -0,0 +1,21 @@
+"""
+gunicorn settings picked up automatically from the project root.
+
+When PROMETHEUS_MULTIPROC_DIR is set, workers share metrics through
+memory-mapped files in that directory (see core/metrics.py). It is emptied
+on startup so counters from a previous run are not reported again.
+"""
+import os
+import shutil
+
+
+def on_starting(server):
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from core.metrics import child_exit as mark_worker_dead
+    mark_worker_dead(server, worker)
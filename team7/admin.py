@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Question, Evaluation, DetailedScore, APILog
+from .models import Question, Evaluation, DetailedScore, APILog, APILogRollup, ScoreSketch, UserScoreAggregate
 
 
 @admin.register(Question)
@@ -26,20 +26,20 @@ class EvaluationAdmin(admin.ModelAdmin):
     list_display = ('evaluation_id', 'user_id', 'task_type', 'overall_score', 'created_at')
     list_filter = ('task_type', 'created_at')
     search_fields = ('user_id', 'evaluation_id')
-    readonly_fields = ('evaluation_id', 'user_id', 'question', 'created_at', 'rubric_version_id')
+    readonly_fields = ('evaluation_id', 'user_id', 'question', 'created_at', 'rubric_version_id', 'stage_timings')
 
     fieldsets = (
         ('Evaluation Info', {
             'fields': ('evaluation_id', 'user_id', 'question', 'task_type')
         }),
         ('Submission Data', {
-            'fields': ('submitted_text', 'audio_path', 'transcript_text')
+            'fields': ('submitted_text', 'audio_path', 'transcript_text', 'fluency_metrics')
         }),
         ('Scoring', {
             'fields': ('overall_score', 'ai_feedback', 'rubric_version_id')
         }),
         ('Timestamps', {
-            'fields': ('created_at',)
+            'fields': ('created_at', 'stage_timings')
         }),
     )
 
@@ -100,3 +100,64 @@ class APILogAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         """Logs are read-only; prevent modifications."""
         return False
+
+
+@admin.register(APILogRollup)
+class APILogRollupAdmin(admin.ModelAdmin):
+    """Admin panel for per-minute API log rollups (UC-04, FR-MON)."""
+    list_display = ('bucket_start', 'endpoint', 'status_class', 'request_count',
+                    'p50_ms', 'p90_ms', 'p99_ms', 'latency_max_ms')
+    list_filter = ('status_class',)
+    search_fields = ('endpoint',)
+    readonly_fields = ('bucket_start', 'endpoint', 'status_class', 'request_count',
+                       'latency_sum_ms', 'latency_max_ms', 'latency_histogram')
+    date_hierarchy = 'bucket_start'
+
+    @admin.display(description='p50 (ms)')
+    def p50_ms(self, obj):
+        return obj.histogram.value_at_percentile(50)
+
+    @admin.display(description='p90 (ms)')
+    def p90_ms(self, obj):
+        return obj.histogram.value_at_percentile(90)
+
+    @admin.display(description='p99 (ms)')
+    def p99_ms(self, obj):
+        return obj.histogram.value_at_percentile(99)
+
+    def has_add_permission(self, request):
+        """Rollups are maintained by the API log writer."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Rollups are derived data; rebuild them instead of editing."""
+        return False
+
+
+@admin.register(UserScoreAggregate)
+class UserScoreAggregateAdmin(admin.ModelAdmin):
+    """Admin panel for per-user running score aggregates (UC-03)."""
+    list_display = ('user_id', 'task_type', 'attempt_count', 'score_count', 'ewma', 'last_attempt_at')
+    list_filter = ('task_type',)
+    search_fields = ('user_id',)
+
+    def has_add_permission(self, request):
+        """Aggregates are maintained by the evaluation workflow."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Aggregates are derived data; rebuild them instead of editing."""
+        return False
+
+
+@admin.register(ScoreSketch)
+class ScoreSketchAdmin(admin.ModelAdmin):
+    """Admin panel for cohort percentile sketches (UC-03)."""
+    list_display = ('task_type', 'criterion', 'rubric_version_id', 'count', 'updated_at')
+    list_filter = ('task_type', 'rubric_version_id')
+    search_fields = ('criterion',)
+    readonly_fields = ('task_type', 'criterion', 'rubric_version_id', 'count', 'digest', 'updated_at')
+
+    def has_add_permission(self, request):
+        """Sketches are maintained by the evaluation workflow."""
+        return False
@@ -0,0 +1,274 @@
+"""
+Admission control for the LLM/ASR-backed submission endpoints (NFR-AVAIL-01).
+
+Each evaluation holds a worker for the length of one or more external AI
+calls (up to tens of seconds), so unbounded submissions can tie up every
+gunicorn worker. ``admission_control`` rejects work up front instead:
+
+* per-user rate limit: a token bucket (GCRA) of TEAM7_ADMISSION_BURST
+  submissions refilled at TEAM7_ADMISSION_RATE_PER_MINUTE; over it the
+  request gets 429 with Retry-After set to when the next token is due.
+  Tokens are taken only once capacity is reserved, and given back when
+  the request fails before any AI call (see :func:`note_backend_call`)
+* per-backend concurrency: at most TEAM7_ADMISSION_CONCURRENCY[backend]
+  requests that will call the LLM / ASR service are in flight site-wide;
+  beyond that the request gets 503 with Retry-After
+
+All state lives in the cache backend, so limits hold across workers when
+it is shared (Redis). Concurrency slots are leases of
+TEAM7_ADMISSION_LEASE_SECONDS that a per-process keeper thread renews while
+the request runs, however long its AI calls take; if the worker dies the
+renewals stop and the slot frees itself within one lease.
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.json_utils import FastJsonResponse
+from core.metrics import record_admission_rejection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE_PER_MINUTE = 6
+DEFAULT_BURST = 3
+DEFAULT_CONCURRENCY = {'llm': 16, 'asr': 8}
+DEFAULT_LEASE_SECONDS = 60
+DEFAULT_BUSY_RETRY_AFTER = 5
+
+# Whether the current request has called an AI backend yet; set to False
+# by admission_control, flipped by note_backend_call
+_backend_called = ContextVar('team7_admission_backend_called', default=None)
+
+_LOCK_TTL = 2  # seconds; frees the lock of a worker that died holding it
+_LOCK_WAIT = 3  # longer than the TTL, so only a broken cache runs out of it
+
+
+def _setting(name, default):
+    return getattr(settings, f'TEAM7_ADMISSION_{name}', default)
+
+
+# -- per-user token bucket ------------------------------------------------
+
+def _bucket_key(user_id):
+    return f'team7:admission:bucket:{user_id}'
+
+
+@contextmanager
+def _bucket_lock(key):
+    """Serialize updates to one bucket.
+
+    The lock is only held for a cache read and write, so waiters retry with
+    short backoff. Contention is never a reason to reject: if the lock
+    can't be had within _LOCK_WAIT the update goes ahead unlocked.
+    """
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + _LOCK_WAIT
+    delay = 0.002
+    while not cache.add(lock_key, 1, _LOCK_TTL):
+        if time.monotonic() > deadline:
+            logger.warning(f"Admission bucket lock {lock_key} stayed busy, updating without it")
+            yield
+            return
+        time.sleep(delay)
+        delay = min(delay * 2, 0.05)
+    try:
+        yield
+    finally:
+        cache.delete(lock_key)
+
+
+def take_token(user_id, now=None):
+    """Take one token from the user's bucket.
+
+    Implemented as GCRA: the cache holds the bucket's theoretical arrival
+    time (TAT), and a request is admitted if it isn't more than the burst
+    ahead of it. Updates are serialized per user with a short cache lock.
+
+    Returns:
+        float: 0 if admitted, otherwise seconds until a token is available
+    """
+    rate = _setting('RATE_PER_MINUTE', DEFAULT_RATE_PER_MINUTE)
+    if not rate:
+        return 0
+    interval = 60.0 / rate
+    burst = _setting('BURST', DEFAULT_BURST)
+    tolerance = interval * (burst - 1)
+
+    key = _bucket_key(user_id)
+    with _bucket_lock(key):
+        now = time.time() if now is None else now
+        tat = max(cache.get(key) or now, now)
+        if tat - now > tolerance:
+            return tat - now - tolerance
+        cache.set(key, tat + interval, int(tolerance + interval) + 1)
+        return 0
+
+
+def refund_token(user_id):
+    """Give back a token taken for a request that did no AI work."""
+    rate = _setting('RATE_PER_MINUTE', DEFAULT_RATE_PER_MINUTE)
+    if not rate:
+        return
+    interval = 60.0 / rate
+    key = _bucket_key(user_id)
+    with _bucket_lock(key):
+        tat = cache.get(key)
+        if tat is not None:
+            now = time.time()
+            cache.set(key, max(tat - interval, now), max(1, int(tat - now) + 1))
+
+
+# -- per-backend concurrency ------------------------------------------------
+
+def _slot_keys(backend):
+    limit = _setting('CONCURRENCY', DEFAULT_CONCURRENCY).get(backend, 0)
+    return [f'team7:admission:{backend}:slot:{i}' for i in range(limit)]
+
+
+class _LeaseKeeper:
+    """Renews the leases of slots held by this process every third of a lease."""
+
+    def __init__(self):
+        self._held = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def hold(self, slot, lease):
+        with self._lock:
+            self._held[slot[0]] = (slot[1], lease)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='team7-admission-leases', daemon=True)
+                self._thread.start()
+
+    def drop(self, slot):
+        with self._lock:
+            self._held.pop(slot[0], None)
+
+    def renew(self):
+        with self._lock:
+            held = list(self._held.items())
+        for key, (token, lease) in held:
+            # Only our own lease: one that already lapsed may belong to someone else now
+            if cache.get(key) == token:
+                cache.touch(key, lease)
+
+    def _run(self):
+        while True:
+            time.sleep(max(1, _setting('LEASE_SECONDS', DEFAULT_LEASE_SECONDS) / 3))
+            try:
+                self.renew()
+            except Exception as e:
+                logger.error(f"Failed to renew admission leases: {str(e)}")
+
+
+_keeper = _LeaseKeeper()
+
+
+def acquire_slot(backend):
+    """Lease one of the backend's concurrency slots.
+
+    One get_many finds free slots; cache.add claims one atomically.
+
+    Returns:
+        tuple: (key, token) to pass to :func:`release_slot`, or None if all are taken
+    """
+    keys = _slot_keys(backend)
+    taken = cache.get_many(keys)
+    free = [key for key in keys if key not in taken]
+    random.shuffle(free)
+    token = uuid.uuid4().hex
+    lease = _setting('LEASE_SECONDS', DEFAULT_LEASE_SECONDS)
+    for key in free:
+        if cache.add(key, token, lease):
+            _keeper.hold((key, token), lease)
+            return key, token
+    return None
+
+
+def release_slot(slot):
+    _keeper.drop(slot)
+    key, token = slot
+    # Don't free a slot whose lease expired and was re-acquired by someone else
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+def in_flight(backend):
+    return len(cache.get_many(_slot_keys(backend)))
+
+
+# -- view decorator -----------------------------------------------------------
+
+def note_backend_call():
+    """Mark the current request as having called the LLM / ASR service.
+
+    Call right before the first AI request. A submission rejected before
+    that point (missing fields, invalid file, unknown question) gets its
+    rate-limit token back; once a backend was called the token stays spent,
+    whatever the outcome.
+    """
+    if _backend_called.get() is not None:
+        _backend_called.set(True)
+
+
+def _reject(status, error, message, retry_after, endpoint, reason):
+    record_admission_rejection(endpoint, reason)
+    response = FastJsonResponse({"error": error, "message": message}, status=status)
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def admission_control(*backends):
+    """Rate-limit the user and reserve a slot on each backend for the whole request.
+
+    Apply below the login check, e.g. ``@admission_control('asr', 'llm')``.
+    """
+    def decorator(view_func):
+        endpoint = view_func.__name__
+
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if not _setting('ENABLED', True):
+                return view_func(request, *args, **kwargs)
+
+            slots = []
+            try:
+                # Slots first: a request turned away as busy mustn't cost the user a token
+                for backend in backends:
+                    slot = acquire_slot(backend)
+                    if slot is None:
+                        logger.warning(f"Admission rejected on {endpoint}: {backend} at capacity")
+                        return _reject(503, "SERVICE_BUSY", "The AI service is at capacity. Try again shortly.",
+                                       _setting('BUSY_RETRY_AFTER', DEFAULT_BUSY_RETRY_AFTER),
+                                       endpoint, f'{backend}_busy')
+                    slots.append(slot)
+
+                wait = take_token(request.user.id)
+                if wait:
+                    logger.warning(f"Rate limit hit on {endpoint} for user {request.user.id}")
+                    return _reject(429, "RATE_LIMITED", "Too many submissions. Try again shortly.",
+                                   wait, endpoint, 'rate_limit')
+
+                called = _backend_called.set(False)
+                try:
+                    response = view_func(request, *args, **kwargs)
+                    if response.status_code >= 400 and not _backend_called.get():
+                        refund_token(request.user.id)
+                finally:
+                    _backend_called.reset(called)
+                return response
+            finally:
+                for slot in slots:
+                    release_slot(slot)
+        return _wrapped
+    return decorator
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class Team7Config(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'team7'
+
+    def ready(self):
+        # Registers the question counter receivers
+        from . import health  # noqa: F401
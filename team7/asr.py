@@ -0,0 +1,194 @@
+"""
+Chunked ASR helpers for long speaking responses (FR-SP).
+
+Whisper latency grows with clip length, so long recordings are split at
+silence boundaries into slightly overlapping chunks that can be transcribed
+concurrently. The chunk transcripts are then stitched back together with the
+duplicated overlap removed, and the per-chunk segment timestamps are shifted
+back onto the timeline of the original recording.
+"""
+
+import io
+import re
+import wave
+
+import numpy as np
+
+FRAME_MS = 30
+SILENCE_RATIO = 0.1
+
+
+def read_wav(audio_file):
+    """Decode a 16-bit PCM WAV upload into mono samples.
+
+    Args:
+        audio_file: Django UploadedFile, file path or file-like object
+
+    Returns:
+        tuple: (samples: np.ndarray[int16], sample_rate: int) OR None if the
+        file is not a 16-bit PCM WAV
+    """
+    if hasattr(audio_file, 'seek'):
+        audio_file.seek(0)
+    try:
+        with wave.open(audio_file, 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                return None
+            channels = wav.getnchannels()
+            sample_rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    finally:
+        if hasattr(audio_file, 'seek'):
+            audio_file.seek(0)
+
+    samples = np.frombuffer(frames, dtype=np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, sample_rate
+
+
+def encode_wav(samples, sample_rate, name='chunk.wav'):
+    """Encode mono int16 samples as an in-memory WAV file for the ASR API."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(np.ascontiguousarray(samples, dtype=np.int16).tobytes())
+    buffer.seek(0)
+    buffer.name = name  # OpenAI SDK infers the format from the file name
+    return buffer
+
+
+def frame_energy(samples, sample_rate, frame_ms=FRAME_MS):
+    """Return RMS energy per non-overlapping frame and the frame length."""
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return np.zeros(0), frame_len
+    frames = samples[:n_frames * frame_len].astype(np.float32).reshape(n_frames, frame_len)
+    return np.sqrt(np.mean(frames ** 2, axis=1)), frame_len
+
+
+def quietest_frame(energy):
+    """Index of the centre of the quietest run of frames in ``energy``."""
+    floor = energy.min() + SILENCE_RATIO * (energy.mean() - energy.min())
+    best = int(np.argmin(energy))
+    quiet = energy <= floor
+    left = best
+    while left > 0 and quiet[left - 1]:
+        left -= 1
+    right = best
+    while right < len(energy) - 1 and quiet[right + 1]:
+        right += 1
+    return (left + right) // 2
+
+
+def split_on_silence(samples, sample_rate, chunk_sec=20.0, overlap_sec=0.5, search_sec=4.0):
+    """Plan overlapping chunk boundaries, cutting in the quietest frame.
+
+    Each cut is placed in the middle of the quietest pause found within
+    ``search_sec`` before (or half of that after) the nominal chunk end, so
+    words are rarely split; the small overlap covers the cases where no real
+    pause exists.
+
+    Args:
+        samples: Mono int16 samples
+        sample_rate: Samples per second
+        chunk_sec: Target chunk length in seconds
+        overlap_sec: Audio shared by consecutive chunks in seconds
+        search_sec: Window around each nominal cut searched for silence
+
+    Returns:
+        list: [(start_sample, end_sample), ...] covering the whole signal
+    """
+    total = len(samples)
+    chunk_len = int(chunk_sec * sample_rate)
+    if total <= chunk_len:
+        return [(0, total)]
+
+    energy, frame_len = frame_energy(samples, sample_rate)
+    overlap = int(overlap_sec * sample_rate)
+    search = int(search_sec * sample_rate)
+
+    bounds = []
+    start = 0
+    while start + chunk_len < total:
+        nominal = start + chunk_len
+        lo = max(start + chunk_len // 2, nominal - search) // frame_len
+        hi = min((nominal + search // 2) // frame_len, len(energy))
+        cut = nominal
+        if hi > lo:
+            cut = (lo + quietest_frame(energy[lo:hi])) * frame_len + frame_len // 2
+        bounds.append((start, min(cut + overlap, total)))
+        start = max(cut - overlap, start + 1)
+
+    # Fold a very short tail into the previous chunk instead of paying a
+    # whole ASR round-trip for a fraction of a second of audio.
+    if total - start < chunk_len // 4:
+        bounds[-1] = (bounds[-1][0], total)
+    else:
+        bounds.append((start, total))
+    return bounds
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def stitch_transcripts(texts, max_overlap_words=12):
+    """Join chunk transcripts, dropping words repeated across the overlap.
+
+    The longest run of words (up to ``max_overlap_words``) that ends one
+    chunk and starts the next is treated as the duplicated overlap and is
+    removed from the start of the later chunk.
+    """
+    stitched = []
+    for text in texts:
+        tokens = text.split()
+        if stitched and tokens:
+            tail = _words(' '.join(stitched[-max_overlap_words:]))
+            for k in range(min(max_overlap_words, len(tokens), len(tail)), 0, -1):
+                if tail[-k:] == _words(' '.join(tokens[:k])):
+                    tokens = tokens[k:]
+                    break
+        stitched.extend(tokens)
+    return ' '.join(stitched)
+
+
+def _segment_value(segment, key, default=None):
+    if isinstance(segment, dict):
+        return segment.get(key, default)
+    return getattr(segment, key, default)
+
+
+def merge_segments(chunk_segments, offsets):
+    """Shift per-chunk ASR segments onto the original timeline.
+
+    Segments that start inside audio already covered by the previous chunk
+    are skipped, so overlap regions are not reported twice.
+
+    Args:
+        chunk_segments: List of segment lists, one per chunk (verbose_json)
+        offsets: Chunk start times in seconds
+
+    Returns:
+        list: [{'start': float, 'end': float, 'text': str}, ...]
+    """
+    merged = []
+    covered_until = 0.0
+    for segments, offset in zip(chunk_segments, offsets):
+        for segment in segments or []:
+            start = float(_segment_value(segment, 'start', 0.0)) + offset
+            end = float(_segment_value(segment, 'end', 0.0)) + offset
+            if merged and start < covered_until - 0.05:
+                continue
+            merged.append({
+                'start': round(start, 2),
+                'end': round(end, 2),
+                'text': (_segment_value(segment, 'text', '') or '').strip(),
+            })
+            covered_until = max(covered_until, end)
+    return merged
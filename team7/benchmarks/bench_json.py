@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""Benchmark JSON serialization of the history and analytics payloads.
+
+Compares Django's JsonResponse (stdlib encoder + DjangoJSONEncoder) with
+core.json_utils.FastJsonResponse, and reports the body size raw, gzipped
+and (if the brotli package is installed) brotli-compressed, together with
+the compression time:
+
+    python team7/benchmarks/bench_json.py [--repeat 50]
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+import uuid
+from datetime import timedelta
+
+import django
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app404.settings')
+django.setup()
+
+from django.http import JsonResponse  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from core.json_utils import FastJsonResponse, brotli  # noqa: E402
+from team7.services import AnalyticsService  # noqa: E402
+
+CRITERIA = ('Delivery', 'Language Use', 'Topic Development', 'Organization')
+SIZES = (50, 500, 5000)
+
+
+def history_payload(n):
+    now = timezone.now()
+    attempts = [
+        {
+            "evaluation_id": str(uuid.uuid4()),
+            "task_type": "speaking",
+            "question_id": str(uuid.uuid4()),
+            "overall_score": 2 + (i % 20) / 10,
+            "created_at": (now - timedelta(minutes=i)).isoformat(),
+            "criteria": [{"name": c, "score": 3.0 + (i % 3) / 2} for c in CRITERIA],
+        }
+        for i in range(n)
+    ]
+    return {"status": "success", "total_attempts": n, "attempts": attempts, "has_more": False, "next_cursor": None}
+
+
+def analytics_payload(n):
+    history = history_payload(n)
+    attempts = history["attempts"]
+    scores = [a["overall_score"] for a in attempts]
+    return {
+        "status": "success",
+        "attempts": attempts,
+        "analytics": {
+            "overall": {
+                "statistics": AnalyticsService.calculate_statistics(scores),
+                "moving_average": AnalyticsService.calculate_moving_average(scores),
+                **AnalyticsService.calculate_trends(attempts[::-1]),
+            }
+        },
+    }
+
+
+def timed(func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'payload':<10} {'attempts':>8} {'stdlib ms':>10} {'fast ms':>8} {'raw KiB':>8} "
+          f"{'gzip KiB':>9} {'gzip ms':>8} {'br KiB':>7} {'br ms':>6}")
+    for name, build in (('history', history_payload), ('analytics', analytics_payload)):
+        for n in SIZES:
+            payload = build(n)
+            stdlib_ms, _ = timed(lambda: JsonResponse(payload), args.repeat)
+            fast_ms, response = timed(lambda: FastJsonResponse(payload), args.repeat)
+            body = response.content
+            gzip_ms, gzipped = timed(lambda: gzip.compress(body, compresslevel=5, mtime=0), args.repeat)
+            if brotli is not None:
+                br_ms, brotlied = timed(lambda: brotli.compress(body, quality=4), args.repeat)
+                br = f"{len(brotlied) / 1024:>7.1f} {br_ms:>6.2f}"
+            else:
+                br = f"{'-':>7} {'-':>6}"
+            print(f"{name:<10} {n:>8} {stdlib_ms:>10.2f} {fast_ms:>8.2f} {len(body) / 1024:>8.1f} "
+                  f"{len(gzipped) / 1024:>9.1f} {gzip_ms:>8.2f} {br}")
+
+
+if __name__ == '__main__':
+    main()
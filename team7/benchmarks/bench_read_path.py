@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""Benchmark the history/analytics read path (UC-03).
+
+Compares the previous model-instance read (select_related +
+prefetch_related + per-row serialization) with the projection-based
+``project_attempts`` path, reporting wall time, CPU time and peak Python
+allocations per request for users with 50, 500 and 5000 attempts.
+
+Runs against throwaway test databases, so it never touches real data:
+
+    python team7/benchmarks/bench_read_path.py [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app404.settings')
+os.environ.setdefault('AI_GENERATOR_API_KEY', 'benchmark')
+django.setup()
+
+from django.test.utils import setup_databases, teardown_databases  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from team7.models import DetailedScore, Evaluation, Question  # noqa: E402
+from team7.services import project_attempts  # noqa: E402
+
+CRITERIA = ('Delivery', 'Language Use', 'Topic Development', 'Organization')
+SIZES = (50, 500, 5000)
+
+
+def seed(question, n):
+    """Create ``n`` attempts with one score per criterion for a fresh user."""
+    user_id = uuid.uuid4()
+    now = timezone.now()
+    evaluations = [
+        Evaluation(user_id=user_id, question=question, task_type='speaking',
+                   overall_score=Decimal(str(2 + (i % 20) / 10)))
+        for i in range(n)
+    ]
+    Evaluation.objects.bulk_create(evaluations, batch_size=500)
+    # auto_now_add ignores provided values, so spread timestamps afterwards
+    for i, evaluation in enumerate(evaluations):
+        evaluation.created_at = now - timedelta(minutes=i)
+    Evaluation.objects.bulk_update(evaluations, ['created_at'], batch_size=500)
+    DetailedScore.objects.bulk_create(
+        [DetailedScore(evaluation=e, criterion=c, score_value=Decimal('3.0')) for e in evaluations for c in CRITERIA],
+        batch_size=500,
+    )
+    return user_id
+
+
+def legacy_read(user_id, limit):
+    evaluations = Evaluation.objects.filter(
+        user_id=user_id
+    ).select_related('question').prefetch_related('detailed_scores').order_by('-created_at')[:limit]
+    return [
+        {
+            "evaluation_id": str(e.evaluation_id),
+            "task_type": e.task_type,
+            "question_id": str(e.question.question_id),
+            "overall_score": float(e.overall_score) if e.overall_score else None,
+            "created_at": e.created_at.isoformat(),
+            "criteria": [{"name": ds.criterion, "score": float(ds.score_value)} for ds in e.detailed_scores.all()],
+        }
+        for e in evaluations
+    ]
+
+
+def projected_read(user_id, limit):
+    evaluations = Evaluation.objects.filter(user_id=user_id).order_by('-created_at')
+    return project_attempts(user_id, evaluations, limit)[1]
+
+
+def measure(func, user_id, limit, repeat):
+    func(user_id, limit)  # warm up query compilation and caches
+    wall = cpu = 0.0
+    for _ in range(repeat):
+        w0, c0 = time.perf_counter(), time.process_time()
+        func(user_id, limit)
+        wall += time.perf_counter() - w0
+        cpu += time.process_time() - c0
+
+    tracemalloc.start()
+    func(user_id, limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return wall / repeat * 1000, cpu / repeat * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    old_config = setup_databases(verbosity=0, interactive=False, aliases={'default', 'team7'})
+    try:
+        question = Question.objects.create(task_type='speaking', prompt_text='Benchmark prompt')
+        print(f"{'attempts':>8} {'path':<10} {'wall ms':>9} {'cpu ms':>9} {'peak KiB':>10}")
+        for n in SIZES:
+            user_id = seed(question, n)
+            assert legacy_read(user_id, n) == projected_read(user_id, n)
+            for name, func in (('legacy', legacy_read), ('projected', projected_read)):
+                wall, cpu, peak = measure(func, user_id, n, args.repeat)
+                print(f"{n:>8} {name:<10} {wall:>9.2f} {cpu:>9.2f} {peak:>10.1f}")
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
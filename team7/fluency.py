@@ -0,0 +1,120 @@
+"""
+Local acoustic fluency metrics for speaking responses (FR-SP).
+
+Computes temporal fluency measures from the PCM signal and the ASR
+verbose_json segments so the LLM does not have to guess "Delivery (pace)"
+from text alone. All frame-level work is vectorized with NumPy.
+
+When no PCM is available (MP3/FLAC uploads), speech and pause timing is
+derived from the gaps between ASR segments instead.
+"""
+
+import re
+
+import numpy as np
+
+from .asr import frame_energy
+
+MIN_PAUSE_SEC = 0.25
+LONG_PAUSE_SEC = 1.0
+FILLED_PAUSES = {'uh', 'um', 'er', 'ah', 'eh', 'erm', 'hmm', 'mm', 'uhm'}
+
+
+def _runs(mask):
+    """Return (starts, lengths) of consecutive True runs in a boolean array."""
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return starts, ends - starts
+
+
+def voiced_frames(samples, sample_rate, frame_ms=10):
+    """Energy-based voice activity per frame.
+
+    The threshold sits between the noise floor (10th percentile) and the
+    speech level (90th percentile) so it adapts to recording gain.
+
+    Returns:
+        tuple: (voiced: np.ndarray[bool], frame_sec: float)
+    """
+    energy, frame_len = frame_energy(samples, sample_rate, frame_ms=frame_ms)
+    if energy.size == 0:
+        return np.zeros(0, dtype=bool), frame_len / sample_rate
+    floor, peak = np.percentile(energy, [10, 90])
+    threshold = floor + 0.15 * (peak - floor)
+    return energy > threshold, frame_len / sample_rate
+
+
+def _pauses_from_pcm(samples, sample_rate):
+    voiced, frame_sec = voiced_frames(samples, sample_rate)
+    if not voiced.any():
+        return np.zeros(0), 0.0
+    first, last = np.flatnonzero(voiced)[[0, -1]]
+    inner = voiced[first:last + 1]
+    _, silent_lengths = _runs(~inner)
+    return silent_lengths * frame_sec, float(inner.sum() * frame_sec)
+
+
+def _pauses_from_segments(segments):
+    if not segments:
+        return np.zeros(0), 0.0
+    starts = np.array([s['start'] for s in segments], dtype=float)
+    ends = np.array([s['end'] for s in segments], dtype=float)
+    gaps = starts[1:] - ends[:-1]
+    return gaps[gaps > 0], float(np.sum(ends - starts))
+
+
+def extract_fluency_features(transcript, segments=None, samples=None, sample_rate=None, duration=None):
+    """Compute compact temporal fluency measures for one response.
+
+    Args:
+        transcript: ASR transcript text
+        segments: ASR segments [{'start', 'end', 'text'}, ...]
+        samples: Optional mono int16 PCM samples
+        sample_rate: Samples per second for ``samples``
+        duration: Recording length in seconds (derived if omitted)
+
+    Returns:
+        dict: speech_rate_wpm, articulation_rate_wpm, pause_count,
+              long_pause_count, mean/median/p90 pause length, pause_ratio,
+              filled_pause_ratio, mean_length_of_run, phonation_time_sec,
+              duration_sec OR None if there is nothing to measure
+    """
+    tokens = re.findall(r"[a-z']+", (transcript or '').lower())
+    if not tokens:
+        return None
+
+    if samples is not None and sample_rate:
+        silences, phonation = _pauses_from_pcm(samples, sample_rate)
+        duration = duration or len(samples) / sample_rate
+    else:
+        silences, phonation = _pauses_from_segments(segments)
+        duration = duration or (segments[-1]['end'] if segments else None)
+
+    if not duration or phonation <= 0:
+        return None
+
+    pauses = silences[silences >= MIN_PAUSE_SEC]
+    n_words = len(tokens)
+    filled = sum(1 for t in tokens if t in FILLED_PAUSES)
+
+    return {
+        'speech_rate_wpm': round(n_words / duration * 60, 1),
+        'articulation_rate_wpm': round(n_words / phonation * 60, 1),
+        'pause_count': int(pauses.size),
+        'long_pause_count': int(np.count_nonzero(pauses >= LONG_PAUSE_SEC)),
+        'mean_pause_sec': round(float(pauses.mean()), 2) if pauses.size else 0.0,
+        'median_pause_sec': round(float(np.median(pauses)), 2) if pauses.size else 0.0,
+        'p90_pause_sec': round(float(np.percentile(pauses, 90)), 2) if pauses.size else 0.0,
+        'pause_ratio': round(float(pauses.sum()) / duration, 3),
+        'filled_pause_ratio': round(filled / n_words, 3),
+        'mean_length_of_run': round(n_words / (pauses.size + 1), 1),
+        'phonation_time_sec': round(phonation, 2),
+        'duration_sec': round(float(duration), 2),
+    }
+
+
+def format_for_prompt(metrics):
+    """Render metrics as one compact line for the LLM prompt."""
+    return ', '.join(f"{key}={value}" for key, value in metrics.items())
@@ -0,0 +1,271 @@
+"""
+Background health probes for the admin health endpoint (UC-04, NFR-AVAIL-01).
+
+Probes (database ping, LLM reachability, API performance, database
+statistics) run on daemon threads every HEALTH_PROBE_INTERVAL seconds, each
+with a hard timeout and at most one run in flight, and store their results
+in the cache with the time they were taken. ``admin_health`` only reads those cached results, so
+a monitoring system polling it adds no database or LLM load and can never
+hang a worker.
+
+Evaluation and question counters are updated as rows commit; the database
+statistics probe only re-counts when a counter is missing from the cache.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Evaluation, Question
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_INTERVAL = 30
+HEALTH_PROBE_TIMEOUT = 5
+COUNTER_TTL = 3600  # counters are re-counted from the database at least hourly
+
+_RESULT_KEY = 'team7:health:{}'
+_LEADER_KEY = 'team7:health:leader'
+_TOTAL_KEY = 'team7:stats:evaluations_total'
+_DAY_KEY = 'team7:stats:evaluations:{}'
+_QUESTIONS_KEY = 'team7:stats:questions_total'
+
+
+def _interval():
+    return getattr(settings, 'TEAM7_HEALTH_PROBE_INTERVAL', HEALTH_PROBE_INTERVAL)
+
+
+def _timeout():
+    return getattr(settings, 'TEAM7_HEALTH_PROBE_TIMEOUT', HEALTH_PROBE_TIMEOUT)
+
+
+# -- counters ------------------------------------------------------------
+
+def record_evaluation(created_at):
+    """Count a committed evaluation (call from transaction.on_commit).
+
+    Missing counters are left alone; the next probe re-counts them.
+    """
+    for key in (_TOTAL_KEY, _DAY_KEY.format(timezone.localdate(created_at).isoformat())):
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass
+
+
+def _count_question(delta):
+    def _after_commit():
+        try:
+            cache.incr(_QUESTIONS_KEY, delta)
+        except ValueError:
+            pass
+
+    transaction.on_commit(_after_commit, using=router.db_for_write(Question))
+
+
+@receiver(post_save, sender=Question, dispatch_uid='team7.health.question_saved')
+def _question_saved(sender, created, **kwargs):
+    if created:
+        _count_question(1)
+
+
+@receiver(post_delete, sender=Question, dispatch_uid='team7.health.question_deleted')
+def _question_deleted(sender, **kwargs):
+    _count_question(-1)
+
+
+# -- probes ----------------------------------------------------------------
+
+def probe_database():
+    with connections[router.db_for_read(Evaluation)].cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    return {"status": "healthy", "message": "Database connection successful"}
+
+
+def probe_llm():
+    from openai import OpenAI
+
+    client = OpenAI(
+        api_key=getattr(settings, 'AI_GENERATOR_API_KEY', None),
+        base_url=getattr(settings, 'AI_GENERATOR_BASE_URL', 'https://api.gpt4-all.xyz/v1'),
+        timeout=_timeout(),
+        max_retries=0
+    )
+    models = client.models.list()
+    return {
+        "status": "healthy",
+        "message": "LLM API accessible",
+        "models_available": len(models.data) if hasattr(models, 'data') else 0
+    }
+
+
+def probe_api_performance():
+    from .services import APILogRollupService
+
+    summary = APILogRollupService.summarize(timezone.now() - timedelta(hours=24))
+    total = summary["total_requests"]
+    error_rate = (summary["error_requests"] / total * 100) if total > 0 else 0
+    avg_latency = summary["avg_latency_ms"]
+    percentiles = summary["latency_percentiles_ms"]
+
+    # The tail matters more than the mean: flag p99 approaching the
+    # gateway's proxy_read_timeout
+    gateway_timeout_ms = getattr(settings, 'TEAM7_GATEWAY_TIMEOUT_MS', 60000)
+    near_timeout = (percentiles["p99"] or 0) >= 0.8 * gateway_timeout_ms
+    return {
+        "status": "healthy" if error_rate < 10 and avg_latency < 5000 and not near_timeout else "degraded",
+        "total_requests_24h": total,
+        "error_requests_24h": summary["error_requests"],
+        "error_rate": round(error_rate, 2),
+        "avg_latency_ms": round(avg_latency, 2),
+        "latency_percentiles_ms": percentiles,
+        "gateway_timeout_ms": gateway_timeout_ms,
+        "slowest_endpoints": summary["slowest_endpoints"]
+    }
+
+
+def probe_database_stats():
+    today = timezone.localdate()
+    day_key = _DAY_KEY.format(today.isoformat())
+    if cache.get(_TOTAL_KEY) is None:
+        cache.add(_TOTAL_KEY, Evaluation.objects.count(), COUNTER_TTL)
+    if cache.get(day_key) is None:
+        start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+        cache.add(day_key, Evaluation.objects.filter(created_at__gte=start).count(), COUNTER_TTL)
+    if cache.get(_QUESTIONS_KEY) is None:
+        cache.add(_QUESTIONS_KEY, Question.objects.count(), COUNTER_TTL)
+    return {
+        "status": "info",
+        "total_evaluations": cache.get(_TOTAL_KEY),
+        "total_questions": cache.get(_QUESTIONS_KEY),
+        "evaluations_today": cache.get(day_key)
+    }
+
+
+PROBES = {
+    'database': probe_database,
+    'llm_service': probe_llm,
+    'api_performance': probe_api_performance,
+    'database_stats': probe_database_stats,
+}
+
+
+_in_flight = {}  # probe name -> thread of its latest run
+_in_flight_lock = threading.Lock()
+
+
+def run_probe(name, probe, timeout):
+    """Run one probe on a daemon thread, giving up after ``timeout`` seconds.
+
+    A probe that times out keeps its thread until it returns. While that
+    run is still in flight the probe is reported as such instead of being
+    started again, so a hanging dependency ties up at most one thread per
+    probe.
+
+    Returns:
+        dict: The probe's result plus checked_at and duration_ms
+    """
+    outcome = {}
+
+    def _target():
+        try:
+            outcome['result'] = probe()
+        except Exception as e:
+            outcome['error'] = e
+        finally:
+            connections.close_all()
+
+    start = time.monotonic()
+    with _in_flight_lock:
+        previous = _in_flight.get(name)
+        if previous is not None and previous.is_alive():
+            worker = None
+        else:
+            worker = _in_flight[name] = threading.Thread(target=_target, name=f'team7-health-{name}', daemon=True)
+            worker.start()
+
+    if worker is None:
+        logger.warning(f"Health probe {name} skipped: previous run still in progress")
+        result = {"status": "unhealthy", "message": f"{name} still running from a previous check"}
+    else:
+        worker.join(timeout)
+        if 'result' in outcome:
+            result = outcome['result']
+        elif 'error' in outcome:
+            logger.warning(f"Health probe {name} failed: {str(outcome['error'])}")
+            result = {"status": "unhealthy", "message": f"{name} error: {str(outcome['error'])}"}
+        else:
+            logger.warning(f"Health probe {name} timed out after {timeout}s")
+            result = {"status": "unhealthy", "message": f"{name} timed out after {timeout}s"}
+
+    result["checked_at"] = time.time()
+    result["duration_ms"] = int((time.monotonic() - start) * 1000)
+    return result
+
+
+def run_probes():
+    """Run every probe and cache the results (kept for three intervals)."""
+    timeout = _timeout()
+    for name, probe in PROBES.items():
+        cache.set(_RESULT_KEY.format(name), run_probe(name, probe, timeout), 3 * _interval())
+
+
+def cached_results():
+    """Latest cached result per probe with its age; never touches the database.
+
+    Returns:
+        dict: {name: result dict with 'age_sec', or None if not probed yet}
+    """
+    stored = cache.get_many([_RESULT_KEY.format(name) for name in PROBES])
+    now = time.time()
+    results = {}
+    for name in PROBES:
+        result = stored.get(_RESULT_KEY.format(name))
+        if result is not None:
+            result = dict(result, age_sec=round(now - result["checked_at"], 1))
+            result["checked_at"] = datetime.fromtimestamp(result["checked_at"], tz=dt_timezone.utc).isoformat()
+        results[name] = result
+    return results
+
+
+class HealthMonitor:
+    """Daemon thread running the probes on a fixed schedule.
+
+    With several workers sharing a cache, a short-lived leader key makes
+    sure only one of them probes per interval.
+    """
+
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='team7-health-monitor', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            interval = _interval()
+            if cache.add(_LEADER_KEY, os.getpid(), max(1, interval - 1)):
+                try:
+                    run_probes()
+                except Exception as e:
+                    logger.error(f"Health probes failed: {str(e)}")
+            time.sleep(interval)
+
+
+monitor = HealthMonitor()
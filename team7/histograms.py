@@ -0,0 +1,108 @@
+"""
+Log-linear (HDR-style) latency histograms for API monitoring (FR-MON, UC-04).
+
+Values below 2^SIGNIFICANT_BITS ms are counted exactly; above that each
+power-of-two range is split into 2^(SIGNIFICANT_BITS - 1) equal buckets,
+so any recorded latency is reported within ~3% regardless of magnitude
+(a 40 ms cache hit and a 55 s LLM call are both resolved). Histograms are
+sparse, JSON-serializable and merge by adding bucket counts, so each worker
+can summarize its own requests and the totals combine exactly.
+"""
+
+import math
+
+SIGNIFICANT_BITS = 6
+_LINEAR = 1 << SIGNIFICANT_BITS          # values counted exactly
+_HALF = _LINEAR >> 1                     # buckets per power of two above that
+
+
+def bucket_index(value):
+    """Bucket index for a non-negative integer latency in ms."""
+    value = max(0, int(value))
+    if value < _LINEAR:
+        return value
+    shift = value.bit_length() - SIGNIFICANT_BITS
+    return _LINEAR + (shift - 1) * _HALF + ((value >> shift) - _HALF)
+
+
+def bucket_bounds(index):
+    """Inclusive (lowest, highest) value that falls into bucket ``index``."""
+    if index < _LINEAR:
+        return index, index
+    shift, offset = divmod(index - _LINEAR, _HALF)
+    mantissa = offset + _HALF
+    return mantissa << (shift + 1), ((mantissa + 1) << (shift + 1)) - 1
+
+
+class LatencyHistogram:
+    """Sparse log-linear histogram of millisecond latencies."""
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value, count=1):
+        value = max(0, int(value))
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """Add another histogram's counts into this one (in place) and return self."""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def value_at_percentile(self, percentile):
+        """Highest value equivalent to the given percentile (0-100), capped at max."""
+        if not self.count:
+            return None
+        target = max(1, math.ceil(percentile / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(bucket_bounds(index)[1], self.max)
+        return self.max
+
+    def summary(self):
+        """p50/p90/p99/max and mean in ms (all None when empty)."""
+        return {
+            'p50': self.value_at_percentile(50),
+            'p90': self.value_at_percentile(90),
+            'p99': self.value_at_percentile(99),
+            'max': self.max,
+            'mean': round(self.total / self.count, 2) if self.count else None,
+        }
+
+    def to_dict(self):
+        return {
+            'b': [[index, count] for index, count in sorted(self.counts.items())],
+            'n': self.count,
+            'sum': self.total,
+            'min': self.min,
+            'max': self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild from :meth:`to_dict` output (anything else gives an empty histogram)."""
+        histogram = cls()
+        if isinstance(data, dict) and data.get('n'):
+            histogram.counts = {int(index): int(count) for index, count in data['b']}
+            histogram.count = int(data['n'])
+            histogram.total = int(data['sum'])
+            histogram.min = data['min']
+            histogram.max = data['max']
+        return histogram
@@ -0,0 +1,203 @@
+"""
+Background, batched APILog writer (FR-MON, NFR-AVAIL-01).
+
+APILoggingMiddleware hands each finished request to an in-memory queue
+instead of inserting an APILog row itself. A daemon thread drains the
+queue and writes rows with ``bulk_create`` once a batch fills up or the
+flush interval elapses, so request latency never includes a database
+write. When the queue is full, records are dropped and counted rather than
+slowing requests down. The queue is flushed at interpreter exit.
+
+Each written batch is also folded into the per-minute APILogRollup rows
+read by the health check.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from core.sqlite_tuning import retry_on_busy
+
+from .models import APILog
+from .services import APILogRollupService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL_MS = 1000
+DEFAULT_MAX_QUEUE = 10000
+
+
+class _FlushMarker:
+    """Queue item asking the worker to write what it holds and report back."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class APILogWriter:
+    """Queue APILog records and persist them in batches.
+
+    Args:
+        batch_size: Write as soon as this many records are pending
+        flush_interval_ms: Max time a record waits before being written
+        max_queue: Records held in memory before new ones are dropped
+        background: Start a daemon worker thread (False writes only on flush())
+        rollups: Update APILogRollup rows for every written batch
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, flush_interval_ms=DEFAULT_FLUSH_INTERVAL_MS,
+                 max_queue=DEFAULT_MAX_QUEUE, background=True, rollups=True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.background = background
+        self.rollups = rollups
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def enqueue(self, **fields):
+        """Queue one APILog row (model field values); never blocks.
+
+        Returns:
+            bool: False if the record was dropped because the queue is full
+        """
+        if self.background:
+            self._ensure_worker()
+        try:
+            self._queue.put_nowait(fields)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                dropped = self.dropped
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(f"API log queue full; {dropped} records dropped so far")
+            return False
+
+    def flush(self, timeout=5.0):
+        """Write every record queued so far; returns once they are persisted."""
+        if self._thread is not None and self._thread.is_alive():
+            marker = _FlushMarker()
+            try:
+                self._queue.put(marker, timeout=timeout)
+            except queue.Full:
+                return False
+            return marker.done.wait(timeout)
+
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if not isinstance(item, _FlushMarker):
+                batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        self._write(batch)
+        return True
+
+    def stats(self):
+        """Counters for the health dashboard."""
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+        }
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='team7-apilog-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch, markers = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, _FlushMarker):
+                    markers.append(item)
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            # This thread never sees request boundaries, where Django drops
+            # expired or broken persistent connections; do it per batch
+            close_old_connections()
+            self._write(batch)
+            for marker in markers:
+                marker.done.set()
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            retry_on_busy(APILog.objects.bulk_create)(
+                [APILog(**fields) for fields in batch], batch_size=self.batch_size
+            )
+            self.written += len(batch)
+        except Exception as e:
+            # Don't let logging errors take the worker down
+            with self._lock:
+                self.dropped += len(batch)
+            logger.error(f"Failed to write {len(batch)} API log records: {str(e)}")
+            return
+
+        if self.rollups:
+            try:
+                APILogRollupService.record_logs(batch)
+            except Exception as e:
+                logger.error(f"Failed to update API log rollups: {str(e)}")
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Return the process-wide writer, configured from settings on first use."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = APILogWriter(
+                    batch_size=getattr(settings, 'TEAM7_APILOG_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+                    flush_interval_ms=getattr(settings, 'TEAM7_APILOG_FLUSH_MS', DEFAULT_FLUSH_INTERVAL_MS),
+                    max_queue=getattr(settings, 'TEAM7_APILOG_MAX_QUEUE', DEFAULT_MAX_QUEUE),
+                    background=getattr(settings, 'TEAM7_APILOG_BACKGROUND', True),
+                    rollups=getattr(settings, 'TEAM7_APILOG_ROLLUPS', True),
+                )
+                atexit.register(_writer.flush)
+    return _writer
+
+
+def close_writer():
+    """Write what the process-wide writer still holds and discard it.
+
+    For callers that must finish logging before the database goes away,
+    such as the test runner; the next get_writer() starts a fresh one.
+    """
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        atexit.unregister(writer.flush)
+        writer.flush()
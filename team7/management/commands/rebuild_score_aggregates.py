@@ -0,0 +1,34 @@
+"""
+Management command to (re)build per-user score aggregates from evaluations.
+Backfills UserScoreAggregate for attempts made before it existed (UC-03).
+
+Usage:
+    python manage.py rebuild_score_aggregates
+    python manage.py rebuild_score_aggregates --user <uuid>
+"""
+from django.core.management.base import BaseCommand
+from team7.models import Evaluation
+from team7.services import ScoreAggregateService
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds per-user score aggregates from the evaluation history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Only rebuild aggregates for this user UUID',
+        )
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user_ids = [options['user']]
+        else:
+            user_ids = Evaluation.objects.order_by().values_list('user_id', flat=True).distinct()
+
+        rebuilt = 0
+        for user_id in user_ids:
+            ScoreAggregateService.rebuild_for_user(user_id)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt score aggregates for {rebuilt} users'))
@@ -0,0 +1,51 @@
+"""
+Management command to rebuild cohort score sketches from all evaluations.
+Backfills ScoreSketch for evaluations scored before it existed (UC-03).
+
+Usage:
+    python manage.py rebuild_score_sketches
+"""
+from django.core.management.base import BaseCommand
+from django.db import router, transaction
+from team7.models import DetailedScore, Evaluation, ScoreSketch
+from team7.sketches import TDigest
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds cohort percentile sketches from the evaluation history'
+
+    def handle(self, *args, **options):
+        digests = {}
+
+        def add(task_type, criterion, rubric_version_id, score):
+            if score is None:
+                return
+            key = (task_type, criterion, rubric_version_id or '')
+            if key not in digests:
+                digests[key] = TDigest()
+            digests[key].add(float(score))
+
+        overall = Evaluation.objects.order_by().values_list('task_type', 'rubric_version_id', 'overall_score')
+        for task_type, rubric_version_id, score in overall.iterator():
+            add(task_type, ScoreSketch.OVERALL, rubric_version_id, score)
+
+        criteria = DetailedScore.objects.order_by().values_list(
+            'evaluation__task_type', 'criterion', 'evaluation__rubric_version_id', 'score_value'
+        )
+        for task_type, criterion, rubric_version_id, score in criteria.iterator():
+            add(task_type, criterion, rubric_version_id, score)
+
+        with transaction.atomic(using=router.db_for_write(ScoreSketch)):
+            ScoreSketch.objects.all().delete()
+            ScoreSketch.objects.bulk_create([
+                ScoreSketch(
+                    task_type=task_type,
+                    criterion=criterion,
+                    rubric_version_id=rubric_version_id,
+                    count=int(digest.count),
+                    digest=digest.to_dict()
+                )
+                for (task_type, criterion, rubric_version_id), digest in digests.items()
+            ])
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(digests)} score sketches'))
@@ -0,0 +1,35 @@
+"""
+Management command to maintain APILog rollups and prune old API logs.
+Rebuilds APILogRollup from raw logs (e.g. after enabling rollups or
+restoring logs) and applies the retention policy (FR-MON, UC-04).
+
+Usage:
+    python manage.py rollup_api_logs                 # prune only
+    python manage.py rollup_api_logs --rebuild-hours 24
+    python manage.py rollup_api_logs --rebuild-hours 24 --no-prune
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from team7.services import APILogRollupService
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds recent API log rollups and prunes logs past their retention'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild-hours', type=int, default=0,
+                            help='Recompute rollups from raw logs for the last N hours')
+        parser.add_argument('--no-prune', action='store_true',
+                            help='Skip deleting raw logs and rollups past retention')
+
+    def handle(self, *args, **options):
+        if options['rebuild_hours'] > 0:
+            since = timezone.now() - timedelta(hours=options['rebuild_hours'])
+            written = APILogRollupService.rebuild(since)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} rollup rows since {since:%Y-%m-%d %H:%M}'))
+
+        if not options['no_prune']:
+            raw, rollups = APILogRollupService.prune()
+            self.stdout.write(self.style.SUCCESS(f'Pruned {raw} API logs and {rollups} rollup rows'))
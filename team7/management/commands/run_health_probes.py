@@ -0,0 +1,20 @@
+"""
+Management command to run the admin health probes once and cache the results.
+For deployments that set TEAM7_HEALTH_BACKGROUND=False and schedule probes
+with cron instead of the in-process monitor thread (UC-04).
+
+Usage:
+    python manage.py run_health_probes
+"""
+from django.core.management.base import BaseCommand
+from team7 import health
+
+
+class Command(BaseCommand):
+    help = 'Runs the team7 health probes and caches their results'
+
+    def handle(self, *args, **options):
+        health.run_probes()
+        for name, result in health.cached_results().items():
+            status = result["status"] if result else "not cached"
+            self.stdout.write(f'{name}: {status}')
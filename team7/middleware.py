@@ -2,17 +2,27 @@
 Middleware for Team7 API request logging and monitoring.
 
 Automatically logs all API requests to the APILog model for
-system health monitoring and performance analysis.
+system health monitoring and performance analysis. Rows are handed to the
+background writer in log_writer.py, so no request waits on the insert.
 """
 
 import time
 import logging
+from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
-from .models import APILog
+from core.middleware import is_stateless_api_path
+from .log_writer import get_writer
+from . import tracing
 
 logger = logging.getLogger(__name__)
 
 
+def is_team7_api_path(path):
+    """Team7 JSON API paths: /team7/team7/api/... when mounted in app404,
+    /team7/api/... under team7's standalone settings."""
+    return path.startswith('/team7/') and is_stateless_api_path(path)
+
+
 class APILoggingMiddleware(MiddlewareMixin):
     """Middleware to log API requests for monitoring (FR-MON, UC-04).
     
@@ -24,18 +34,32 @@ class APILoggingMiddleware(MiddlewareMixin):
         - Error messages (for failed requests)
     
     Usage:
-        Add 'team7.middleware.APILoggingMiddleware' to MIDDLEWARE in settings.py
+        Listed near the top of MIDDLEWARE in app404/settings.py, so the
+        latency and root trace span cover the rest of the stack
     """
 
     def process_request(self, request):
-        """Mark the start time of the request."""
+        """Mark the start time of the request and open its root trace span."""
         request._start_time = time.time()
+        if is_team7_api_path(request.path_info):
+            request._trace = tracing.start_span('http.request', method=request.method, path=request.path)
         return None
 
+    def _end_trace(self, request, response=None):
+        trace = getattr(request, '_trace', None)
+        if trace is None:
+            return
+        del request._trace
+        span, token = trace
+        if response is not None:
+            span.set_attribute('status_code', response.status_code)
+            response['X-Trace-Id'] = span.trace_id
+        tracing.end_span(span, token)
+
     def process_response(self, request, response):
         """Log the completed request to database."""
         # Only log team7 API endpoints
-        if not request.path.startswith('/team7/api/'):
+        if not is_team7_api_path(request.path_info):
             return response
 
         # Calculate latency
@@ -52,43 +76,41 @@ class APILoggingMiddleware(MiddlewareMixin):
         # Extract error message for failed requests
         error_message = None
         if response.status_code >= 400:
-            try:
-                # Try to extract error from JSON response
-                if hasattr(response, 'content'):
-                    import json
-                    error_data = json.loads(response.content)
-                    error_message = error_data.get('message', error_data.get('error', ''))
-            except:
+            # FastJsonResponse keeps its payload, so the body needn't be re-parsed
+            error_data = getattr(response, 'data', None)
+            if isinstance(error_data, dict):
+                error_message = error_data.get('message', error_data.get('error', ''))
+            else:
                 error_message = f"HTTP {response.status_code}"
 
         # Get request and response sizes
-        request_size = len(request.body) if hasattr(request, 'body') else None
+        # From the header: request.body can't be read once a multipart upload
+        # has been parsed from the stream
+        request_size = int(request.META.get('CONTENT_LENGTH') or 0) or None
         response_size = len(response.content) if hasattr(response, 'content') else None
 
-        # Log to database (async to avoid blocking)
-        try:
-            APILog.objects.create(
-                user_id=user_id,
-                endpoint=request.path,
-                method=request.method,
-                status_code=response.status_code,
-                latency_ms=latency_ms,
-                error_message=error_message,
-                request_size=request_size,
-                response_size=response_size
-            )
-        except Exception as e:
-            # Don't let logging errors break the request
-            logger.error(f"Failed to log API request: {str(e)}")
+        # Queue for the background writer (never blocks the request)
+        get_writer().enqueue(
+            user_id=user_id,
+            endpoint=request.path,
+            method=request.method,
+            status_code=response.status_code,
+            latency_ms=latency_ms,
+            error_message=error_message,
+            request_size=request_size,
+            response_size=response_size,
+            timestamp=timezone.now()
+        )
 
         # Add latency header for debugging
         response['X-Response-Time'] = f"{latency_ms}ms"
+        self._end_trace(request, response)
 
         return response
 
     def process_exception(self, request, exception):
         """Log exceptions that occur during request processing."""
-        if not request.path.startswith('/team7/api/'):
+        if not is_team7_api_path(request.path_info):
             return None
 
         # Calculate latency
@@ -103,16 +125,14 @@ class APILoggingMiddleware(MiddlewareMixin):
             user_id = str(request.user.id)
 
         # Log the exception
-        try:
-            APILog.objects.create(
-                user_id=user_id,
-                endpoint=request.path,
-                method=request.method,
-                status_code=500,  # Internal Server Error
-                latency_ms=latency_ms,
-                error_message=str(exception)
-            )
-        except Exception as e:
-            logger.error(f"Failed to log API exception: {str(e)}")
+        get_writer().enqueue(
+            user_id=user_id,
+            endpoint=request.path,
+            method=request.method,
+            status_code=500,  # Internal Server Error
+            latency_ms=latency_ms,
+            error_message=str(exception),
+            timestamp=timezone.now()
+        )
 
         return None  # Let Django handle the exception normally
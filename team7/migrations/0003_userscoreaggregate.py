@@ -0,0 +1,38 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team7', '0002_evaluation_fluency_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserScoreAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.UUIDField(help_text='Reference to Core User UUID')),
+                ('task_type', models.CharField(help_text="'writing', 'speaking' or 'all'", max_length=20)),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('score_count', models.PositiveIntegerField(default=0, help_text='Attempts that received an overall score')),
+                ('score_sum', models.FloatField(default=0.0)),
+                ('score_sum_sq', models.FloatField(default=0.0)),
+                ('min_score', models.FloatField(blank=True, null=True)),
+                ('max_score', models.FloatField(blank=True, null=True)),
+                ('first_score', models.FloatField(blank=True, null=True)),
+                ('last_score', models.FloatField(blank=True, null=True)),
+                ('ewma', models.FloatField(blank=True, help_text='Exponentially weighted moving average of scores', null=True)),
+                ('recent_scores', models.JSONField(default=list, help_text='Bounded ring of the most recent scores (oldest first)')),
+                ('first_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='userscoreaggregate',
+            constraint=models.UniqueConstraint(fields=('user_id', 'task_type'), name='team7_unique_user_task_aggregate'),
+        ),
+    ]
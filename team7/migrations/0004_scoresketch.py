@@ -0,0 +1,29 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team7', '0003_userscoreaggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_type', models.CharField(choices=[('writing', 'Writing'), ('speaking', 'Speaking')], max_length=20)),
+                ('criterion', models.CharField(help_text="Criterion name or 'overall'", max_length=50)),
+                ('rubric_version_id', models.CharField(max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('digest', models.JSONField(default=dict, help_text='Serialized t-digest centroids')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='scoresketch',
+            constraint=models.UniqueConstraint(fields=('task_type', 'criterion', 'rubric_version_id'), name='team7_unique_score_sketch'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:38
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team7', '0004_scoresketch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apilog',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
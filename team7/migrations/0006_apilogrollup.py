@@ -0,0 +1,33 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team7', '0005_apilog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APILogRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField(help_text='Start of the minute')),
+                ('endpoint', models.CharField(max_length=200)),
+                ('status_class', models.PositiveSmallIntegerField(help_text='HTTP status // 100 (2, 3, 4 or 5)')),
+                ('request_count', models.PositiveIntegerField(default=0)),
+                ('latency_sum_ms', models.BigIntegerField(default=0)),
+                ('latency_max_ms', models.IntegerField(default=0)),
+                ('latency_histogram', models.JSONField(default=list, help_text='Counts per LATENCY_BUCKETS_MS bucket')),
+            ],
+            options={
+                'ordering': ['-bucket_start'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='apilogrollup',
+            constraint=models.UniqueConstraint(fields=('bucket_start', 'endpoint', 'status_class'), name='team7_unique_apilog_rollup'),
+        ),
+    ]
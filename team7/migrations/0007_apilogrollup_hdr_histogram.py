@@ -0,0 +1,27 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:42
+
+from django.db import migrations, models
+
+
+def drop_fixed_bucket_rollups(apps, schema_editor):
+    """Fixed-bucket histograms can't be converted; rebuild them with
+    ``manage.py rollup_api_logs --rebuild-hours N`` from the raw logs."""
+    APILogRollup = apps.get_model('team7', 'APILogRollup')
+    stale = [pk for pk, data in APILogRollup.objects.values_list('pk', 'latency_histogram') if isinstance(data, list)]
+    APILogRollup.objects.filter(pk__in=stale).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team7', '0006_apilogrollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apilogrollup',
+            name='latency_histogram',
+            field=models.JSONField(default=dict, help_text='Serialized log-linear LatencyHistogram'),
+        ),
+        migrations.RunPython(drop_fixed_bucket_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 15:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team7', '0007_apilogrollup_hdr_histogram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evaluation',
+            name='stage_timings',
+            field=models.JSONField(blank=True, help_text='Milliseconds per traced stage (question lookup, LLM, persistence, ...)', null=True),
+        ),
+    ]
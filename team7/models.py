@@ -1,7 +1,10 @@
 import uuid
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .histograms import LatencyHistogram
+
 class TaskType(models.TextChoices):
     WRITING = 'writing', _('Writing')
     SPEAKING = 'speaking', _('Speaking')
@@ -35,7 +38,9 @@ class Evaluation(models.Model):
     overall_score = models.DecimalField(max_digits=3, decimal_places=1, null=True, blank=True)
     ai_feedback = models.TextField(blank=True, null=True)
     transcript_text = models.TextField(blank=True, null=True) # For Speaking ASR result
+    fluency_metrics = models.JSONField(blank=True, null=True, help_text="Local acoustic fluency features (Speaking only)")
     rubric_version_id = models.CharField(max_length=50, blank=True, null=True, help_text="Track rubric version for scoring consistency")
+    stage_timings = models.JSONField(blank=True, null=True, help_text="Milliseconds per traced stage (question lookup, LLM, persistence, ...)")
     
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -69,7 +74,8 @@ class APILog(models.Model):
     method = models.CharField(max_length=10, default='GET', help_text="HTTP method")
     status_code = models.IntegerField(help_text="HTTP response status code")
     latency_ms = models.IntegerField(help_text="Request processing time in milliseconds")
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Set when the request finishes; rows are written later in batches
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
     
     # Optional fields for detailed debugging
     error_message = models.TextField(blank=True, null=True, help_text="Error details if status >= 400")
@@ -85,4 +91,145 @@ class APILog(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.method} {self.endpoint} - {self.status_code} ({self.latency_ms}ms)"
\ No newline at end of file
+        return f"{self.method} {self.endpoint} - {self.status_code} ({self.latency_ms}ms)"
+
+
+class APILogRollup(models.Model):
+    """Per-minute APILog summary for the health dashboard (FR-MON, UC-04).
+    
+    One row per (minute, endpoint, status class). Maintained incrementally
+    by the background log writer, so health checks read a bounded number of
+    small rows instead of scanning raw logs, which can then be pruned.
+    """
+    bucket_start = models.DateTimeField(help_text="Start of the minute")
+    endpoint = models.CharField(max_length=200)
+    status_class = models.PositiveSmallIntegerField(help_text="HTTP status // 100 (2, 3, 4 or 5)")
+    request_count = models.PositiveIntegerField(default=0)
+    latency_sum_ms = models.BigIntegerField(default=0)
+    latency_max_ms = models.IntegerField(default=0)
+    latency_histogram = models.JSONField(default=dict, help_text="Serialized log-linear LatencyHistogram")
+
+    class Meta:
+        ordering = ['-bucket_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['bucket_start', 'endpoint', 'status_class'], name='team7_unique_apilog_rollup'
+            ),
+        ]
+
+    @staticmethod
+    def bucket_for(timestamp):
+        return timestamp.replace(second=0, microsecond=0)
+
+    @property
+    def histogram(self):
+        return LatencyHistogram.from_dict(self.latency_histogram)
+
+    def add_histogram(self, histogram):
+        """Merge a LatencyHistogram of new requests into the counters."""
+        if not histogram.count:
+            return
+        self.request_count += histogram.count
+        self.latency_sum_ms += histogram.total
+        self.latency_max_ms = max(self.latency_max_ms, histogram.max)
+        self.latency_histogram = self.histogram.merge(histogram).to_dict()
+
+    def __str__(self):
+        return f"{self.bucket_start:%Y-%m-%d %H:%M} {self.endpoint} {self.status_class}xx (n={self.request_count})"
+
+class UserScoreAggregate(models.Model):
+    """Running per-user score aggregates, maintained on write (UC-03).
+    
+    One row per (user, task type) plus an 'all' row across task types.
+    Updated in the same transaction as each new Evaluation so analytics
+    reads are a single indexed lookup and lifetime statistics stay exact
+    however many attempts a student has.
+    """
+    ALL_TASKS = 'all'
+    EWMA_ALPHA = 0.3
+    RECENT_SCORES_SIZE = 50
+
+    user_id = models.UUIDField(help_text="Reference to Core User UUID")
+    task_type = models.CharField(max_length=20, help_text="'writing', 'speaking' or 'all'")
+
+    attempt_count = models.PositiveIntegerField(default=0)
+    score_count = models.PositiveIntegerField(default=0, help_text="Attempts that received an overall score")
+    score_sum = models.FloatField(default=0.0)
+    score_sum_sq = models.FloatField(default=0.0)
+    min_score = models.FloatField(null=True, blank=True)
+    max_score = models.FloatField(null=True, blank=True)
+    first_score = models.FloatField(null=True, blank=True)
+    last_score = models.FloatField(null=True, blank=True)
+    ewma = models.FloatField(null=True, blank=True, help_text="Exponentially weighted moving average of scores")
+    recent_scores = models.JSONField(default=list, help_text="Bounded ring of the most recent scores (oldest first)")
+
+    first_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'task_type'], name='team7_unique_user_task_aggregate'),
+        ]
+
+    def add_attempt(self, score, created_at):
+        """Fold one attempt into the running aggregates (in memory)."""
+        self.attempt_count += 1
+        if self.first_attempt_at is None:
+            self.first_attempt_at = created_at
+        self.last_attempt_at = created_at
+
+        if score is None:
+            return
+        score = round(float(score), 1)  # Match Evaluation.overall_score precision
+        self.score_count += 1
+        self.score_sum += score
+        self.score_sum_sq += score * score
+        self.min_score = score if self.min_score is None else min(self.min_score, score)
+        self.max_score = score if self.max_score is None else max(self.max_score, score)
+        if self.first_score is None:
+            self.first_score = score
+        self.last_score = score
+        self.ewma = score if self.ewma is None else self.EWMA_ALPHA * score + (1 - self.EWMA_ALPHA) * self.ewma
+        self.recent_scores = (list(self.recent_scores) + [score])[-self.RECENT_SCORES_SIZE:]
+
+    @property
+    def mean(self):
+        return self.score_sum / self.score_count if self.score_count else None
+
+    @property
+    def stddev(self):
+        if not self.score_count:
+            return None
+        variance = self.score_sum_sq / self.score_count - self.mean ** 2
+        return max(variance, 0.0) ** 0.5
+
+    def __str__(self):
+        return f"Aggregate {self.user_id} - {self.task_type} ({self.score_count} scored)"
+
+
+class ScoreSketch(models.Model):
+    """Persisted t-digest of cohort scores for percentile ranks (UC-03).
+    
+    One row per (task type, criterion, rubric version); the overall score
+    uses criterion 'overall'. Updated right after each new Evaluation
+    commits so ranks never require scanning the evaluation table.
+    """
+    OVERALL = 'overall'
+
+    task_type = models.CharField(max_length=20, choices=TaskType.choices)
+    criterion = models.CharField(max_length=50, help_text="Criterion name or 'overall'")
+    rubric_version_id = models.CharField(max_length=50)
+    count = models.PositiveIntegerField(default=0)
+    digest = models.JSONField(default=dict, help_text="Serialized t-digest centroids")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['task_type', 'criterion', 'rubric_version_id'], name='team7_unique_score_sketch'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Sketch {self.task_type}/{self.criterion} ({self.rubric_version_id}, n={self.count})"
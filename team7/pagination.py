@@ -0,0 +1,46 @@
+"""
+Keyset (cursor) pagination helpers for team7 list endpoints (UC-03).
+
+Cursors encode the (created_at, evaluation_id) of the last row on a page,
+so the next page is a single range scan on the (user_id, -created_at)
+index instead of an OFFSET that grows with page depth.
+"""
+
+import base64
+import binascii
+import uuid
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client-supplied cursor cannot be decoded."""
+
+
+def encode_cursor(created_at, evaluation_id):
+    raw = f"{created_at.isoformat()}|{evaluation_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created_at, evaluation_id) for a cursor string."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_raw, evaluation_raw = raw.split('|', 1)
+        created_at = parse_datetime(created_raw)
+        evaluation_id = uuid.UUID(evaluation_raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+    if created_at is None:
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+    return created_at, evaluation_id
+
+
+def after_cursor(cursor):
+    """Filter selecting rows strictly after the cursor in newest-first order."""
+    created_at, evaluation_id = decode_cursor(cursor)
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, evaluation_id__lt=evaluation_id)
@@ -0,0 +1,107 @@
+"""
+Per-user response caching and conditional GET for team7 read APIs (UC-03).
+
+Every user has a version token in the cache backend that changes whenever
+one of their evaluations is committed. History and analytics responses are
+cached under that token and carry ETag/Last-Modified headers derived from
+it, so a dashboard revisit with nothing new gets a 304 (or a cached body)
+without touching the evaluations table.
+"""
+
+import hashlib
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+from core.json_utils import compress_response
+from core.metrics import record_cache
+
+# Bounds staleness of data that changes without the user writing anything
+# (e.g. cohort percentile ranks).
+RESPONSE_CACHE_TTL = 300
+
+
+def _version_key(user_id):
+    return f"team7:user-version:{user_id}"
+
+
+def _request_user_id(request, kwargs):
+    return str(kwargs.get('user_id') or request.GET.get('user_id') or request.user.id)
+
+
+def get_user_version(user_id):
+    """Return {'token': str, 'modified': float} for a user, creating it if absent.
+    
+    A cold cache gets a fresh random token, so stale client ETags never match.
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, {'token': uuid.uuid4().hex, 'modified': time.time()}, RESPONSE_CACHE_TTL)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_user(user_id, modified=None):
+    """Start a new version for the user; call after their evaluation commits."""
+    cache.set(
+        _version_key(user_id),
+        {'token': uuid.uuid4().hex, 'modified': modified or time.time()},
+        RESPONSE_CACHE_TTL
+    )
+
+
+def _request_version(request, kwargs):
+    # Looked up once per request; ETag, Last-Modified and the body key share it
+    if not hasattr(request, '_team7_user_version'):
+        request._team7_user_version = get_user_version(_request_user_id(request, kwargs))
+    return request._team7_user_version
+
+
+def _response_key(request, kwargs):
+    version = _request_version(request, kwargs)
+    params = '&'.join(f"{k}={v}" for k, v in sorted(request.GET.items()))
+    return hashlib.md5(f"{version['token']}|{request.path}|{params}".encode()).hexdigest()
+
+
+def _etag(request, *args, **kwargs):
+    # Weak: the same representation is sent gzip-, br- or identity-encoded
+    return f'W/"{_response_key(request, kwargs)}"'
+
+
+def _last_modified(request, *args, **kwargs):
+    version = _request_version(request, kwargs)
+    return datetime.fromtimestamp(int(version['modified']), tz=timezone.utc)
+
+
+def cached_user_response(view_func):
+    """Serve a view's 200 JSON responses from a per-user, versioned cache.
+    
+    Applies Django's ``condition`` so matching If-None-Match or
+    If-Modified-Since requests are answered with 304 before the view runs.
+    Responses are marked ``private, no-cache`` so browsers revalidate, and
+    the uncompressed body is cached so each hit can be encoded for the
+    client's Accept-Encoding.
+    """
+    @wraps(view_func)
+    def _cached(request, *args, **kwargs):
+        key = f"team7:response:{_response_key(request, kwargs)}"
+        body = cache.get(key)
+        record_cache('team7_response', body is not None)
+        if body is not None:
+            response = HttpResponse(body, content_type='application/json')
+            response['X-Cache'] = 'HIT'
+        else:
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.content, RESPONSE_CACHE_TTL)
+            response['X-Cache'] = 'MISS'
+        response['Cache-Control'] = 'private, no-cache'
+        return compress_response(request, response)
+
+    return condition(etag_func=_etag, last_modified_func=_last_modified)(_cached)
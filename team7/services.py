@@ -2,14 +2,75 @@ import json
 import logging
 import uuid
 import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import cached_property
 from django.conf import settings
+from django.db import router, transaction
+from django.db.models import FloatField
+from django.db.models.functions import Cast
 from django.utils import timezone
 from openai import OpenAI
-from .models import Evaluation, DetailedScore, Question
+from core.metrics import observe_external
+from core.sqlite_tuning import retry_on_busy
+from .models import APILog, APILogRollup, Evaluation, DetailedScore, Question, ScoreSketch, UserScoreAggregate
+from .histograms import LatencyHistogram
+from .sketches import TDigest
+from . import admission, analytics, asr, fluency, health, pagination, response_cache, tracing
 
 logger = logging.getLogger(__name__)
 
 
+def project_attempts(user_id, evaluations, limit, include_criteria=True):
+    """Serialize a user's evaluations through lean column projections (UC-03).
+    
+    Reads only the columns the API returns (question_id straight from the FK
+    column, scores cast to float in SQL) instead of instantiating models, and
+    loads criteria with one range query over the same (user_id, created_at)
+    window, grouped by evaluation id.
+    
+    Args:
+        user_id: UUID of student (must match the ``evaluations`` filter)
+        evaluations: Ordered, unsliced Evaluation queryset for that user
+        limit: Max rows to read
+        include_criteria: Whether to attach per-criterion scores
+        
+    Returns:
+        tuple: (rows, attempts) where rows are raw
+        (evaluation_id, task_type, question_id, score, created_at) tuples
+    """
+    rows = list(
+        evaluations.annotate(score=Cast('overall_score', FloatField()))
+        .values_list('evaluation_id', 'task_type', 'question_id', 'score', 'created_at')[:limit]
+    )
+    attempts = [
+        {
+            "evaluation_id": str(evaluation_id),
+            "task_type": task_type,
+            "question_id": str(question_id),
+            "overall_score": score,
+            "created_at": created_at.isoformat(),
+        }
+        for evaluation_id, task_type, question_id, score, created_at in rows
+    ]
+
+    if include_criteria:
+        criteria = {row[0]: [] for row in rows}
+        if rows:
+            window = (min(row[4] for row in rows), max(row[4] for row in rows))
+            scores = DetailedScore.objects.filter(
+                evaluation__user_id=user_id, evaluation__created_at__range=window
+            ).annotate(score=Cast('score_value', FloatField())).values_list('evaluation_id', 'criterion', 'score')
+            for evaluation_id, name, score in scores:
+                # The time window can include ties just outside the page
+                if evaluation_id in criteria:
+                    criteria[evaluation_id].append({"name": name, "score": score})
+        for attempt, row in zip(attempts, rows):
+            attempt["criteria"] = criteria[row[0]]
+
+    return rows, attempts
+
+
 class WritingEvaluator:
     """Service layer: Writing evaluation logic (FR-WR).
     
@@ -42,6 +103,7 @@ class WritingEvaluator:
             return False, f"INVALID_INPUT: Text is too long (maximum {self.MAX_WORDS} words)."
         return True, "OK"
 
+    @tracing.traced('writing.analyze')
     def analyze(self, text, question_obj, mode="independent"):
         """Send text to LLM and return structured JSON per ETS rubric.
         
@@ -77,19 +139,21 @@ class WritingEvaluator:
         )
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content}
-                ],
-                stream=False,
-                temperature=0.3,  # Low temperature for consistency
-            )
+            with observe_external('llm', 'writing'), tracing.span('llm.chat', model=self.model):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_content}
+                    ],
+                    stream=False,
+                    temperature=0.3,  # Low temperature for consistency
+                )
 
-            raw_content = response.choices[0].message.content
-            clean_content = raw_content.replace("```json", "").replace("```", "").strip()
-            result_json = json.loads(clean_content)
+            with tracing.span('parse_json'):
+                raw_content = response.choices[0].message.content
+                clean_content = raw_content.replace("```json", "").replace("```", "").strip()
+                result_json = json.loads(clean_content)
 
             logger.info(f"WritingEvaluator.analyze: Success. Score={result_json.get('overall_score')}")
             return result_json
@@ -114,6 +178,10 @@ class SpeakingEvaluator:
     MAX_DURATION_SEC = 90
     MAX_FILE_SIZE_MB = 10
     ALLOWED_FORMATS = ['.wav', '.mp3', '.flac']
+    CHUNKED_ASR_MIN_SEC = 30
+    ASR_CHUNK_SEC = 20
+    ASR_MAX_WORKERS = 4
+    MAX_COMPLETION_TOKENS = 700
 
     def __init__(self):
         """Initialize OpenAI client for both ASR (Whisper) and LLM."""
@@ -144,26 +212,43 @@ class SpeakingEvaluator:
         
         return True, "OK"
 
-    def transcribe_audio(self, audio_file, timeout=30):
+    @tracing.traced('asr.transcribe')
+    def transcribe_audio(self, audio_file, timeout=30, pcm=None):
         """Transcribe audio to text using OpenAI Whisper API (ASR).
         
+        Long WAV recordings are routed through transcribe_audio_chunked so
+        that ASR latency stays close to the latency of a single chunk.
+        
         Args:
             audio_file: Django UploadedFile object or file path
             timeout: API request timeout in seconds
+            pcm: Optional (samples, sample_rate) already decoded by the caller
             
         Returns:
-            dict: {'transcript': str, 'language': str} OR None on failure
+            dict: {'transcript': str, 'language': str, 'duration': float,
+                   'segments': list} OR None on failure
         """
+        if getattr(settings, 'AI_ASR_CHUNKED', True):
+            decoded = pcm if pcm is not None else asr.read_wav(audio_file)
+            if decoded is not None:
+                samples, sample_rate = decoded
+                if len(samples) / sample_rate > self.CHUNKED_ASR_MIN_SEC:
+                    result = self.transcribe_audio_chunked(samples, sample_rate, timeout=timeout)
+                    if result:
+                        return result
+                    logger.warning("Chunked ASR failed, falling back to single-shot transcription")
+
         try:
             logger.info(f"Starting ASR transcription for file: {audio_file.name if hasattr(audio_file, 'name') else 'unknown'}")
             
             # OpenAI Whisper API expects file-like object
-            response = self.client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="verbose_json",  # Get detailed response with metadata
-                language="en"  # TOEFL is English-only
-            )
+            with observe_external('asr', 'transcribe'), tracing.span('asr.request'):
+                response = self.client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=audio_file,
+                    response_format="verbose_json",  # Get detailed response with metadata
+                    language="en"  # TOEFL is English-only
+                )
             
             transcript_text = response.text.strip()
             
@@ -176,7 +261,8 @@ class SpeakingEvaluator:
             return {
                 'transcript': transcript_text,
                 'language': getattr(response, 'language', 'en'),
-                'duration': getattr(response, 'duration', None)
+                'duration': getattr(response, 'duration', None),
+                'segments': asr.merge_segments([getattr(response, 'segments', None)], [0.0])
             }
             
         except TimeoutError:
@@ -186,13 +272,96 @@ class SpeakingEvaluator:
             logger.error(f"ASR transcription error: {str(e)}")
             return None
 
-    def analyze_speaking(self, transcript_text, question_obj, mode="independent"):
+    def transcribe_audio_chunked(self, samples, sample_rate, timeout=30):
+        """Transcribe a long recording as concurrent, overlapping chunks.
+        
+        Splits the signal at silence boundaries, sends every chunk to Whisper
+        in parallel, then stitches the text (de-duplicating the overlap) and
+        merges segment timestamps back onto the original timeline.
+        
+        Args:
+            samples: Mono int16 PCM samples
+            sample_rate: Samples per second
+            timeout: Per-chunk API request timeout in seconds
+            
+        Returns:
+            dict: Same shape as transcribe_audio plus 'chunks' OR None on failure
+        """
+        chunk_sec = getattr(settings, 'AI_ASR_CHUNK_SECONDS', self.ASR_CHUNK_SEC)
+        bounds = asr.split_on_silence(samples, sample_rate, chunk_sec=chunk_sec)
+        workers = min(len(bounds), getattr(settings, 'AI_ASR_MAX_WORKERS', self.ASR_MAX_WORKERS))
+
+        def _transcribe(index):
+            start, end = bounds[index]
+            chunk = asr.encode_wav(samples[start:end], sample_rate, name=f"chunk_{index}.wav")
+            with observe_external('asr', 'transcribe_chunk'), tracing.span('asr.chunk', index=index):
+                return self.client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=chunk,
+                    response_format="verbose_json",
+                    language="en",
+                    timeout=timeout,
+                )
+
+        logger.info(f"Starting chunked ASR: {len(bounds)} chunks, {workers} workers")
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                responses = list(pool.map(tracing.wrap(_transcribe), range(len(bounds))))
+        except Exception as e:
+            logger.error(f"Chunked ASR transcription error: {str(e)}")
+            return None
+
+        transcript_text = asr.stitch_transcripts([(r.text or '').strip() for r in responses])
+        if not transcript_text or len(transcript_text) < 10:
+            logger.warning("ASR: No speech detected or transcript too short")
+            return None
+
+        logger.info(f"Chunked ASR transcription successful. Length: {len(transcript_text)} chars")
+        return {
+            'transcript': transcript_text,
+            'language': getattr(responses[0], 'language', 'en'),
+            'duration': round(len(samples) / sample_rate, 2),
+            'segments': asr.merge_segments(
+                [getattr(r, 'segments', None) for r in responses],
+                [start / sample_rate for start, _ in bounds]
+            ),
+            'chunks': len(bounds)
+        }
+
+    @tracing.traced('fluency')
+    def extract_fluency(self, asr_result, pcm=None):
+        """Compute local acoustic fluency metrics for a transcribed response.
+        
+        Args:
+            asr_result: dict returned by transcribe_audio
+            pcm: Optional (samples, sample_rate) for WAV uploads
+            
+        Returns:
+            dict: Fluency metrics (see team7.fluency) OR None if unavailable
+        """
+        samples, sample_rate = pcm if pcm is not None else (None, None)
+        try:
+            return fluency.extract_fluency_features(
+                asr_result['transcript'],
+                segments=asr_result.get('segments'),
+                samples=samples,
+                sample_rate=sample_rate,
+                duration=asr_result.get('duration'),
+            )
+        except Exception as e:
+            logger.warning(f"Fluency feature extraction failed: {str(e)}")
+            return None
+
+    @tracing.traced('speaking.analyze')
+    def analyze_speaking(self, transcript_text, question_obj, mode="independent", fluency_metrics=None):
         """Analyze transcript using LLM for Speaking scoring.
         
         Args:
             transcript_text: Transcribed speech text
             question_obj: Question model instance
             mode: 'independent' or 'integrated'
+            fluency_metrics: Optional locally measured fluency features used
+                to ground the Delivery score instead of guessing from text
             
         Returns:
             dict: Parsed JSON with overall_score, feedback, criteria OR None on failure
@@ -212,7 +381,9 @@ class SpeakingEvaluator:
             "    {'name': 'Topic Development', 'score': float 0-4, 'comment': string}\n"
             "  ]\n"
             "}\n"
-            "Ensure 'feedback' includes specific suggestions for improvement."
+            "Ensure 'feedback' includes specific suggestions for improvement. "
+            "If acoustic fluency metrics are provided, base Delivery pace and fluency on them. "
+            "Keep each criterion comment to at most two sentences and feedback under 120 words."
         )
 
         user_content = (
@@ -220,21 +391,28 @@ class SpeakingEvaluator:
             f"Question: {question_obj.prompt_text}\n"
             f"\nStudent's Spoken Response (Transcribed):\n{transcript_text}"
         )
+        if fluency_metrics:
+            user_content += (
+                f"\n\nAcoustic Fluency Metrics (measured):\n{fluency.format_for_prompt(fluency_metrics)}"
+            )
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content}
-                ],
-                stream=False,
-                temperature=0.3,
-            )
+            with observe_external('llm', 'speaking'), tracing.span('llm.chat', model=self.model):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_content}
+                    ],
+                    stream=False,
+                    temperature=0.3,
+                    max_tokens=self.MAX_COMPLETION_TOKENS,
+                )
 
-            raw_content = response.choices[0].message.content
-            clean_content = raw_content.replace("```json", "").replace("```", "").strip()
-            result_json = json.loads(clean_content)
+            with tracing.span('parse_json'):
+                raw_content = response.choices[0].message.content
+                clean_content = raw_content.replace("```json", "").replace("```", "").strip()
+                result_json = json.loads(clean_content)
 
             logger.info(f"SpeakingEvaluator.analyze: Success. Score={result_json.get('overall_score')}")
             return result_json
@@ -254,10 +432,39 @@ class EvaluationService:
     Implements error codes per SRS Appendix B.
     """
 
-    def __init__(self):
-        self.writing_evaluator = WritingEvaluator()
-        self.speaking_evaluator = SpeakingEvaluator()
+    # Evaluators (and their API clients) are only built when a workflow
+    # needs them, so read-only endpoints don't pay for client setup.
+    @cached_property
+    def writing_evaluator(self):
+        return WritingEvaluator()
+
+    @cached_property
+    def speaking_evaluator(self):
+        return SpeakingEvaluator()
 
+    @staticmethod
+    def _update_derived_data(eval_obj, criteria):
+        """Keep aggregates, cohort sketches, response caches and health counters in step.
+        
+        Runs inside the transaction that created eval_obj. Cohort sketches
+        are shared by every submission, so they are merged in their own
+        short transaction once this one commits, and cache updates are
+        deferred the same way.
+        """
+        ScoreAggregateService.record_evaluation(eval_obj)
+
+        def _after_commit():
+            try:
+                CohortSketchService.record_evaluation(eval_obj, criteria)
+            except Exception as e:
+                # The evaluation is saved; ranks just miss one data point
+                logger.error(f"Failed to update cohort sketches for {eval_obj.evaluation_id}: {str(e)}")
+            response_cache.invalidate_user(eval_obj.user_id, eval_obj.created_at.timestamp())
+            health.record_evaluation(eval_obj.created_at)
+
+        transaction.on_commit(_after_commit, using=router.db_for_write(Evaluation))
+
+    @tracing.traced('evaluate_writing')
     def evaluate_writing(self, user_id, question_id, text):
         """End-to-end writing evaluation workflow (UC-01).
         
@@ -271,18 +478,21 @@ class EvaluationService:
         """
         # 1. Fetch Question
         try:
-            question = Question.objects.get(question_id=question_id)
+            with tracing.span('question_lookup'):
+                question = Question.objects.get(question_id=question_id)
         except Question.DoesNotExist:
             logger.warning(f"Question not found: {question_id}")
             return {"error": "QUESTION_NOT_FOUND", "message": "Invalid question ID"}, 404
 
         # 2. Input Validation (FR-WR-01)
-        is_valid, message = self.writing_evaluator.validate_length(text)
+        with tracing.span('validation'):
+            is_valid, message = self.writing_evaluator.validate_length(text)
         if not is_valid:
             logger.warning(f"WritingEvaluation validation failed for user {user_id}: {message}")
             return {"error": message, "code": "INVALID_INPUT"}, 400
 
         # 3. AI Analysis
+        admission.note_backend_call()
         result = self.writing_evaluator.analyze(
             text, question, mode=question.mode
         )
@@ -294,26 +504,39 @@ class EvaluationService:
             }, 503
 
         # 4. Data Persistence (Layer 3)
-        try:
-            eval_obj = Evaluation.objects.create(
-                user_id=user_id,
-                question=question,
-                task_type="writing",
-                submitted_text=text,
-                overall_score=result.get('overall_score'),
-                ai_feedback=result.get('feedback'),
-                rubric_version_id=WritingEvaluator.RUBRIC_VERSION
-            )
-
-            # Save detailed criterion scores
-            for crit in result.get('criteria', []):
-                DetailedScore.objects.create(
-                    evaluation=eval_obj,
-                    criterion=crit.get('name'),
-                    score_value=crit.get('score'),
-                    comment=crit.get('comment')
+        @retry_on_busy
+        def _persist():
+            with transaction.atomic(using=router.db_for_write(Evaluation)):
+                eval_obj = Evaluation.objects.create(
+                    user_id=user_id,
+                    question=question,
+                    task_type="writing",
+                    submitted_text=text,
+                    overall_score=result.get('overall_score'),
+                    ai_feedback=result.get('feedback'),
+                    rubric_version_id=WritingEvaluator.RUBRIC_VERSION,
+                    # Saved with the row; 'persist' and the enclosing spans report their time so far
+                    stage_timings=tracing.stage_timings()
                 )
 
+                # Save detailed criterion scores
+                detailed_scores = DetailedScore.objects.bulk_create([
+                    DetailedScore(
+                        evaluation=eval_obj,
+                        criterion=crit.get('name'),
+                        score_value=crit.get('score'),
+                        comment=crit.get('comment')
+                    )
+                    for crit in result.get('criteria', [])
+                ])
+
+                self._update_derived_data(eval_obj, result.get('criteria', []))
+            return eval_obj, detailed_scores
+
+        try:
+            with tracing.span('persist'):
+                eval_obj, detailed_scores = _persist()
+
             logger.info(f"Evaluation created: {eval_obj.evaluation_id} for user {user_id}")
 
             # 5. Response (FR-API-02)
@@ -328,7 +551,7 @@ class EvaluationService:
                         "score": float(ds.score_value),
                         "comment": ds.comment
                     }
-                    for ds in eval_obj.detailed_scores.all()
+                    for ds in detailed_scores
                 ],
                 "created_at": eval_obj.created_at.isoformat()
             }, 200
@@ -340,6 +563,7 @@ class EvaluationService:
                 "message": "Failed to save evaluation."
             }, 500
 
+    @tracing.traced('evaluate_speaking')
     def evaluate_speaking(self, user_id, question_id, audio_file, audio_filename=None):
         """End-to-end speaking evaluation workflow (UC-02).
         
@@ -354,19 +578,24 @@ class EvaluationService:
         """
         # 1. Fetch Question
         try:
-            question = Question.objects.get(question_id=question_id)
+            with tracing.span('question_lookup'):
+                question = Question.objects.get(question_id=question_id)
         except Question.DoesNotExist:
             logger.warning(f"Question not found: {question_id}")
             return {"error": "QUESTION_NOT_FOUND", "message": "Invalid question ID"}, 404
 
         # 2. Validate Audio File (FR-SP-01)
-        is_valid, message = self.speaking_evaluator.validate_audio_file(audio_file)
+        with tracing.span('validation'):
+            is_valid, message = self.speaking_evaluator.validate_audio_file(audio_file)
         if not is_valid:
             logger.warning(f"SpeakingEvaluation validation failed for user {user_id}: {message}")
             return {"error": message, "code": "INVALID_INPUT"}, 400
 
         # 3. ASR Transcription
-        asr_result = self.speaking_evaluator.transcribe_audio(audio_file, timeout=30)
+        with tracing.span('audio_decode'):
+            pcm = asr.read_wav(audio_file)
+        admission.note_backend_call()
+        asr_result = self.speaking_evaluator.transcribe_audio(audio_file, timeout=30, pcm=pcm)
         if not asr_result:
             logger.error(f"ASR failed for user {user_id}: No speech detected or transcription error")
             return {
@@ -377,9 +606,10 @@ class EvaluationService:
         transcript_text = asr_result['transcript']
         logger.info(f"ASR Success for user {user_id}. Transcript length: {len(transcript_text)}")
 
-        # 4. LLM Analysis (Speaking Scoring)
+        # 4. Local fluency features + LLM Analysis (Speaking Scoring)
+        fluency_metrics = self.speaking_evaluator.extract_fluency(asr_result, pcm=pcm)
         result = self.speaking_evaluator.analyze_speaking(
-            transcript_text, question, mode=question.mode
+            transcript_text, question, mode=question.mode, fluency_metrics=fluency_metrics
         )
         if not result:
             logger.error(f"SpeakingEvaluator.analyze returned None for user {user_id}")
@@ -400,34 +630,49 @@ class EvaluationService:
         unique_filename = f"speaking/{user_id}/{uuid.uuid4()}{file_extension}"
         
         try:
-            audio_path = default_storage.save(unique_filename, ContentFile(audio_file.read()))
+            with tracing.span('audio_store'):
+                audio_path = default_storage.save(unique_filename, ContentFile(audio_file.read()))
             logger.info(f"Audio file saved to: {audio_path}")
         except Exception as e:
             logger.error(f"Failed to save audio file: {str(e)}")
             audio_path = f"uploads/{unique_filename}"  # Fallback path
 
         # 6. Data Persistence (Layer 3)
-        try:
-            eval_obj = Evaluation.objects.create(
-                user_id=user_id,
-                question=question,
-                task_type="speaking",
-                audio_path=audio_path,
-                transcript_text=transcript_text,
-                overall_score=result.get('overall_score'),
-                ai_feedback=result.get('feedback'),
-                rubric_version_id=SpeakingEvaluator.RUBRIC_VERSION
-            )
-
-            # Save detailed criterion scores
-            for crit in result.get('criteria', []):
-                DetailedScore.objects.create(
-                    evaluation=eval_obj,
-                    criterion=crit.get('name'),
-                    score_value=crit.get('score'),
-                    comment=crit.get('comment')
+        @retry_on_busy
+        def _persist():
+            with transaction.atomic(using=router.db_for_write(Evaluation)):
+                eval_obj = Evaluation.objects.create(
+                    user_id=user_id,
+                    question=question,
+                    task_type="speaking",
+                    audio_path=audio_path,
+                    transcript_text=transcript_text,
+                    fluency_metrics=fluency_metrics,
+                    overall_score=result.get('overall_score'),
+                    ai_feedback=result.get('feedback'),
+                    rubric_version_id=SpeakingEvaluator.RUBRIC_VERSION,
+                    # Saved with the row; 'persist' and the enclosing spans report their time so far
+                    stage_timings=tracing.stage_timings()
                 )
 
+                # Save detailed criterion scores
+                detailed_scores = DetailedScore.objects.bulk_create([
+                    DetailedScore(
+                        evaluation=eval_obj,
+                        criterion=crit.get('name'),
+                        score_value=crit.get('score'),
+                        comment=crit.get('comment')
+                    )
+                    for crit in result.get('criteria', [])
+                ])
+
+                self._update_derived_data(eval_obj, result.get('criteria', []))
+            return eval_obj, detailed_scores
+
+        try:
+            with tracing.span('persist'):
+                eval_obj, detailed_scores = _persist()
+
             logger.info(f"Speaking evaluation created: {eval_obj.evaluation_id} for user {user_id}")
 
             # 7. Response (FR-API-02)
@@ -437,13 +682,14 @@ class EvaluationService:
                 "overall_score": float(eval_obj.overall_score) if eval_obj.overall_score else None,
                 "feedback": eval_obj.ai_feedback,
                 "transcript": transcript_text,
+                "fluency_metrics": fluency_metrics,
                 "criteria": [
                     {
                         "name": ds.criterion,
                         "score": float(ds.score_value),
                         "comment": ds.comment
                     }
-                    for ds in eval_obj.detailed_scores.all()
+                    for ds in detailed_scores
                 ],
                 "created_at": eval_obj.created_at.isoformat()
             }, 200
@@ -455,22 +701,44 @@ class EvaluationService:
                 "message": "Failed to save evaluation."
             }, 500
 
-    def get_user_history(self, user_id, limit=50):
-        """Fetch evaluation history for student (UC-03).
+    HISTORY_FIELDS = ('evaluation_id', 'task_type', 'question_id', 'overall_score', 'created_at', 'criteria')
+
+    def get_user_history(self, user_id, limit=pagination.DEFAULT_PAGE_SIZE, cursor=None, fields=None):
+        """Fetch one page of evaluation history for student (UC-03).
+        
+        Pages are keyset-paginated on (created_at, evaluation_id), newest
+        first, so every page is one range scan on the (user_id, -created_at)
+        index. Omitting 'criteria' from ``fields`` skips the criteria query.
         
         Args:
             user_id: UUID of student
-            limit: Max records to return
+            limit: Max records to return (capped at pagination.MAX_PAGE_SIZE)
+            cursor: Opaque next_cursor from the previous page
+            fields: Iterable of HISTORY_FIELDS to include (default: all)
             
         Returns:
             tuple: (response_dict, http_status_code)
         """
+        fields = set(fields or self.HISTORY_FIELDS)
+        unknown = fields - set(self.HISTORY_FIELDS)
+        if unknown:
+            return {
+                "error": "INVALID_INPUT",
+                "message": f"Unknown fields: {', '.join(sorted(unknown))}"
+            }, 400
+        limit = max(1, min(limit, pagination.MAX_PAGE_SIZE))
+
         try:
-            evaluations = Evaluation.objects.filter(
-                user_id=user_id
-            ).select_related('question').prefetch_related('detailed_scores').order_by('-created_at')[:limit]
+            evaluations = Evaluation.objects.filter(user_id=user_id).order_by('-created_at', '-evaluation_id')
+            if cursor:
+                evaluations = evaluations.filter(pagination.after_cursor(cursor))
+
+            # Fetch one extra row to learn whether another page exists
+            rows, attempts = project_attempts(user_id, evaluations, limit + 1, include_criteria='criteria' in fields)
+            has_more = len(rows) > limit
+            rows, attempts = rows[:limit], attempts[:limit]
 
-            if not evaluations.exists():
+            if not rows and not cursor:
                 logger.info(f"No evaluations found for user {user_id}")
                 return {
                     "status": "no_data",
@@ -478,29 +746,24 @@ class EvaluationService:
                     "attempts": []
                 }, 200
 
-            attempts = []
-            for eval_obj in evaluations:
-                attempts.append({
-                    "evaluation_id": str(eval_obj.evaluation_id),
-                    "task_type": eval_obj.task_type,
-                    "question_id": str(eval_obj.question.question_id),
-                    "overall_score": float(eval_obj.overall_score) if eval_obj.overall_score else None,
-                    "created_at": eval_obj.created_at.isoformat(),
-                    "criteria": [
-                        {
-                            "name": ds.criterion,
-                            "score": float(ds.score_value)
-                        }
-                        for ds in eval_obj.detailed_scores.all()
-                    ]
-                })
+            if len(fields) < len(self.HISTORY_FIELDS):
+                attempts = [{key: a[key] for key in fields} for a in attempts]
 
+            last = rows[-1] if rows else None
             return {
                 "status": "success",
                 "total_attempts": len(attempts),
-                "attempts": attempts
+                "attempts": attempts,
+                "has_more": has_more,
+                "next_cursor": pagination.encode_cursor(last[4], last[0]) if has_more else None
             }, 200
 
+        except pagination.InvalidCursor:
+            logger.warning(f"Invalid history cursor for user {user_id}: {cursor}")
+            return {
+                "error": "INVALID_INPUT",
+                "message": "cursor is invalid or expired"
+            }, 400
         except Exception as e:
             logger.exception(f"Error fetching history for user {user_id}: {str(e)}")
             return {
@@ -509,6 +772,279 @@ class EvaluationService:
             }, 500
 
 
+class ScoreAggregateService:
+    """Maintains UserScoreAggregate rows alongside Evaluation writes (UC-03).
+    
+    Keeps lifetime per-user statistics current without re-reading the
+    evaluation history on every dashboard load.
+    """
+
+    @staticmethod
+    def record_evaluation(eval_obj):
+        """Fold a newly created evaluation into its user's aggregates.
+        
+        Must run inside the transaction that created eval_obj so the
+        aggregate rows and the evaluation commit (or roll back) together.
+        A user's first aggregate write rebuilds from their whole history,
+        since their earlier evaluations may predate the aggregate table.
+        """
+        task_types = (eval_obj.task_type, UserScoreAggregate.ALL_TASKS)
+        existing = {
+            a.task_type: a
+            for a in UserScoreAggregate.objects.select_for_update().filter(
+                user_id=eval_obj.user_id, task_type__in=task_types
+            )
+        }
+        if UserScoreAggregate.ALL_TASKS not in existing:
+            ScoreAggregateService.rebuild_for_user(eval_obj.user_id)
+            return
+
+        for task_type in task_types:
+            aggregate = existing.get(task_type) or UserScoreAggregate(user_id=eval_obj.user_id, task_type=task_type)
+            aggregate.add_attempt(eval_obj.overall_score, eval_obj.created_at)
+            aggregate.save()
+
+    @staticmethod
+    def rebuild_for_user(user_id):
+        """Recompute a user's aggregates from their full evaluation history.
+        
+        Used to backfill users whose evaluations predate the aggregate table.
+        
+        Returns:
+            list: The rebuilt UserScoreAggregate instances (empty if no attempts)
+        """
+        rows = Evaluation.objects.filter(user_id=user_id).order_by('created_at').values_list(
+            'task_type', 'overall_score', 'created_at'
+        )
+        aggregates = {}
+        for task_type, score, created_at in rows.iterator():
+            for key in (task_type, UserScoreAggregate.ALL_TASKS):
+                if key not in aggregates:
+                    aggregates[key] = UserScoreAggregate(user_id=user_id, task_type=key)
+                aggregates[key].add_attempt(score, created_at)
+
+        if aggregates:
+            with transaction.atomic(using=router.db_for_write(UserScoreAggregate)):
+                UserScoreAggregate.objects.filter(user_id=user_id).delete()
+                UserScoreAggregate.objects.bulk_create(aggregates.values())
+        return list(aggregates.values())
+
+
+class CohortSketchService:
+    """Cohort percentile ranks backed by persisted t-digests (UC-03).
+    
+    Each evaluation folds its overall and criterion scores into the
+    ScoreSketch rows for its task type and rubric version; ranks are then
+    a single small lookup regardless of how many evaluations exist.
+    """
+
+    MIN_COHORT_SIZE = 10
+
+    @staticmethod
+    def _scores(eval_obj, criteria):
+        scores = {ScoreSketch.OVERALL: eval_obj.overall_score}
+        for crit in criteria:
+            if crit.get('name'):
+                scores[crit['name']] = crit.get('score')
+        return {key: float(value) for key, value in scores.items() if value is not None}
+
+    @staticmethod
+    @retry_on_busy
+    def record_evaluation(eval_obj, criteria):
+        """Add an evaluation's scores to the cohort sketches.
+        
+        Runs in its own transaction, after the one that created eval_obj
+        has committed, so the shared sketch rows are only locked for the
+        merge itself.
+        
+        Args:
+            eval_obj: The newly created Evaluation
+            criteria: Criterion dicts from the LLM result ({'name', 'score'})
+        """
+        scores = CohortSketchService._scores(eval_obj, criteria)
+        if not scores:
+            return
+        cohort = {'task_type': eval_obj.task_type, 'rubric_version_id': eval_obj.rubric_version_id or ''}
+        with transaction.atomic(using=router.db_for_write(ScoreSketch)):
+            locked = ScoreSketch.objects.select_for_update().filter(criterion__in=list(scores), **cohort)
+            sketches = list(locked)
+            missing = set(scores) - {sketch.criterion for sketch in sketches}
+            if missing:
+                ScoreSketch.objects.bulk_create(
+                    [ScoreSketch(criterion=criterion, **cohort) for criterion in missing], ignore_conflicts=True
+                )
+                sketches = list(locked.all())
+
+            now = timezone.now()
+            updated = []
+            for sketch in sketches:
+                digest = TDigest.from_dict(sketch.digest)
+                digest.add(scores[sketch.criterion])
+                sketch.digest = digest.to_dict()
+                sketch.count += 1
+                sketch.updated_at = now
+                updated.append(sketch)
+            ScoreSketch.objects.bulk_update(updated, ['digest', 'count', 'updated_at'])
+
+    @staticmethod
+    def percentile_ranks(task_type, rubric_version_id, scores):
+        """Percentile rank of each score within its cohort.
+        
+        Args:
+            task_type: 'writing' or 'speaking'
+            rubric_version_id: Rubric the cohort was scored with
+            scores: {criterion or 'overall': score}
+            
+        Returns:
+            dict: {criterion: percentile 0-100 or None if the cohort is too small}
+        """
+        sketches = ScoreSketch.objects.filter(
+            task_type=task_type, rubric_version_id=rubric_version_id, criterion__in=list(scores)
+        ).only('criterion', 'count', 'digest')
+        ranks = {criterion: None for criterion in scores}
+        for sketch in sketches:
+            if sketch.count >= CohortSketchService.MIN_COHORT_SIZE:
+                ranks[sketch.criterion] = TDigest.from_dict(sketch.digest).percentile_rank(scores[sketch.criterion])
+        return ranks
+
+
+class APILogRollupService:
+    """Maintains per-minute APILogRollup rows and summarizes them (FR-MON, UC-04).
+    
+    The health check reads these rollups instead of scanning raw APILog
+    rows, which are pruned after TEAM7_APILOG_RETENTION_DAYS.
+    """
+
+    ROLLUP_FIELDS = ['request_count', 'latency_sum_ms', 'latency_max_ms', 'latency_histogram']
+
+    @staticmethod
+    def _group(records):
+        """Latency histograms keyed by (minute, endpoint, status class)."""
+        groups = {}
+        for timestamp, endpoint, status_code, latency_ms in records:
+            key = (APILogRollup.bucket_for(timestamp), endpoint, status_code // 100)
+            if key not in groups:
+                groups[key] = LatencyHistogram()
+            groups[key].record(latency_ms)
+        return groups
+
+    @staticmethod
+    @retry_on_busy
+    def record_logs(records):
+        """Fold API log records into their rollup rows.
+        
+        Args:
+            records: APILog field dicts with timestamp, endpoint,
+                status_code and latency_ms
+        """
+        groups = APILogRollupService._group(
+            (r['timestamp'], r['endpoint'], r['status_code'], r['latency_ms']) for r in records
+        )
+        if not groups:
+            return
+        with transaction.atomic(using=router.db_for_write(APILogRollup)):
+            # Create missing rows first so concurrent writers only ever update
+            APILogRollup.objects.bulk_create(
+                [APILogRollup(bucket_start=b, endpoint=e, status_class=c) for b, e, c in groups],
+                ignore_conflicts=True
+            )
+            locked = APILogRollup.objects.select_for_update().filter(
+                bucket_start__in={key[0] for key in groups}, endpoint__in={key[1] for key in groups}
+            )
+            updated = []
+            for rollup in locked:
+                histogram = groups.get((rollup.bucket_start, rollup.endpoint, rollup.status_class))
+                if histogram is None:
+                    continue
+                rollup.add_histogram(histogram)
+                updated.append(rollup)
+            APILogRollup.objects.bulk_update(updated, APILogRollupService.ROLLUP_FIELDS)
+
+    @staticmethod
+    def rebuild(since):
+        """Recompute rollups from the raw APILog rows at or after ``since``.
+        
+        Returns:
+            int: Number of rollup rows written
+        """
+        since = APILogRollup.bucket_for(since)
+        rows = APILog.objects.filter(timestamp__gte=since).order_by().values_list(
+            'timestamp', 'endpoint', 'status_code', 'latency_ms'
+        )
+        rollups = []
+        for (bucket_start, endpoint, status_class), histogram in APILogRollupService._group(rows.iterator()).items():
+            rollup = APILogRollup(bucket_start=bucket_start, endpoint=endpoint, status_class=status_class)
+            rollup.add_histogram(histogram)
+            rollups.append(rollup)
+
+        with transaction.atomic(using=router.db_for_write(APILogRollup)):
+            APILogRollup.objects.filter(bucket_start__gte=since).delete()
+            APILogRollup.objects.bulk_create(rollups, batch_size=500)
+        return len(rollups)
+
+    @staticmethod
+    def prune(now=None):
+        """Delete raw logs and rollups past their retention periods.
+        
+        Returns:
+            tuple: (raw rows deleted, rollup rows deleted)
+        """
+        now = now or timezone.now()
+        raw_days = getattr(settings, 'TEAM7_APILOG_RETENTION_DAYS', 7)
+        rollup_days = getattr(settings, 'TEAM7_APILOG_ROLLUP_RETENTION_DAYS', 90)
+        raw, _ = APILog.objects.filter(timestamp__lt=now - timedelta(days=raw_days)).delete()
+        rollups, _ = APILogRollup.objects.filter(bucket_start__lt=now - timedelta(days=rollup_days)).delete()
+        return raw, rollups
+
+    @staticmethod
+    def summarize(since, slowest=5):
+        """Request, error and latency totals since a point in time.
+        
+        The per-row histograms are merged per endpoint and overall, so tail
+        latencies are exact to the histogram's ~3% resolution.
+        
+        Returns:
+            dict: total_requests, error_requests, avg_latency_ms,
+            latency_percentiles_ms (p50/p90/p99/max) and the ``slowest``
+            endpoints by p99 latency
+        """
+        rows = APILogRollup.objects.filter(
+            bucket_start__gte=APILogRollup.bucket_for(since)
+        ).order_by().values_list('endpoint', 'status_class', 'latency_histogram')
+
+        overall = LatencyHistogram()
+        per_endpoint = {}
+        errors = 0
+        for endpoint, status_class, data in rows.iterator():
+            histogram = LatencyHistogram.from_dict(data)
+            if status_class >= 4:
+                errors += histogram.count
+            per_endpoint.setdefault(endpoint, LatencyHistogram()).merge(histogram)
+            overall.merge(histogram)
+
+        endpoints = []
+        for endpoint, histogram in per_endpoint.items():
+            if histogram.count:
+                summary = histogram.summary()
+                endpoints.append({
+                    "endpoint": endpoint,
+                    "avg_latency": summary.pop('mean'),
+                    "count": histogram.count,
+                    **summary
+                })
+        endpoints.sort(key=lambda row: (row['p99'], row['avg_latency']), reverse=True)
+
+        percentiles = overall.summary()
+        percentiles.pop('mean')
+        return {
+            "total_requests": overall.count,
+            "error_requests": errors,
+            "avg_latency_ms": overall.total / overall.count if overall.count else 0,
+            "latency_percentiles_ms": percentiles,
+            "slowest_endpoints": endpoints[:slowest]
+        }
+
+
 class AnalyticsService:
     """Analytics and trend calculation service (UC-03, FR-MON-02).
     
@@ -527,19 +1063,7 @@ class AnalyticsService:
         Returns:
             list: Moving averages (same length as input, padded with None)
         """
-        if not scores or len(scores) < window_size:
-            return [None] * len(scores)
-        
-        moving_avgs = []
-        for i in range(len(scores)):
-            if i < window_size - 1:
-                moving_avgs.append(None)
-            else:
-                window = scores[i - window_size + 1:i + 1]
-                avg = sum(window) / window_size
-                moving_avgs.append(round(avg, 2))
-        
-        return moving_avgs
+        return analytics.moving_average(scores, window_size)
 
     @staticmethod
     def calculate_improvement_rate(scores):
@@ -587,42 +1111,107 @@ class AnalyticsService:
         Returns:
             dict: Statistics including mean, min, max, median
         """
-        if not scores:
-            return {
-                'mean': None,
-                'min': None,
-                'max': None,
-                'median': None,
-                'count': 0
-            }
+        return analytics.statistics(scores)
+
+    @staticmethod
+    def calculate_trends(attempts):
+        """Slope, percentiles and per-criterion series for a window of attempts.
+        
+        Args:
+            attempts: Attempt dicts (as returned to the client), oldest first
+            
+        Returns:
+            dict: {'trend': ..., 'percentiles': ..., 'ewma_series': ..., 'criteria': ...}
+        """
+        scores = [a['overall_score'] for a in attempts if a['overall_score'] is not None]
+        return {
+            'trend': analytics.linear_trend(scores),
+            'percentiles': analytics.percentiles(scores),
+            'ewma_series': analytics.ewma(scores, alpha=UserScoreAggregate.EWMA_ALPHA),
+            'criteria': analytics.criterion_trends(
+                (c['name'], c['score']) for a in attempts for c in a['criteria']
+            )
+        }
+
+    @staticmethod
+    def aggregate_statistics(aggregate):
+        """Lifetime statistics from a UserScoreAggregate row.
         
-        sorted_scores = sorted(scores)
-        n = len(sorted_scores)
+        Mean, min, max, stddev and count cover every attempt; the median is
+        taken over the bounded ring of recent scores.
+        """
+        if not aggregate.score_count:
+            return AnalyticsService.calculate_statistics([])
+
+        statistics = AnalyticsService.calculate_statistics(aggregate.recent_scores)
+        statistics.update({
+            'mean': round(aggregate.mean, 2),
+            'min': aggregate.min_score,
+            'max': aggregate.max_score,
+            'stddev': round(aggregate.stddev, 2),
+            'count': aggregate.score_count
+        })
+        return statistics
+
+    def summarize_aggregate(self, aggregate):
+        """Statistics, improvement and EWMA for one task type."""
+        return {
+            'statistics': self.aggregate_statistics(aggregate),
+            'improvement': self.calculate_improvement_rate(
+                [aggregate.first_score, aggregate.last_score] if aggregate.score_count else []
+            ),
+            'ewma': round(aggregate.ewma, 2) if aggregate.ewma is not None else None,
+            'total_attempts': aggregate.attempt_count
+        }
+
+    RUBRIC_VERSIONS = {
+        'writing': WritingEvaluator.RUBRIC_VERSION,
+        'speaking': SpeakingEvaluator.RUBRIC_VERSION,
+    }
+
+    def cohort_ranks(self, task_type, aggregate, task_attempts):
+        """Where the student's latest scores sit within the cohort.
         
+        Ranks the latest overall score (and, when attempts were returned,
+        the latest attempt's criterion scores) against every student scored
+        with the current rubric version.
+        """
+        scores = {ScoreSketch.OVERALL: aggregate.last_score}
+        if task_attempts:
+            scores.update({c['name']: c['score'] for c in task_attempts[-1]['criteria']})
+        scores = {key: value for key, value in scores.items() if value is not None}
+        if not scores:
+            return None
+
+        rubric_version_id = self.RUBRIC_VERSIONS[task_type]
+        ranks = CohortSketchService.percentile_ranks(task_type, rubric_version_id, scores)
         return {
-            'mean': round(sum(scores) / n, 2),
-            'min': min(scores),
-            'max': max(scores),
-            'median': sorted_scores[n // 2] if n % 2 == 1 else round((sorted_scores[n // 2 - 1] + sorted_scores[n // 2]) / 2, 2),
-            'count': n
+            'rubric_version': rubric_version_id,
+            'overall_percentile': ranks.pop(ScoreSketch.OVERALL, None),
+            'criteria_percentiles': ranks
         }
 
     def get_user_analytics(self, user_id, limit=50):
         """Enhanced analytics with trends and statistics (UC-03).
         
+        Statistics come from the per-user aggregate rows maintained on write,
+        so they cover the whole history; only the attempts list (and the
+        moving average charted over it) is bounded by ``limit``. Pass
+        limit=0 to skip the attempts list entirely.
+        
         Args:
             user_id: UUID of student
-            limit: Max records to analyze
+            limit: Max attempts to return
             
         Returns:
             tuple: (response_dict, http_status_code)
         """
         try:
-            evaluations = Evaluation.objects.filter(
-                user_id=user_id
-            ).select_related('question').prefetch_related('detailed_scores').order_by('-created_at')[:limit]
+            aggregates = {a.task_type: a for a in UserScoreAggregate.objects.filter(user_id=user_id)}
+            if not aggregates:
+                aggregates = {a.task_type: a for a in ScoreAggregateService.rebuild_for_user(user_id)}
 
-            if not evaluations.exists():
+            if not aggregates:
                 logger.info(f"No evaluations found for user {user_id}")
                 return {
                     "status": "no_data",
@@ -631,68 +1220,47 @@ class AnalyticsService:
                     "analytics": None
                 }, 200
 
-            # Reverse to get chronological order for trend calculation
-            evaluations_list = list(evaluations)
-            evaluations_list.reverse()
-
-            # Extract scores by task type
-            writing_scores = []
-            speaking_scores = []
-            all_scores = []
             attempts = []
+            if limit > 0:
+                evaluations = Evaluation.objects.filter(user_id=user_id).order_by('-created_at')
+                _, attempts = project_attempts(user_id, evaluations, limit)
+
+            # Moving average and trends are charted against the returned
+            # attempts, so they are computed over that window in chronological order.
+            overall = aggregates[UserScoreAggregate.ALL_TASKS]
+            chronological = attempts[::-1]
+            if attempts:
+                window_scores = [a['overall_score'] for a in chronological if a['overall_score'] is not None]
+            else:
+                window_scores = overall.recent_scores
 
-            for eval_obj in evaluations_list:
-                score = float(eval_obj.overall_score) if eval_obj.overall_score else None
-                
-                if score is not None:
-                    all_scores.append(score)
-                    if eval_obj.task_type == 'writing':
-                        writing_scores.append(score)
-                    elif eval_obj.task_type == 'speaking':
-                        speaking_scores.append(score)
-                
-                attempts.append({
-                    "evaluation_id": str(eval_obj.evaluation_id),
-                    "task_type": eval_obj.task_type,
-                    "question_id": str(eval_obj.question.question_id),
-                    "overall_score": score,
-                    "created_at": eval_obj.created_at.isoformat(),
-                    "criteria": [
-                        {
-                            "name": ds.criterion,
-                            "score": float(ds.score_value)
-                        }
-                        for ds in eval_obj.detailed_scores.all()
-                    ]
-                })
-
-            # Reverse attempts back to descending order for display
-            attempts.reverse()
-
-            # Calculate analytics
-            analytics = {
+            result = {
                 'overall': {
-                    'statistics': self.calculate_statistics(all_scores),
-                    'improvement': self.calculate_improvement_rate(all_scores),
-                    'moving_average': self.calculate_moving_average(all_scores, window_size=3)
-                },
-                'writing': {
-                    'statistics': self.calculate_statistics(writing_scores),
-                    'improvement': self.calculate_improvement_rate(writing_scores),
-                } if writing_scores else None,
-                'speaking': {
-                    'statistics': self.calculate_statistics(speaking_scores),
-                    'improvement': self.calculate_improvement_rate(speaking_scores),
-                } if speaking_scores else None
+                    **self.summarize_aggregate(overall),
+                    'moving_average': self.calculate_moving_average(window_scores, window_size=3),
+                    'trend': analytics.linear_trend(window_scores),
+                    'percentiles': analytics.percentiles(window_scores)
+                }
             }
-
-            logger.info(f"Analytics calculated for user {user_id}: {analytics['overall']['statistics']['count']} evaluations")
+            for task_type in ('writing', 'speaking'):
+                aggregate = aggregates.get(task_type)
+                if not aggregate or not aggregate.score_count:
+                    result[task_type] = None
+                    continue
+                task_attempts = [a for a in chronological if a['task_type'] == task_type]
+                result[task_type] = {
+                    **self.summarize_aggregate(aggregate),
+                    **self.calculate_trends(task_attempts),
+                    'cohort': self.cohort_ranks(task_type, aggregate, task_attempts)
+                }
+
+            logger.info(f"Analytics calculated for user {user_id}: {result['overall']['statistics']['count']} evaluations")
 
             return {
                 "status": "success",
                 "total_attempts": len(attempts),
                 "attempts": attempts,
-                "analytics": analytics
+                "analytics": result
             }, 200
 
         except Exception as e:
@@ -700,4 +1268,4 @@ class AnalyticsService:
             return {
                 "error": "INTERNAL_ERROR",
                 "message": "Failed to retrieve analytics."
-            }, 500
\ No newline at end of file
+            }, 500
@@ -0,0 +1,170 @@
+"""
+Streaming quantile sketches for cohort percentile ranks (UC-03).
+
+A merging t-digest (Dunning & Ertl) summarizes an unbounded stream of
+scores in at most a few hundred centroids. Digests are mergeable, so the
+per-(task type, criterion, rubric version) sketches persisted in
+ScoreSketch can be updated by any worker process and combined offline, and
+a student's percentile rank is answered in constant time without scanning
+the Evaluation table.
+"""
+
+import math
+
+import numpy as np
+
+DEFAULT_COMPRESSION = 100
+
+
+class TDigest:
+    """Merging t-digest with the k1 (arcsine) scale function.
+
+    Values are buffered and folded into the centroid list in batches; all
+    queries flush the buffer first.
+    """
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []
+
+    # -- building -------------------------------------------------------
+
+    def add(self, value, weight=1.0):
+        """Add one observation (or a pre-weighted one)."""
+        value = float(value)
+        self._buffer.append((value, float(weight)))
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def merge(self, other):
+        """Fold another digest into this one (in place) and return self."""
+        other._compress()
+        self._buffer.extend(zip(other.means.tolist(), other.weights.tolist()))
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q(self, k):
+        k = min(k, self.compression / 4)
+        return (math.sin(2 * math.pi * k / self.compression) + 1) / 2
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        pending = np.array(self._buffer, dtype=float)
+        self._buffer = []
+        means = np.concatenate([self.means, pending[:, 0]])
+        weights = np.concatenate([self.weights, pending[:, 1]])
+        order = np.argsort(means, kind='mergesort')
+        means, weights = means[order].tolist(), weights[order].tolist()
+
+        total = sum(weights)
+        merged_means, merged_weights = [], []
+        cur_mean, cur_weight = means[0], weights[0]
+        weight_so_far = 0.0
+        q_limit = self._q(self._k(0.0) + 1)
+        for mean, weight in zip(means[1:], weights[1:]):
+            if (weight_so_far + cur_weight + weight) / total <= q_limit:
+                cur_weight += weight
+                cur_mean += (mean - cur_mean) * weight / cur_weight
+            else:
+                merged_means.append(cur_mean)
+                merged_weights.append(cur_weight)
+                weight_so_far += cur_weight
+                q_limit = self._q(self._k(weight_so_far / total) + 1)
+                cur_mean, cur_weight = mean, weight
+        merged_means.append(cur_mean)
+        merged_weights.append(cur_weight)
+
+        self.means = np.array(merged_means)
+        self.weights = np.array(merged_weights)
+
+    # -- queries --------------------------------------------------------
+
+    @property
+    def count(self):
+        self._compress()
+        return float(self.weights.sum())
+
+    def cdf(self, value):
+        """Mid-rank fraction of the stream below ``value`` (ties count half)."""
+        self._compress()
+        n = self.means.size
+        if n == 0:
+            return None
+        value = float(value)
+        if value < self.min:
+            return 0.0
+        if value > self.max:
+            return 1.0
+
+        total = self.weights.sum()
+        cumulative = np.concatenate(([0.0], np.cumsum(self.weights)))
+        lo = int(np.searchsorted(self.means, value, side='left'))
+        hi = int(np.searchsorted(self.means, value, side='right'))
+
+        if hi > lo:  # value coincides with one or more centroids
+            rank = cumulative[lo] + self.weights[lo:hi].sum() / 2
+        elif lo == 0:  # between min and the first centroid
+            span = self.means[0] - self.min
+            rank = (value - self.min) / span * self.weights[0] / 2 if span > 0 else 0.0
+        elif lo == n:  # between the last centroid and max
+            span = self.max - self.means[-1]
+            fraction = (value - self.means[-1]) / span if span > 0 else 1.0
+            rank = total - self.weights[-1] / 2 + fraction * self.weights[-1] / 2
+        else:  # between centroids lo - 1 and lo
+            left, right = self.means[lo - 1], self.means[lo]
+            fraction = (value - left) / (right - left)
+            rank = cumulative[lo] - self.weights[lo - 1] / 2 + fraction * (self.weights[lo - 1] + self.weights[lo]) / 2
+        return float(rank / total)
+
+    def quantile(self, q):
+        """Approximate value at quantile ``q`` in [0, 1]."""
+        self._compress()
+        if self.means.size == 0:
+            return None
+        total = self.weights.sum()
+        midpoints = np.cumsum(self.weights) - self.weights / 2
+        target = q * total
+        xp = np.concatenate(([0.0], midpoints, [total]))
+        fp = np.concatenate(([self.min], self.means, [self.max]))
+        return float(np.interp(target, xp, fp))
+
+    def percentile_rank(self, value):
+        """Percentile rank of ``value`` on a 0-100 scale."""
+        fraction = self.cdf(value)
+        return None if fraction is None else round(fraction * 100, 1)
+
+    # -- persistence ----------------------------------------------------
+
+    def to_dict(self):
+        """Compact JSON-serializable form (centroids rounded to 4 decimals)."""
+        self._compress()
+        weights = self.weights.tolist()
+        return {
+            'c': self.compression,
+            'min': None if self.means.size == 0 else self.min,
+            'max': None if self.means.size == 0 else self.max,
+            'm': np.round(self.means, 4).tolist(),
+            'w': [int(w) if float(w).is_integer() else w for w in weights],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        digest = cls(compression=(data or {}).get('c', DEFAULT_COMPRESSION))
+        if data and data.get('m'):
+            digest.means = np.asarray(data['m'], dtype=float)
+            digest.weights = np.asarray(data['w'], dtype=float)
+            digest.min = float(data['min'])
+            digest.max = float(data['max'])
+        return digest
@@ -1,6 +1,724 @@
-from django.test import TestCase
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.jwt_utils import create_access_token
+from core.query_budget import QueryBudgetTestMixin
+
+from team7 import admission, analytics, asr, fluency, health, histograms, tracing, views
+from team7.histograms import LatencyHistogram
+from team7.log_writer import APILogWriter
+from team7.models import APILog, APILogRollup, DetailedScore, Evaluation, Question, ScoreSketch, UserScoreAggregate
+from team7.services import (
+    AnalyticsService, APILogRollupService, CohortSketchService, EvaluationService, ScoreAggregateService,
+    SpeakingEvaluator, WritingEvaluator,
+)
+from team7.sketches import TDigest
+
 
 class TeamPingTests(TestCase):
     def test_ping_requires_auth(self):
         res = self.client.get("/team7/ping/")
         self.assertEqual(res.status_code, 401)
+
+
+class ChunkedASRTests(SimpleTestCase):
+    def test_split_cuts_in_silence_and_overlaps(self):
+        rate = 8000
+        speech = (np.sin(np.arange(rate * 9) / 3.0) * 8000).astype(np.int16)
+        pause = np.zeros(rate, dtype=np.int16)
+        samples = np.concatenate([speech, pause, speech, pause, speech])
+
+        bounds = asr.split_on_silence(samples, rate, chunk_sec=10, overlap_sec=0.25, search_sec=3)
+
+        self.assertEqual(bounds[0][0], 0)
+        self.assertEqual(bounds[-1][1], len(samples))
+        for (_, prev_end), (next_start, _) in zip(bounds, bounds[1:]):
+            self.assertLess(next_start, prev_end)
+            cut = (prev_end + next_start) // 2
+            self.assertTrue(rate * 9 <= cut % (rate * 10) or cut % (rate * 10) == 0)
+
+    def test_stitch_removes_overlap_words(self):
+        text = asr.stitch_transcripts([
+            "I think that technology helps students",
+            "helps students learn faster at home.",
+        ])
+        self.assertEqual(text, "I think that technology helps students learn faster at home.")
+
+    def test_merge_segments_offsets_and_skips_overlap(self):
+        merged = asr.merge_segments(
+            [[{"start": 0.0, "end": 9.8, "text": "first"}],
+             [{"start": 0.0, "end": 0.3, "text": "dup"}, {"start": 0.4, "end": 5.0, "text": "second"}]],
+            [0.0, 9.7],
+        )
+        self.assertEqual([s["text"] for s in merged], ["first", "second"])
+        self.assertEqual(merged[1]["start"], 10.1)
+
+
+class FluencyFeatureTests(SimpleTestCase):
+    def test_pauses_and_rates_from_pcm(self):
+        rate = 8000
+        speech = (np.sin(np.arange(rate * 4) / 3.0) * 8000).astype(np.int16)
+        short_pause = np.zeros(rate // 2, dtype=np.int16)
+        long_pause = np.zeros(rate * 2, dtype=np.int16)
+        samples = np.concatenate([speech, short_pause, speech, long_pause, speech])
+        transcript = " ".join(["word"] * 27 + ["um"] * 3)
+
+        metrics = fluency.extract_fluency_features(transcript, samples=samples, sample_rate=rate)
+
+        self.assertEqual(metrics["pause_count"], 2)
+        self.assertEqual(metrics["long_pause_count"], 1)
+        self.assertAlmostEqual(metrics["phonation_time_sec"], 12.0, delta=0.1)
+        self.assertAlmostEqual(metrics["articulation_rate_wpm"], 150.0, delta=2)
+        self.assertEqual(metrics["filled_pause_ratio"], 0.1)
+        self.assertEqual(metrics["mean_length_of_run"], 10.0)
+
+    def test_segments_fallback_without_pcm(self):
+        segments = [{"start": 0.0, "end": 5.0, "text": "a"}, {"start": 6.5, "end": 10.0, "text": "b"}]
+        metrics = fluency.extract_fluency_features("one two three four", segments=segments)
+        self.assertEqual(metrics["pause_count"], 1)
+        self.assertEqual(metrics["duration_sec"], 10.0)
+
+
+class AnalyticsEngineTests(SimpleTestCase):
+    def test_moving_average_matches_naive_window(self):
+        scores = [3.0, 4.0, 2.5, 5.0, 4.5, 3.5]
+        expected = [None, None] + [round(sum(scores[i - 2:i + 1]) / 3, 2) for i in range(2, len(scores))]
+        self.assertEqual(analytics.moving_average(scores, 3), expected)
+        self.assertEqual(analytics.moving_average([4.0], 3), [None])
+
+    def test_ewma_matches_recursion_across_blocks(self):
+        rng = np.random.default_rng(7)
+        scores = rng.uniform(0, 5, 5000)
+        expected = [scores[0]]
+        for value in scores[1:]:
+            expected.append(0.3 * value + 0.7 * expected[-1])
+        np.testing.assert_allclose(analytics.ewma(scores, 0.3), np.round(expected, 2), atol=0.011)
+
+    def test_linear_trend_confidence_interval(self):
+        rising = analytics.linear_trend([1.0, 1.5, 2.1, 2.4, 3.0, 3.6])
+        self.assertEqual(rising["trend"], "improving")
+        self.assertLess(rising["ci_low"], rising["slope"])
+        noisy = analytics.linear_trend([3.0, 1.0, 4.0, 1.5, 3.5, 2.0])
+        self.assertEqual(noisy["trend"], "stable")
+        self.assertEqual(analytics.linear_trend([2.0, 3.0])["trend"], "insufficient_data")
+
+    def test_criterion_trends_grouped_by_name(self):
+        trends = analytics.criterion_trends([("Grammar", 3.0), ("Vocabulary", 2.0), ("Grammar", 4.0)])
+        self.assertEqual(trends["Grammar"]["scores"], [3.0, 4.0])
+        self.assertEqual(trends["Vocabulary"]["latest"], 2.0)
+
+
+class ScoreAggregateTests(TestCase):
+    databases = {"default", "team7"}
+
+    def setUp(self):
+        self.user_id = uuid.uuid4()
+        self.question = Question.objects.create(prompt_text="Describe a teacher.")
+
+    def _evaluate(self, task_type, score):
+        eval_obj = Evaluation.objects.create(
+            user_id=self.user_id, question=self.question, task_type=task_type, overall_score=score
+        )
+        ScoreAggregateService.record_evaluation(eval_obj)
+        return eval_obj
+
+    def test_aggregates_match_rebuild(self):
+        for task_type, score in [("writing", 3.0), ("speaking", 2.5), ("writing", 4.0), ("writing", None)]:
+            self._evaluate(task_type, score)
+
+        incremental = {a.task_type: a for a in UserScoreAggregate.objects.filter(user_id=self.user_id)}
+        rebuilt = {a.task_type: a for a in ScoreAggregateService.rebuild_for_user(self.user_id)}
+
+        self.assertEqual(set(incremental), {"writing", "speaking", "all"})
+        for key, aggregate in incremental.items():
+            self.assertEqual(aggregate.attempt_count, rebuilt[key].attempt_count)
+            self.assertEqual(aggregate.recent_scores, rebuilt[key].recent_scores)
+            self.assertAlmostEqual(aggregate.ewma, rebuilt[key].ewma)
+        self.assertEqual(incremental["writing"].attempt_count, 3)
+        self.assertEqual(incremental["writing"].score_count, 2)
+        self.assertEqual(incremental["all"].mean, 9.5 / 3)
+
+    def test_first_write_backfills_earlier_history(self):
+        # Evaluations created before the aggregate table existed
+        for score in [1.0, 2.0]:
+            Evaluation.objects.create(
+                user_id=self.user_id, question=self.question, task_type="writing", overall_score=score
+            )
+        self._evaluate("writing", 4.0)
+
+        aggregate = UserScoreAggregate.objects.get(user_id=self.user_id, task_type="all")
+        self.assertEqual(aggregate.attempt_count, 3)
+        self.assertEqual(aggregate.first_score, 1.0)
+        self.assertAlmostEqual(aggregate.mean, 7.0 / 3)
+
+    def test_analytics_reads_lifetime_aggregates(self):
+        for score in [2.0, 3.0, 4.0]:
+            self._evaluate("writing", score)
+
+        result, status = AnalyticsService().get_user_analytics(self.user_id, limit=1)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(result["attempts"]), 1)
+        overall = result["analytics"]["overall"]
+        self.assertEqual(overall["statistics"]["count"], 3)
+        self.assertEqual(overall["statistics"]["mean"], 3.0)
+        self.assertEqual(overall["improvement"]["trend"], "improving")
+        self.assertIsNone(result["analytics"]["speaking"])
+
+    def test_cohort_percentile_from_sketch(self):
+        for score in [1.0, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0, 3.0, 2.0]:
+            eval_obj = Evaluation.objects.create(
+                user_id=uuid.uuid4(), question=self.question, task_type="writing",
+                overall_score=score, rubric_version_id="ETS_iBT_2024_v1"
+            )
+            CohortSketchService.record_evaluation(eval_obj, [{"name": "Grammar", "score": score}])
+        mine = self._evaluate("writing", 4.5)
+        mine.rubric_version_id = "ETS_iBT_2024_v1"
+        CohortSketchService.record_evaluation(mine, [{"name": "Grammar", "score": 4.5}])
+
+        result, _ = AnalyticsService().get_user_analytics(self.user_id)
+
+        cohort = result["analytics"]["writing"]["cohort"]
+        self.assertEqual(ScoreSketch.objects.get(criterion="overall").count, 11)
+        self.assertAlmostEqual(cohort["overall_percentile"], 81.8, delta=1)  # exact mid-rank 9/11
+        self.assertEqual(cohort["criteria_percentiles"], {})
+
+
+class TDigestTests(SimpleTestCase):
+    def test_ranks_and_quantiles_close_to_exact(self):
+        values = np.random.default_rng(3).normal(3.0, 0.8, 20000)
+        digest = TDigest()
+        for value in values:
+            digest.add(value)
+
+        self.assertLessEqual(len(digest.to_dict()["m"]), 100)
+        for q in (0.1, 0.5, 0.72, 0.99):
+            exact = np.quantile(values, q)
+            self.assertAlmostEqual(digest.cdf(exact), q, delta=0.01)
+            self.assertAlmostEqual(digest.quantile(q), exact, delta=0.05)
+
+    def test_merged_digests_match_single_stream(self):
+        values = np.random.default_rng(5).uniform(0, 5, 6000)
+        parts = [TDigest(), TDigest(), TDigest()]
+        for i, value in enumerate(values):
+            parts[i % 3].add(value)
+        merged = TDigest.from_dict(parts[0].to_dict()).merge(parts[1]).merge(parts[2])
+
+        self.assertEqual(merged.count, 6000)
+        self.assertAlmostEqual(merged.cdf(2.5), 0.5, delta=0.02)
+
+    def test_discrete_scores_use_mid_rank(self):
+        digest = TDigest()
+        for value in [1.0, 2.0, 2.0, 3.0]:
+            digest.add(value)
+        self.assertEqual(digest.percentile_rank(2.0), 50.0)
+        self.assertEqual(digest.percentile_rank(0.5), 0.0)
+
+
+@override_settings(AI_GENERATOR_API_KEY="test-key")
+class HistoryPaginationTests(TestCase):
+    databases = {"default", "team7"}
+
+    def setUp(self):
+        self.user_id = uuid.uuid4()
+        question = Question.objects.create(prompt_text="Describe a teacher.")
+        for score in [1.0, 2.0, 3.0, 4.0, 5.0]:
+            Evaluation.objects.create(user_id=self.user_id, question=question, overall_score=score)
+        # Identical timestamps must still page deterministically
+        Evaluation.objects.update(created_at=Evaluation.objects.first().created_at)
+
+    def test_cursor_walks_every_attempt_once(self):
+        service = EvaluationService()
+        seen, cursor = [], None
+        while True:
+            result, status = service.get_user_history(self.user_id, limit=2, cursor=cursor)
+            self.assertEqual(status, 200)
+            seen.extend(a["evaluation_id"] for a in result["attempts"])
+            cursor = result["next_cursor"]
+            if not result["has_more"]:
+                break
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_sparse_fields_skip_criteria_query(self):
+        service = EvaluationService()
+        with self.assertNumQueries(1, using="team7"):
+            result, _ = service.get_user_history(self.user_id, fields=["evaluation_id", "overall_score"])
+        self.assertEqual(set(result["attempts"][0]), {"evaluation_id", "overall_score"})
+
+    def test_page_criteria_read_in_two_queries(self):
+        for evaluation in Evaluation.objects.all():
+            DetailedScore.objects.create(evaluation=evaluation, criterion="Grammar", score_value=evaluation.overall_score)
+        service = EvaluationService()
+        with self.assertNumQueries(2, using="team7"):
+            result, _ = service.get_user_history(self.user_id, limit=2)
+        # Tied timestamps put every score in the window; only the page's own are attached
+        for attempt in result["attempts"]:
+            self.assertEqual(attempt["criteria"], [{"name": "Grammar", "score": attempt["overall_score"]}])
+
+    def test_invalid_cursor_and_fields_rejected(self):
+        service = EvaluationService()
+        self.assertEqual(service.get_user_history(self.user_id, cursor="not-a-cursor")[1], 400)
+        self.assertEqual(service.get_user_history(self.user_id, fields=["password"])[1], 400)
+
+
+@override_settings(AI_GENERATOR_API_KEY="test-key")
+class ConditionalHistoryTests(TestCase):
+    databases = {"default", "team7"}
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="s@test.com", password="pass1234")
+        self.client.cookies["access_token"] = create_access_token(self.user)
+        self.question = Question.objects.create(prompt_text="Describe a teacher.")
+        Evaluation.objects.create(user_id=self.user.id, question=self.question, overall_score=3.0)
+        self.url = reverse("team7:team7:get_history")
+
+    def test_revisit_is_304_without_queries_until_new_evaluation(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["X-Cache"], "MISS")
+        etag = first["ETag"]
+
+        with self.assertNumQueries(0, using="team7"):
+            revisit = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            cached = self.client.get(self.url)
+        self.assertEqual(revisit.status_code, 304)
+        self.assertEqual(cached["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True, using="team7"):
+            with transaction.atomic(using="team7"):
+                eval_obj = Evaluation.objects.create(user_id=self.user.id, question=self.question, overall_score=4.0)
+                EvaluationService._update_derived_data(eval_obj, [])
+
+        after_write = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(after_write.status_code, 200)
+        self.assertEqual(after_write.json()["total_attempts"], 2)
+
+    @override_settings(JSON_COMPRESS_MIN_BYTES=0)
+    def test_encodings_share_a_weak_etag(self):
+        plain = self.client.get(self.url)
+        gzipped = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(gzipped["Content-Encoding"], "gzip")
+        self.assertTrue(plain["ETag"].startswith('W/"'))
+        self.assertEqual(gzipped["ETag"], plain["ETag"])
+        revisit = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=gzipped["ETag"])
+        self.assertEqual(revisit.status_code, 304)
+
+
+class LatencyHistogramTests(SimpleTestCase):
+    def test_percentiles_within_resolution_and_merge(self):
+        rng = np.random.default_rng(3)
+        values = rng.lognormal(7, 1.2, 20000).astype(int)
+        first, second = LatencyHistogram(), LatencyHistogram()
+        for i, value in enumerate(values):
+            (first if i % 2 else second).record(value)
+        merged = LatencyHistogram.from_dict(first.to_dict()).merge(second)
+
+        self.assertEqual(merged.count, values.size)
+        self.assertEqual(merged.max, values.max())
+        for p in (50, 90, 99):
+            exact = np.percentile(values, p, method="inverted_cdf")
+            self.assertLessEqual(abs(merged.value_at_percentile(p) - exact) / exact, 0.035)
+
+    def test_bucket_bounds_cover_values(self):
+        for value in (0, 63, 64, 127, 128, 999, 60000):
+            low, high = histograms.bucket_bounds(histograms.bucket_index(value))
+            self.assertLessEqual(low, value)
+            self.assertLessEqual(value, high)
+
+
+class APILogWriterTests(TestCase):
+    databases = {"default", "team7"}
+
+    def record(self, **overrides):
+        fields = {"endpoint": "/team7/api/v1/history/", "method": "GET", "status_code": 200, "latency_ms": 12}
+        fields.update(overrides)
+        return fields
+
+    def test_flush_writes_batches_and_keeps_timestamps(self):
+        writer = APILogWriter(batch_size=2, background=False)
+        stamp = timezone.now() - timedelta(minutes=5)
+        for _ in range(5):
+            self.assertTrue(writer.enqueue(**self.record(timestamp=stamp)))
+        self.assertEqual(APILog.objects.count(), 0)
+        writer.flush()
+        self.assertEqual(APILog.objects.filter(timestamp=stamp).count(), 5)
+        self.assertEqual(writer.stats(), {"queued": 0, "written": 5, "dropped": 0})
+
+    def test_full_queue_drops_and_counts(self):
+        writer = APILogWriter(max_queue=2, background=False)
+        results = [writer.enqueue(**self.record()) for _ in range(4)]
+        self.assertEqual(results, [True, True, False, False])
+        self.assertEqual(writer.stats()["dropped"], 2)
+
+    @mock.patch("team7.log_writer.close_old_connections")
+    def test_background_thread_recycles_stale_connections(self, close_old):
+        writer = APILogWriter(background=True)
+        with mock.patch.object(APILogWriter, "_write") as write:
+            writer.enqueue(**self.record())
+            self.assertTrue(writer.flush())
+        close_old.assert_called()
+        write.assert_called()
+
+
+@override_settings(TEAM7_TRACE_EXPORTER="memory")
+class APILoggingMiddlewareTests(TestCase):
+    databases = {"default", "team7"}
+
+    def test_api_requests_logged_and_traced_through_settings_middleware(self):
+        user = get_user_model().objects.create_user(email="log@test.com", password="pass1234")
+        self.client.cookies["access_token"] = create_access_token(user)
+        writer = APILogWriter(background=False)
+        with mock.patch("team7.middleware.get_writer", return_value=writer):
+            res = self.client.get(reverse("team7:team7:ping"))
+            self.client.get("/api/auth/me/")  # not a team7 path
+        writer.flush()
+
+        self.assertIn("X-Trace-Id", res)
+        self.assertIn("X-Response-Time", res)
+        log = APILog.objects.get()
+        self.assertEqual((log.endpoint, log.status_code, str(log.user_id)), (res.wsgi_request.path, 200, str(user.id)))
+        self.assertEqual(APILogRollup.objects.get().request_count, 1)
+
+
+class APILogRollupTests(TestCase):
+    databases = {"default", "team7"}
+
+    def setUp(self):
+        self.now = timezone.now()
+        writer = APILogWriter(background=False)
+        for endpoint, status, latency in [("/a", 200, 40), ("/a", 200, 60), ("/a", 500, 900), ("/b", 404, 5)]:
+            writer.enqueue(endpoint=endpoint, method="GET", status_code=status, latency_ms=latency, timestamp=self.now)
+        writer.flush()
+
+    def test_writer_maintains_rollups(self):
+        rollup = APILogRollup.objects.get(endpoint="/a", status_class=2)
+        self.assertEqual((rollup.request_count, rollup.latency_sum_ms, rollup.latency_max_ms), (2, 100, 60))
+        self.assertEqual(rollup.histogram.count, 2)
+
+        summary = APILogRollupService.summarize(self.now - timedelta(hours=24))
+        self.assertEqual(summary["total_requests"], 4)
+        self.assertEqual(summary["error_requests"], 2)
+        self.assertEqual(summary["latency_percentiles_ms"], {"p50": 40, "p90": 900, "p99": 900, "max": 900})
+        slowest = summary["slowest_endpoints"][0]
+        self.assertEqual((slowest["endpoint"], slowest["avg_latency"], slowest["count"]), ("/a", 333.33, 3))
+
+    def test_rebuild_matches_incremental_and_prune_removes_old_rows(self):
+        before = list(APILogRollup.objects.order_by("endpoint", "status_class").values())
+        APILogRollupService.rebuild(self.now - timedelta(hours=1))
+        after = list(APILogRollup.objects.order_by("endpoint", "status_class").values())
+        strip = lambda rows: [{k: v for k, v in row.items() if k != "id"} for row in rows]
+        self.assertEqual(strip(before), strip(after))
+
+        self.assertEqual(APILogRollupService.prune(now=self.now + timedelta(days=8)), (4, 0))
+        self.assertEqual(APILogRollupService.prune(now=self.now + timedelta(days=91)), (0, 3))
+
+
+@override_settings(AI_GENERATOR_API_KEY="test-key", TEAM7_HEALTH_BACKGROUND=False)
+class HealthProbeTests(TestCase):
+    databases = {"default", "team7"}
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="admin@test.com", password="pass1234")
+        self.client.cookies["access_token"] = create_access_token(self.user)
+
+    def test_hung_probe_times_out(self):
+        started = time.monotonic()
+        result = health.run_probe("slow", lambda: time.sleep(2), timeout=0.1)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(result["status"], "unhealthy")
+        self.assertIn("timed out", result["message"])
+
+    def test_hung_probe_is_not_started_twice(self):
+        release = threading.Event()
+        calls = []
+
+        def hang():
+            calls.append(1)
+            release.wait(5)
+            return {"status": "healthy"}
+
+        self.assertIn("timed out", health.run_probe("hang", hang, timeout=0.05)["message"])
+        skipped = health.run_probe("hang", hang, timeout=0.05)
+        self.assertIn("still running", skipped["message"])
+        self.assertEqual(len(calls), 1)
+
+        release.set()
+        health._in_flight["hang"].join(1)
+        self.assertEqual(health.run_probe("hang", hang, timeout=1)["status"], "healthy")
+        self.assertEqual(len(calls), 2)
+
+    def test_endpoint_reads_cached_results_without_queries(self):
+        cache.set("team7:health:database", {"status": "healthy", "checked_at": time.time() - 12})
+        with self.assertNumQueries(0, using="team7"):
+            res = self.client.get(reverse("team7:team7:admin_health"))
+        body = res.json()
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(body["checks"]["database"]["status"], "healthy")
+        self.assertGreaterEqual(body["checks"]["database"]["age_sec"], 12)
+        self.assertEqual(body["checks"]["llm_service"]["status"], "pending")
+
+    def test_evaluation_counters_increment_once_seeded(self):
+        now = timezone.now()
+        health.record_evaluation(now)  # not seeded yet: left for the probe to count
+        self.assertEqual(health.probe_database_stats()["total_evaluations"], 0)
+        health.record_evaluation(now)
+        stats = health.probe_database_stats()
+        self.assertEqual((stats["total_evaluations"], stats["evaluations_today"]), (1, 1))
+
+    def test_question_counter_follows_saves_and_deletes(self):
+        self.assertEqual(health.probe_database_stats()["total_questions"], 0)
+        with self.captureOnCommitCallbacks(execute=True, using="team7"):
+            question = Question.objects.create(prompt_text="Describe a teacher.")
+            Question.objects.create(prompt_text="Describe a city.")
+        with self.captureOnCommitCallbacks(execute=True, using="team7"):
+            question.delete()
+        with self.assertNumQueries(0, using="team7"):
+            self.assertEqual(health.probe_database_stats()["total_questions"], 1)
+
+
+class _StubCompletions:
+    """Stands in for the OpenAI chat client so the workflow runs offline."""
+
+    def create(self, **kwargs):
+        content = '{"overall_score": 4.0, "feedback": "Good.", "criteria": [{"name": "Grammar", "score": 4.0}]}'
+        message = type("Message", (), {"content": content})
+        return type("Response", (), {"choices": [type("Choice", (), {"message": message})]})
+
+
+@override_settings(AI_GENERATOR_API_KEY="test-key", TEAM7_TRACE_EXPORTER="memory")
+class TracingTests(TestCase):
+    databases = {"default", "team7"}
+
+    def test_nested_spans_export_once_per_trace(self):
+        with tracing.span("root") as root:
+            with tracing.span("child", step=1):
+                pass
+            results = ThreadPoolExecutor(2).map(tracing.wrap(lambda i: tracing.current_span().span_id), range(2))
+            self.assertEqual(set(results), {root.span_id})
+            self.assertEqual(set(tracing.stage_timings()), {"root", "child"})
+        spans = tracing.get_exporter().traces[-1]
+        self.assertEqual([s["name"] for s in spans], ["child", "root"])
+        self.assertEqual(spans[0]["parent_id"], spans[1]["span_id"])
+        self.assertIsNone(tracing.current_span())
+
+    def test_writing_evaluation_stores_stage_breakdown(self):
+        question = Question.objects.create(prompt_text="Describe a teacher.")
+        service = EvaluationService()
+        service.writing_evaluator.client.chat.completions = _StubCompletions()
+        result, status = service.evaluate_writing(uuid.uuid4(), question.question_id, "word " * 60)
+        self.assertEqual(status, 200)
+
+        timings = Evaluation.objects.get(evaluation_id=result["evaluation_id"]).stage_timings
+        for stage in ("evaluate_writing", "question_lookup", "validation", "writing.analyze", "llm.chat",
+                      "parse_json", "persist"):
+            self.assertIn(stage, timings)
+        self.assertGreaterEqual(timings["evaluate_writing"], timings["writing.analyze"])
+        self.assertEqual(tracing.get_exporter().traces[-1][-1]["name"], "evaluate_writing")
+
+
+_LLM_RESULT = {
+    "overall_score": 4.0,
+    "feedback": "Good.",
+    "criteria": [{"name": name, "score": 4.0, "comment": ""} for name in ("Grammar", "Vocabulary", "Coherence", "Task")],
+}
+
+
+@override_settings(AI_GENERATOR_API_KEY="test-key", TEAM7_HEALTH_BACKGROUND=False)
+class EndpointQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    databases = {"default", "team7"}
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="s@test.com", password="pass1234")
+        self.client.cookies["access_token"] = create_access_token(self.user)
+        self.question = Question.objects.create(prompt_text="Describe a teacher.")
+        for score in (2.0, 3.0, 4.0, 5.0, 3.5, 4.5):
+            eval_obj = Evaluation.objects.create(user_id=self.user.id, question=self.question, overall_score=score)
+            DetailedScore.objects.create(evaluation=eval_obj, criterion="Grammar", score_value=score)
+        ScoreAggregateService.rebuild_for_user(self.user.id)
+
+    def test_read_endpoints(self):
+        for name in ("ping", "get_history", "get_analytics", "admin_health", "get_exam_details"):
+            res = self.assertWithinQueryBudget("get", reverse(f"team7:team7:{name}"))
+            self.assertEqual(res.status_code, 200, name)
+
+    @mock.patch.object(WritingEvaluator, "analyze", return_value=_LLM_RESULT)
+    def test_submit_writing(self, _analyze):
+        res = self.assertWithinQueryBudget(
+            "post", reverse("team7:team7:submit_writing"), content_type="application/json",
+            data={"user_id": str(self.user.id), "question_id": str(self.question.question_id), "text": "word " * 60},
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.json()["criteria"]), 4)
+
+    @mock.patch.object(SpeakingEvaluator, "analyze_speaking", return_value=_LLM_RESULT)
+    @mock.patch.object(SpeakingEvaluator, "extract_fluency", return_value={})
+    @mock.patch.object(SpeakingEvaluator, "transcribe_audio", return_value={"transcript": "I like my teacher."})
+    def test_submit_speaking(self, *_mocks):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            res = self.assertWithinQueryBudget("post", reverse("team7:team7:submit_speaking"), data={
+                "user_id": str(self.user.id),
+                "question_id": str(self.question.question_id),
+                "audio_file": SimpleUploadedFile("answer.mp3", b"ID3" + b"\0" * 64, content_type="audio/mpeg"),
+            })
+        self.assertEqual(res.status_code, 200)
+
+    @mock.patch.object(SpeakingEvaluator, "analyze_speaking", return_value=_LLM_RESULT)
+    @mock.patch.object(SpeakingEvaluator, "extract_fluency", return_value={})
+    @mock.patch.object(SpeakingEvaluator, "transcribe_audio", return_value={"transcript": "I like my teacher."})
+    @mock.patch.object(WritingEvaluator, "analyze", return_value=_LLM_RESULT)
+    def test_first_submission_worst_case(self, *_mocks):
+        # A user with history but no aggregate rows yet, and no cohort sketches
+        user = get_user_model().objects.create_user(email="new@test.com", password="pass1234")
+        Evaluation.objects.create(user_id=user.id, question=self.question, overall_score=3.0)
+        self.client.cookies["access_token"] = create_access_token(user)
+        self.assertFalse(ScoreSketch.objects.exists())
+
+        # Sketch merges run on commit, which is still inside the request in production
+        with self.assertMaxQueries(views.submit_writing.query_budget.max_queries), \
+                self.captureOnCommitCallbacks(execute=True, using="team7"):
+            res = self.client.post(
+                reverse("team7:team7:submit_writing"), content_type="application/json",
+                data={"user_id": str(user.id), "question_id": str(self.question.question_id), "text": "word " * 60},
+            )
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(ScoreSketch.objects.exists())
+
+        ScoreSketch.objects.all().delete()
+        UserScoreAggregate.objects.filter(user_id=user.id).delete()
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root), \
+                self.assertMaxQueries(views.submit_speaking.query_budget.max_queries), \
+                self.captureOnCommitCallbacks(execute=True, using="team7"):
+            res = self.client.post(reverse("team7:team7:submit_speaking"), data={
+                "user_id": str(user.id),
+                "question_id": str(self.question.question_id),
+                "audio_file": SimpleUploadedFile("answer.mp3", b"ID3" + b"\0" * 64, content_type="audio/mpeg"),
+            })
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(ScoreSketch.objects.exists())
+
+
+@override_settings(
+    AI_GENERATOR_API_KEY="test-key", TEAM7_ADMISSION_RATE_PER_MINUTE=6, TEAM7_ADMISSION_BURST=2,
+    TEAM7_ADMISSION_CONCURRENCY={"llm": 2, "asr": 1},
+)
+class AdmissionControlTests(TestCase):
+    databases = {"default", "team7"}
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="a@test.com", password="pass1234")
+        self.client.cookies["access_token"] = create_access_token(self.user)
+        self.question = Question.objects.create(prompt_text="Describe a teacher.")
+
+    def _submit(self):
+        return self.client.post(
+            reverse("team7:team7:submit_writing"), content_type="application/json",
+            data={"user_id": str(self.user.id), "question_id": str(self.question.question_id), "text": "word " * 60},
+        )
+
+    def test_token_bucket_refills(self):
+        now = 1000.0
+        self.assertEqual(admission.take_token(1, now), 0)
+        self.assertEqual(admission.take_token(1, now), 0)
+        self.assertAlmostEqual(admission.take_token(1, now), 10.0)
+        self.assertEqual(admission.take_token(2, now), 0)  # buckets are per user
+        self.assertEqual(admission.take_token(1, now + 10), 0)
+
+    def test_contended_bucket_waits_instead_of_rejecting(self):
+        lock_key = f"{admission._bucket_key(1)}:lock"
+        for update in (lambda: admission.take_token(1), lambda: admission.refund_token(1)):
+            cache.set(lock_key, 1)  # another request mid-update
+            threading.Timer(0.2, cache.delete, (lock_key,)).start()
+            self.assertFalse(update())
+        # The refund went through: the full burst is still there
+        self.assertEqual(admission.take_token(1), 0)
+        self.assertEqual(admission.take_token(1), 0)
+
+    @mock.patch.object(WritingEvaluator, "analyze", return_value=_LLM_RESULT)
+    def test_rate_limited_user_gets_429(self, _analyze):
+        self.assertEqual(self._submit().status_code, 200)
+        self.assertEqual(self._submit().status_code, 200)
+        res = self._submit()
+        self.assertEqual(res.status_code, 429)
+        self.assertEqual(res.json()["error"], "RATE_LIMITED")
+        self.assertGreaterEqual(int(res["Retry-After"]), 1)
+        self.assertEqual(_analyze.call_count, 2)
+
+    @mock.patch.object(WritingEvaluator, "analyze", return_value=_LLM_RESULT)
+    def test_full_backend_gets_503_and_slots_are_released(self, _analyze):
+        held = [admission.acquire_slot("llm"), admission.acquire_slot("llm")]
+        self.assertIsNone(admission.acquire_slot("llm"))
+        res = self._submit()
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()["error"], "SERVICE_BUSY")
+        self.assertEqual(res["Retry-After"], "5")
+        _analyze.assert_not_called()
+
+        for slot in held:
+            admission.release_slot(slot)
+        self.assertEqual(self._submit().status_code, 200)
+        self.assertEqual(admission.in_flight("llm"), 0)
+
+    @mock.patch.object(WritingEvaluator, "analyze", return_value=_LLM_RESULT)
+    def test_busy_and_invalid_submissions_keep_tokens(self, _analyze):
+        held = [admission.acquire_slot("llm"), admission.acquire_slot("llm")]
+        self.assertEqual(self._submit().status_code, 503)
+        for slot in held:
+            admission.release_slot(slot)
+        invalid = self.client.post(reverse("team7:team7:submit_writing"), content_type="application/json", data={})
+        self.assertEqual(invalid.status_code, 400)
+
+        # The whole burst of 2 is still available
+        self.assertEqual(self._submit().status_code, 200)
+        self.assertEqual(self._submit().status_code, 200)
+        self.assertEqual(self._submit().status_code, 429)
+
+    @mock.patch.object(SpeakingEvaluator, "transcribe_audio", return_value=None)
+    @mock.patch.object(WritingEvaluator, "analyze", return_value=None)
+    def test_failed_ai_calls_keep_tokens(self, _analyze, _transcribe):
+        # LLM outage: 503 after the call
+        self.assertEqual(self._submit().status_code, 503)
+        # Whisper found no speech: 400 after the call
+        res = self.client.post(reverse("team7:team7:submit_speaking"), data={
+            "user_id": str(self.user.id),
+            "question_id": str(self.question.question_id),
+            "audio_file": SimpleUploadedFile("answer.mp3", b"ID3" + b"\0" * 64, content_type="audio/mpeg"),
+        })
+        self.assertEqual(res.json()["error"], "NO_SPEECH_DETECTED")
+
+        self.assertEqual(self._submit().status_code, 429)
+        self.assertEqual(_analyze.call_count, 1)
+
+    @override_settings(TEAM7_ADMISSION_LEASE_SECONDS=1)
+    def test_held_leases_are_renewed(self):
+        slot = admission.acquire_slot("asr")
+        time.sleep(0.7)
+        admission._keeper.renew()
+        time.sleep(0.7)
+        self.assertEqual(admission.in_flight("asr"), 1)  # would have lapsed at 1 s
+        admission.release_slot(slot)
+        self.assertEqual(admission.in_flight("asr"), 0)
+
+    def test_expired_lease_is_not_released_by_old_holder(self):
+        slot = admission.acquire_slot("asr")
+        cache.set(slot[0], "someone-else")
+        admission.release_slot(slot)
+        self.assertIsNone(admission.acquire_slot("asr"))
@@ -0,0 +1,205 @@
+"""
+Lightweight in-process tracing for evaluation requests (FR-MON, UC-04).
+
+``span()`` (context manager) and ``traced()`` (decorator) time nested
+stages of a request. Spans are tracked through a context variable, so
+nesting follows the call stack; use ``wrap()`` to carry the current span
+into worker threads. When the outermost span of a trace ends, its spans are
+handed to the configured exporter:
+
+    TEAM7_TRACE_EXPORTER = 'jsonl'   # one JSON object per span, appended to TEAM7_TRACE_FILE
+    TEAM7_TRACE_EXPORTER = 'memory'  # keep recent traces in process (stand-in collector)
+    TEAM7_TRACE_EXPORTER = 'none'    # default unless TEAM7_TRACE_FILE is set
+
+``stage_timings()`` summarizes the current trace per span name; evaluations
+store it so slow requests can be broken down after the fact.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar('team7_current_span', default=None)
+
+
+class Span:
+    """One timed stage. Attributes must be JSON-serializable."""
+
+    def __init__(self, name, parent=None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.attributes = attributes
+        self.status = 'ok'
+        self.start_time = time.time()
+        self.duration_ms = None
+        self._start = time.perf_counter()
+        # Finished spans of the whole trace, shared with the root
+        self.finished = parent.finished if parent else []
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def elapsed_ms(self):
+        if self.duration_ms is not None:
+            return self.duration_ms
+        return round((time.perf_counter() - self._start) * 1000, 2)
+
+    def end(self, error=None):
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000, 2)
+        if error is not None:
+            self.status = 'error'
+            self.attributes['error'] = f"{type(error).__name__}: {error}"
+        self.finished.append(self)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent.span_id if self.parent else None,
+            'name': self.name,
+            'start_time': self.start_time,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+def current_span():
+    return _current_span.get()
+
+
+def start_span(name, **attributes):
+    """Open a span as a child of the current one.
+
+    Returns:
+        tuple: (span, token); pass both to :func:`end_span`
+    """
+    span_obj = Span(name, _current_span.get(), **attributes)
+    return span_obj, _current_span.set(span_obj)
+
+
+def end_span(span_obj, token, error=None):
+    """Close a span opened with :func:`start_span`; exports the trace at the root."""
+    span_obj.end(error)
+    _current_span.reset(token)
+    if span_obj.parent is None:
+        try:
+            get_exporter().export(span_obj.finished)
+        except Exception as e:
+            logger.error(f"Failed to export trace {span_obj.trace_id}: {str(e)}")
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time the enclosed block as a span; exceptions mark it as an error."""
+    span_obj, token = start_span(name, **attributes)
+    try:
+        yield span_obj
+    except BaseException as e:
+        end_span(span_obj, token, error=e)
+        raise
+    end_span(span_obj, token)
+
+
+def traced(name=None):
+    """Decorator form of :func:`span` (defaults to the function's qualified name)."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def _traced(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return _traced
+    return decorator
+
+
+def wrap(func):
+    """Bind ``func`` to the caller's context so spans opened in worker threads nest correctly."""
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def _wrapped(*args, **kwargs):
+        # Each call needs its own copy: a Context can't be entered twice at once
+        return context.copy().run(func, *args, **kwargs)
+    return _wrapped
+
+
+def stage_timings():
+    """Milliseconds per span name in the current trace, including open spans.
+
+    Finished spans with the same name are summed; spans still open (the
+    current one and its ancestors) report their elapsed time so far.
+    Nested spans overlap their parents.
+    """
+    span_obj = _current_span.get()
+    if span_obj is None:
+        return {}
+    timings = {}
+    for finished in list(span_obj.finished):
+        timings[finished.name] = round(timings.get(finished.name, 0) + finished.duration_ms, 2)
+    while span_obj is not None:
+        timings[span_obj.name] = span_obj.elapsed_ms()
+        span_obj = span_obj.parent
+    return timings
+
+
+# -- exporters --------------------------------------------------------------
+
+class NullExporter:
+    def export(self, spans):
+        pass
+
+
+class InMemoryExporter:
+    """Stand-in collector keeping the most recent traces in process."""
+
+    def __init__(self, max_traces=100):
+        self.traces = deque(maxlen=max_traces)
+
+    def export(self, spans):
+        self.traces.append([s.to_dict() for s in spans])
+
+
+class JSONLExporter:
+    """Append each span as one JSON line to a local file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = ''.join(json.dumps(s.to_dict(), default=str) + '\n' for s in spans)
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as fh:
+                fh.write(lines)
+
+
+@functools.lru_cache(maxsize=None)
+def _exporter(kind, path):
+    if kind == 'jsonl' and path:
+        return JSONLExporter(path)
+    if kind == 'memory':
+        return InMemoryExporter()
+    return NullExporter()
+
+
+def get_exporter():
+    """Exporter chosen by TEAM7_TRACE_EXPORTER / TEAM7_TRACE_FILE."""
+    path = getattr(settings, 'TEAM7_TRACE_FILE', '')
+    kind = getattr(settings, 'TEAM7_TRACE_EXPORTER', '') or ('jsonl' if path else 'none')
+    return _exporter(kind, str(path))
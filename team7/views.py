@@ -1,26 +1,29 @@
-from django.http import JsonResponse
 from django.http import HttpResponse
 from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from core.auth import api_login_required
-import json
+from core.json_utils import FastJsonResponse, JSONDecodeError, parse_json_body
+from core.query_budget import query_budget
 import logging
-from django.db import connection
-from django.db import models
+from django.conf import settings
 from django.utils import timezone
-from datetime import timedelta
-from .models import Question, Evaluation, DetailedScore, APILog
+from .models import Question, Evaluation, DetailedScore
 from .services import EvaluationService, AnalyticsService
+from .response_cache import cached_user_response
+from .log_writer import get_writer
+from . import health
+from .admission import admission_control
 
 logger = logging.getLogger(__name__)
 TEAM_NAME = "team7"
 
 
+@query_budget(1)
 @api_login_required
 def ping(request):
     """Health check endpoint per FR-API-01."""
-    return JsonResponse({"team": TEAM_NAME, "ok": True})
+    return FastJsonResponse({"team": TEAM_NAME, "ok": True})
 
 
 def index(request):
@@ -56,9 +59,13 @@ def speaking_exam(request):
     return render(request, f"{TEAM_NAME}/speaking-exam.html")
 
 
+# Worst case is a user's first submission (aggregate backfill, cold
+# cohort sketch rows, merged on commit): 18 queries
+@query_budget(25)
 @csrf_exempt
 @require_http_methods(["POST"])
 @api_login_required
+@admission_control('llm')
 def submit_writing(request):
     """Controller endpoint for writing submission (UC-01, FR-WR, FR-API-02).
     
@@ -72,7 +79,7 @@ def submit_writing(request):
     Returns JSON with evaluation result and detailed scores.
     """
     try:
-        data = json.loads(request.body)
+        data = parse_json_body(request)
         user_id = data.get('user_id')
         question_id = data.get('question_id')
         text = data.get('text', '').strip()
@@ -80,7 +87,7 @@ def submit_writing(request):
         # Input validation
         if not all([user_id, question_id, text]):
             logger.warning(f"Missing required fields in writing submission")
-            return JsonResponse({
+            return FastJsonResponse({
                 "error": "INVALID_INPUT",
                 "message": "Missing user_id, question_id, or text"
             }, status=400)
@@ -89,28 +96,35 @@ def submit_writing(request):
         service = EvaluationService()
         result, status_code = service.evaluate_writing(user_id, question_id, text)
 
-        return JsonResponse(result, status=status_code)
+        return FastJsonResponse(result, status=status_code)
 
-    except json.JSONDecodeError:
+    except JSONDecodeError:
         logger.error("Invalid JSON in request body")
-        return JsonResponse({
+        return FastJsonResponse({
             "error": "INVALID_INPUT",
             "message": "Request body must be valid JSON"
         }, status=400)
     except Exception as e:
         logger.exception(f"Unexpected error in submit_writing: {str(e)}")
-        return JsonResponse({
+        return FastJsonResponse({
             "error": "INTERNAL_ERROR",
             "message": "An unexpected error occurred"
         }, status=500)
 
 
+@query_budget(3)
 @require_http_methods(["GET"])
 @api_login_required
+@cached_user_response
 def get_history(request, user_id=None):
     """Controller endpoint for student progress/history (UC-03).
     
-    Returns list of past evaluations with scores and trends.
+    Returns one page of past evaluations with scores, newest first.
+    
+    Query Parameters:
+        - limit: Page size (default 50, max 100)
+        - cursor: next_cursor from the previous page
+        - fields: Comma-separated subset of attempt fields (e.g. fields=evaluation_id,overall_score)
     """
     try:
         # Use request.user.id if available, else from query param
@@ -119,27 +133,34 @@ def get_history(request, user_id=None):
 
         service = EvaluationService()
         limit = int(request.GET.get('limit', 50))
-        result, status_code = service.get_user_history(user_id, limit)
+        fields = [f.strip() for f in request.GET.get('fields', '').split(',') if f.strip()]
+        result, status_code = service.get_user_history(
+            user_id, limit, cursor=request.GET.get('cursor'), fields=fields
+        )
 
-        return JsonResponse(result, status=status_code)
+        return FastJsonResponse(result, status=status_code)
 
     except ValueError:
         logger.error(f"Invalid limit parameter: {request.GET.get('limit')}")
-        return JsonResponse({
+        return FastJsonResponse({
             "error": "INVALID_INPUT",
             "message": "limit must be an integer"
         }, status=400)
     except Exception as e:
         logger.exception(f"Error in get_history: {str(e)}")
-        return JsonResponse({
+        return FastJsonResponse({
             "error": "INTERNAL_ERROR",
             "message": "Failed to retrieve history"
         }, status=500)
 
 
+# Worst case is a user's first submission (aggregate backfill, cold
+# cohort sketch rows, merged on commit): 18 queries
+@query_budget(25)
 @csrf_exempt
 @require_http_methods(["POST"])
 @api_login_required
+@admission_control('asr', 'llm')
 def submit_speaking(request):
     """Controller endpoint for speaking submission (UC-02, FR-SP, FR-API-02).
     
@@ -158,7 +179,7 @@ def submit_speaking(request):
         # Input validation
         if not all([user_id, question_id]):
             logger.warning(f"Missing required fields in speaking submission")
-            return JsonResponse({
+            return FastJsonResponse({
                 "error": "INVALID_INPUT",
                 "message": "Missing user_id or question_id"
             }, status=400)
@@ -166,7 +187,7 @@ def submit_speaking(request):
         # Check for audio file in request.FILES
         if 'audio_file' not in request.FILES:
             logger.warning(f"No audio file in request")
-            return JsonResponse({
+            return FastJsonResponse({
                 "error": "INVALID_INPUT",
                 "message": "Missing audio_file in request"
             }, status=400)
@@ -185,18 +206,20 @@ def submit_speaking(request):
             audio_filename=audio_file.name
         )
 
-        return JsonResponse(result, status=status_code)
+        return FastJsonResponse(result, status=status_code)
 
     except Exception as e:
         logger.exception(f"Unexpected error in submit_speaking: {str(e)}")
-        return JsonResponse({
+        return FastJsonResponse({
             "error": "INTERNAL_ERROR",
             "message": "An unexpected error occurred"
         }, status=500)
 
 
+@query_budget(5)
 @require_http_methods(["GET"])
 @api_login_required
+@cached_user_response
 def get_analytics(request, user_id=None):
     """Controller endpoint for student analytics with trends (UC-03, FR-MON-02).
     
@@ -221,22 +244,23 @@ def get_analytics(request, user_id=None):
         limit = int(request.GET.get('limit', 50))
         result, status_code = analytics_service.get_user_analytics(user_id, limit)
 
-        return JsonResponse(result, status=status_code)
+        return FastJsonResponse(result, status=status_code)
 
     except ValueError:
         logger.error(f"Invalid limit parameter: {request.GET.get('limit')}")
-        return JsonResponse({
+        return FastJsonResponse({
             "error": "INVALID_INPUT",
             "message": "limit must be an integer"
         }, status=400)
     except Exception as e:
         logger.exception(f"Error in get_analytics: {str(e)}")
-        return JsonResponse({
+        return FastJsonResponse({
             "error": "INTERNAL_ERROR",
             "message": "Failed to retrieve analytics"
         }, status=500)
 
 
+@query_budget(1)
 @require_http_methods(["GET"])
 @api_login_required
 def admin_health(request):
@@ -249,8 +273,15 @@ def admin_health(request):
         - Error rates
         - System uptime statistics
     
+    Checks run in the background (see health.py); this view only reads
+    their cached results, each reported with its age, so it never blocks on
+    the database or the LLM. Checks not yet run are reported as pending.
+    
     Returns comprehensive health status for admin dashboard.
     """
+    if getattr(settings, 'TEAM7_HEALTH_BACKGROUND', True):
+        health.monitor.ensure_started()
+
     health_status = {
         "service": "team7",
         "timestamp": timezone.now().isoformat(),
@@ -258,108 +289,23 @@ def admin_health(request):
         "checks": {}
     }
 
-    # 1. Database Check
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-        
-        health_status["checks"]["database"] = {
-            "status": "healthy",
-            "message": "Database connection successful"
-        }
-    except Exception as e:
-        health_status["status"] = "degraded"
-        health_status["checks"]["database"] = {
-            "status": "unhealthy",
-            "message": f"Database error: {str(e)}"
-        }
-        logger.error(f"Database health check failed: {str(e)}")
-
-    # 2. External AI Service Check (LLM)
-    try:
-        from django.conf import settings
-        from openai import OpenAI
-        
-        client = OpenAI(
-            api_key=getattr(settings, 'AI_GENERATOR_API_KEY', None),
-            base_url="https://api.gpt4-all.xyz/v1"
-        )
-        
-        # Quick ping to LLM service (with timeout)
-        models = client.models.list()
-        
-        health_status["checks"]["llm_service"] = {
-            "status": "healthy",
-            "message": "LLM API accessible",
-            "models_available": len(models.data) if hasattr(models, 'data') else 0
-        }
-    except Exception as e:
-        health_status["status"] = "degraded"
-        health_status["checks"]["llm_service"] = {
-            "status": "unhealthy",
-            "message": f"LLM service error: {str(e)}"
-        }
-        logger.warning(f"LLM service health check failed: {str(e)}")
-
-    # 3. API Performance Metrics (last 24 hours)
-    try:
-        yesterday = timezone.now() - timedelta(hours=24)
-        recent_logs = APILog.objects.filter(timestamp__gte=yesterday)
-        
-        total_requests = recent_logs.count()
-        error_requests = recent_logs.filter(status_code__gte=400).count()
-        error_rate = (error_requests / total_requests * 100) if total_requests > 0 else 0
-        
-        # Calculate average latency
-        avg_latency = recent_logs.aggregate(
-            avg_latency=models.Avg('latency_ms')
-        )['avg_latency'] or 0
-        
-        # Get slowest endpoints
-        slow_endpoints = recent_logs.values('endpoint').annotate(
-            avg_latency=models.Avg('latency_ms'),
-            count=models.Count('log_id')
-        ).order_by('-avg_latency')[:5]
-        
-        health_status["checks"]["api_performance"] = {
-            "status": "healthy" if error_rate < 10 and avg_latency < 5000 else "degraded",
-            "total_requests_24h": total_requests,
-            "error_requests_24h": error_requests,
-            "error_rate": round(error_rate, 2),
-            "avg_latency_ms": round(avg_latency, 2),
-            "slowest_endpoints": list(slow_endpoints)
-        }
-        
-        # Update overall status based on error rate
-        if error_rate > 25:
-            health_status["status"] = "unhealthy"
-        elif error_rate > 10:
+    for name, result in health.cached_results().items():
+        if result is None:
+            result = {"status": "pending", "message": "Check has not run yet"}
+        elif result["status"] == "unhealthy" and name in ("database", "llm_service"):
             health_status["status"] = "degraded"
-            
-    except Exception as e:
-        health_status["checks"]["api_performance"] = {
-            "status": "unknown",
-            "message": f"Unable to calculate metrics: {str(e)}"
-        }
-        logger.error(f"API performance check failed: {str(e)}")
+        health_status["checks"][name] = result
 
-    # 4. Database Statistics
-    try:
-        total_evaluations = Evaluation.objects.count()
-        total_questions = Question.objects.count()
-        evaluations_today = Evaluation.objects.filter(
-            created_at__gte=timezone.now().date()
-        ).count()
-        
-        health_status["checks"]["database_stats"] = {
-            "status": "info",
-            "total_evaluations": total_evaluations,
-            "total_questions": total_questions,
-            "evaluations_today": evaluations_today
-        }
-    except Exception as e:
-        logger.error(f"Database stats check failed: {str(e)}")
+    # Writer counters are per process and cost nothing to read
+    performance = health_status["checks"]["api_performance"]
+    performance["log_writer"] = get_writer().stats()
+
+    # Update overall status based on error rate
+    error_rate = performance.get("error_rate", 0)
+    if error_rate > 25:
+        health_status["status"] = "unhealthy"
+    elif error_rate > 10:
+        health_status["status"] = "degraded"
 
     # Determine HTTP status code
     if health_status["status"] == "healthy":
@@ -369,23 +315,24 @@ def admin_health(request):
     else:
         status_code = 503  # Service Unavailable
 
-    return JsonResponse(health_status, status=status_code)
+    return FastJsonResponse(health_status, status=status_code)
 
 
 def favicon(request):
     return HttpResponse(status=204)
 
+@query_budget(2)
 @api_login_required
 def get_exam_details(request):
     try:
         exam_id = request.GET.get('exam_id', 'general')
         exam_type = 'speaking' if 'speak' in exam_id else 'writing'
         
-        questions_qs = Question.objects.filter(task_type=exam_type)
+        questions = list(Question.objects.filter(task_type=exam_type))
         
         questions_data = []
-        if questions_qs.exists():
-            for q in questions_qs:
+        if questions:
+            for q in questions:
                 questions_data.append({
                     "id": str(q.question_id),
                     "title": f"Level {q.difficulty}",
@@ -402,14 +349,14 @@ def get_exam_details(request):
                 "preparation_time": 45
             }]
 
-        return JsonResponse({
+        return FastJsonResponse({
             "id": exam_id,
             "title": f"{exam_type.capitalize()} Exam",
             "questions": questions_data
         })
     except Exception as e:
         logger.error(f"Error in exam details: {str(e)}")
-        return JsonResponse({
+        return FastJsonResponse({
             "id": "error",
             "title": "Error Loading Exam",
             "questions": []